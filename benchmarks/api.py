@@ -0,0 +1,285 @@
+"""
+Latency and throughput benchmark of the whole API.
+
+The database from ``DB_URL`` is seeded with Faker data, then every scenario sends ``--requests`` requests
+with ``--concurrency`` in flight, either in-process through httpx's ASGI transport or over HTTP to
+``uvicorn benchmarks.app:app --workers N``. Postgres and Redis must be running.
+
+Usage::
+
+    python -m benchmarks.api run --users 20 --contacts 5000 --output base.json
+    python -m benchmarks.api run --mode workers --workers 4 --output new.json
+    python -m benchmarks.api compare base.json new.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.seed import seed, BENCH_PASSWORD
+
+SCENARIOS = ['login', 'list', 'filter_birthday', 'search', 'create', 'update', 'delete', 'avatar']
+# 1x1 transparent PNG
+AVATAR = bytes.fromhex(
+    '89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+    '0000000d49444154789c6360000002000001e221bc330000000049454e44ae426082'
+)
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    :param values: The sorted samples.
+    :type values: list[float]
+    :param percent: The percentile, between 0 and 100.
+    :type percent: float
+    :return: The sample at the given percentile.
+    :rtype: float
+    """
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, round(percent / 100 * len(values) + 0.5) - 1))
+    return values[rank]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'rps': round((len(latencies) + errors) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+class Scenarios:
+    """
+    Request factories of the benchmark scenarios, sharing the tokens and created contact ids.
+    """
+
+    def __init__(self, emails: list[str], tokens: list[str]):
+        self.emails = emails
+        self.tokens = tokens
+        self.created: list[tuple[str, int]] = []
+        self.names = ['James', 'Mary', 'John', 'Linda', 'Smith', 'Jason', 'Doe']
+
+    def headers(self, index: int) -> dict:
+        return {'Authorization': f'Bearer {self.tokens[index % len(self.tokens)]}'}
+
+    async def login(self, client: httpx.AsyncClient, index: int) -> httpx.Response:
+        email = self.emails[index % len(self.emails)]
+        return await client.post('/api/auth/login', data={'username': email, 'password': BENCH_PASSWORD})
+
+    async def list(self, client: httpx.AsyncClient, index: int) -> httpx.Response:
+        offset = random.randrange(0, 100, 10)
+        return await client.get(f'/api/contacts/?limit=10&offset={offset}', headers=self.headers(index))
+
+    async def filter_birthday(self, client: httpx.AsyncClient, index: int) -> httpx.Response:
+        days = random.randint(1, 30)
+        return await client.get(f'/api/contacts/?days_to_birthday={days}', headers=self.headers(index))
+
+    async def search(self, client: httpx.AsyncClient, index: int) -> httpx.Response:
+        fullname = random.choice(self.names)
+        return await client.get(f'/api/contacts/?fullname={fullname}', headers=self.headers(index))
+
+    async def create(self, client: httpx.AsyncClient, index: int) -> httpx.Response:
+        response = await client.post('/api/contacts/', headers=self.headers(index), json={
+            'first_name': 'Bench',
+            'last_name': f'Contact{index}',
+            'email': f'bench-{time.time_ns()}-{index}@example.com',
+            'phone': f'{index:010d}'[-10:],
+            'birthday': '1990-01-01',
+            'description': 'Benchmark contact',
+        })
+        if response.status_code == 201:
+            self.created.append((self.tokens[index % len(self.tokens)], response.json()['id']))
+        return response
+
+    async def update(self, client: httpx.AsyncClient, index: int) -> httpx.Response:
+        token, contact_id = self.created[index % len(self.created)]
+        return await client.put(f'/api/contacts/{contact_id}', headers={'Authorization': f'Bearer {token}'},
+                                json={'description': f'Updated {index}'})
+
+    async def delete(self, client: httpx.AsyncClient, index: int) -> httpx.Response:
+        token, contact_id = self.created[index]
+        return await client.delete(f'/api/contacts/{contact_id}', headers={'Authorization': f'Bearer {token}'})
+
+    async def avatar(self, client: httpx.AsyncClient, index: int) -> httpx.Response:
+        files = {'file': ('avatar.png', io.BytesIO(AVATAR), 'image/png')}
+        return await client.patch('/api/users/avatar', headers=self.headers(index), files=files)
+
+
+async def run_scenario(client: httpx.AsyncClient, request, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    indexes = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in indexes:
+            started = time.perf_counter()
+            try:
+                response = await request(client, index)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_scenarios(client: httpx.AsyncClient, emails: list[str], args) -> dict:
+    tokens = []
+    for email in emails:
+        response = await client.post('/api/auth/login', data={'username': email, 'password': BENCH_PASSWORD})
+        response.raise_for_status()
+        tokens.append(response.json()['access_token'])
+
+    scenarios = Scenarios(emails, tokens)
+    results = {}
+    for name in args.scenarios:
+        requests = min(args.requests, len(scenarios.created)) if name == 'delete' else args.requests
+        if name in ('update', 'delete') and not scenarios.created:
+            continue
+        results[name] = await run_scenario(client, getattr(scenarios, name), requests, args.concurrency)
+        print(f'{name:>16}: {json.dumps(results[name])}', file=sys.stderr)
+    return results
+
+
+async def run_asgi(emails: list[str], args) -> dict:
+    from benchmarks.app import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+            return await run_scenarios(client, emails, args)
+
+
+async def run_workers(emails: list[str], args) -> dict:
+    command = [sys.executable, '-m', 'uvicorn', 'benchmarks.app:app', '--host', '127.0.0.1',
+               '--port', str(args.port), '--workers', str(args.workers), '--log-level', 'warning']
+    server = subprocess.Popen(command, env=dict(os.environ))
+    base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            for _ in range(100):
+                try:
+                    await client.get('/favicon.ico')
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.2)
+            else:
+                raise RuntimeError(f'The server did not start on {base_url}')
+            return await run_scenarios(client, emails, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def run(args) -> dict:
+    emails = await seed(args.users, args.contacts, args.seed)
+    runner = run_asgi if args.mode == 'asgi' else run_workers
+    scenarios = await runner(emails, args)
+    return {
+        'meta': {
+            'mode': args.mode,
+            'workers': args.workers if args.mode == 'workers' else 1,
+            'users': args.users,
+            'contacts': args.contacts,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'started_at': datetime.now(timezone.utc).isoformat(),
+        },
+        'scenarios': scenarios,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float) -> list[dict]:
+    """
+    Compare two benchmark results scenario by scenario.
+
+    A scenario regresses when its p95 or p99 latency grows, or its RPS drops, by more than ``threshold``.
+
+    :param base: The baseline result.
+    :type base: dict
+    :param new: The result to check.
+    :type new: dict
+    :param threshold: The tolerated relative change, e.g. 0.1 for 10%.
+    :type threshold: float
+    :return: One row per scenario present in both results.
+    :rtype: list[dict]
+    """
+    rows = []
+    for name, old in base['scenarios'].items():
+        current = new['scenarios'].get(name)
+        if current is None:
+            continue
+        row = {'scenario': name, 'regressions': []}
+        for metric in ('p95_ms', 'p99_ms', 'rps'):
+            change = (current[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            row[metric] = {'base': old[metric], 'new': current[metric], 'change': round(change, 4)}
+            worse = -change if metric == 'rps' else change
+            if worse > threshold:
+                row['regressions'].append(metric)
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API latency and throughput benchmark')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Seed the database and run the scenarios')
+    run_parser.add_argument('--mode', choices=['asgi', 'workers'], default='asgi')
+    run_parser.add_argument('--workers', type=int, default=os.cpu_count())
+    run_parser.add_argument('--port', type=int, default=8765)
+    run_parser.add_argument('--users', type=int, default=20)
+    run_parser.add_argument('--contacts', type=int, default=1000)
+    run_parser.add_argument('--requests', type=int, default=500)
+    run_parser.add_argument('--concurrency', type=int, default=20)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    run_parser.add_argument('--output', help='Write the JSON result to this file instead of stdout')
+
+    compare_parser = commands.add_parser('compare', help='Flag regressions between two results')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        result = json.dumps(asyncio.run(run(args)), indent=2)
+        if args.output:
+            with open(args.output, 'w') as file:
+                file.write(result)
+        else:
+            print(result)
+        return
+
+    with open(args.base) as base_file, open(args.new) as new_file:
+        rows = compare(json.load(base_file), json.load(new_file), args.threshold)
+    print(json.dumps(rows, indent=2))
+    if any(row['regressions'] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
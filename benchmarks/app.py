@@ -0,0 +1,39 @@
+"""
+The application under benchmark: ``main.app`` with the rate limiters disabled and, unless
+``BENCH_REAL_CLOUDINARY=1``, the Cloudinary upload replaced by a local stub.
+
+Both the in-process runner and ``uvicorn benchmarks.app:app --workers N`` use this module.
+"""
+import os
+
+import cloudinary.uploader
+from fastapi.routing import APIRoute
+from fastapi_limiter.depends import RateLimiter
+
+from main import app
+
+
+async def no_rate_limit():
+    return None
+
+
+def stub_upload(file, public_id: str = None, **options) -> dict:
+    file.read()
+    return {'public_id': f"{options.get('folder', 'bench')}/{public_id}", 'version': 1}
+
+
+def disable_rate_limiters(fastapi_app) -> None:
+    def walk(dependant):
+        for dependency in dependant.dependencies:
+            if isinstance(dependency.call, RateLimiter):
+                fastapi_app.dependency_overrides[dependency.call] = no_rate_limit
+            walk(dependency)
+
+    for route in fastapi_app.routes:
+        if isinstance(route, APIRoute):
+            walk(route.dependant)
+
+
+disable_rate_limiters(app)
+if os.environ.get('BENCH_REAL_CLOUDINARY') != '1':
+    cloudinary.uploader.upload = stub_upload
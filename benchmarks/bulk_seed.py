@@ -0,0 +1,269 @@
+"""
+Generate production-scale users and contacts and load them into Postgres with ``COPY``.
+
+Contacts per user follow the ``--group USERS:CONTACTS`` groups, e.g. a few users with a million
+contacts and many with ten. Faker only fills small value pools once per process, rows are assembled
+from the pools with ``random.choices`` in batches and streamed through asyncpg
+``copy_records_to_table`` by ``--processes`` worker processes.
+
+Usage::
+
+    python -m benchmarks.bulk_seed --group 5:1000000 --group 500000:10 --processes 8 --drop-indexes
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import asyncpg
+from faker import Faker
+
+from conf.config import app_config
+from src.services.auth.jwt_auth import auth_service
+
+USER_COLUMNS = ['id', 'username', 'email', 'password', 'role_id', 'confirmed', 'created_at', 'updated_at']
+CONTACT_COLUMNS = ['first_name', 'last_name', 'email', 'phone', 'birthday', 'description',
+                   'created_at', 'updated_at', 'user_id']
+POOL_SIZE = 2000
+
+
+def parse_group(value: str) -> tuple[int, int]:
+    users, contacts = value.split(':')
+    return int(users), int(contacts)
+
+
+def asyncpg_dsn(url: str) -> str:
+    return url.replace('postgresql+asyncpg://', 'postgresql://', 1)
+
+
+class RowFactory:
+    """
+    Batched contact rows assembled from Faker value pools.
+
+    :param seed: The random seed of this factory.
+    :type seed: int
+    :param clusters: The day-of-year centers of the birthday clusters.
+    :type clusters: list[int]
+    :param cluster_share: The share of birthdays drawn around the cluster centers.
+    :type cluster_share: float
+    :param cluster_spread: The standard deviation of a birthday cluster, in days.
+    :type cluster_spread: float
+    """
+
+    def __init__(self, seed: int, clusters: list[int], cluster_share: float, cluster_spread: float):
+        faker = Faker()
+        faker.seed_instance(seed)
+        self.random = random.Random(seed)
+        self.first_names = [faker.first_name()[:50] for _ in range(POOL_SIZE)]
+        self.last_names = [faker.last_name()[:50] for _ in range(POOL_SIZE)]
+        self.domains = list({faker.free_email_domain() for _ in range(100)})
+        self.descriptions = [faker.sentence()[:300] for _ in range(POOL_SIZE // 4)]
+        self.clusters = clusters
+        self.cluster_share = cluster_share
+        self.cluster_spread = cluster_spread
+        self.now = datetime.now()
+
+    def birthday(self) -> datetime:
+        if self.clusters and self.random.random() < self.cluster_share:
+            day = int(self.random.gauss(self.random.choice(self.clusters), self.cluster_spread)) % 365
+        else:
+            day = self.random.randrange(365)
+        return datetime(self.random.randint(1950, 2015), 1, 1) + timedelta(days=day)
+
+    def contacts(self, user_id: int, first_row: int, count: int) -> list[tuple]:
+        """
+        Build ``count`` contact rows of one user.
+
+        :param user_id: The owner of the contacts.
+        :type user_id: int
+        :param first_row: The global number of the first row, it keeps the emails unique.
+        :type first_row: int
+        :param count: The number of rows.
+        :type count: int
+        :return: The rows in ``CONTACT_COLUMNS`` order.
+        :rtype: list[tuple]
+        """
+        choices = self.random.choices
+        first_names = choices(self.first_names, k=count)
+        last_names = choices(self.last_names, k=count)
+        domains = choices(self.domains, k=count)
+        descriptions = choices(self.descriptions, k=count)
+        phones = choices(range(10 ** 10), k=count)
+        now = self.now
+        return [
+            (first, last, f'{first}.{last}.{first_row + index}@{domain}'.lower(), f'{phone:010d}',
+             self.birthday(), description, now, now, user_id)
+            for index, (first, last, domain, description, phone)
+            in enumerate(zip(first_names, last_names, domains, descriptions, phones))
+        ]
+
+
+def plan_tasks(first_user_id: int, groups: list[tuple[int, int]], task_size: int) -> list[list[tuple]]:
+    """
+    Split the contacts of every user into tasks of about ``task_size`` rows.
+
+    :param first_user_id: The id of the first generated user.
+    :type first_user_id: int
+    :param groups: The (users, contacts per user) groups.
+    :type groups: list[tuple[int, int]]
+    :param task_size: The number of contacts per task.
+    :type task_size: int
+    :return: The tasks, each a list of (user_id, first_row, count) slices.
+    :rtype: list[list[tuple]]
+    """
+    tasks, task, task_rows, row, user_id = [], [], 0, 0, first_user_id
+    for users, contacts in groups:
+        for _ in range(users):
+            remaining = contacts
+            while remaining:
+                count = min(remaining, task_size - task_rows)
+                task.append((user_id, row, count))
+                row += count
+                task_rows += count
+                remaining -= count
+                if task_rows == task_size:
+                    tasks.append(task)
+                    task, task_rows = [], 0
+            user_id += 1
+    if task:
+        tasks.append(task)
+    return tasks
+
+
+async def load_contacts(dsn: str, task: list[tuple], seed: int, options: dict, batch_size: int) -> int:
+    factory = RowFactory(seed, **options)
+    connection = await asyncpg.connect(dsn)
+    try:
+        batch, loaded = [], 0
+        for user_id, first_row, count in task:
+            for offset in range(0, count, batch_size):
+                batch.extend(factory.contacts(user_id, first_row + offset, min(batch_size, count - offset)))
+                if len(batch) >= batch_size:
+                    await connection.copy_records_to_table('contacts', records=batch, columns=CONTACT_COLUMNS)
+                    loaded += len(batch)
+                    batch = []
+        if batch:
+            await connection.copy_records_to_table('contacts', records=batch, columns=CONTACT_COLUMNS)
+            loaded += len(batch)
+        return loaded
+    finally:
+        await connection.close()
+
+
+def load_contacts_task(dsn: str, task: list[tuple], seed: int, options: dict, batch_size: int) -> int:
+    return asyncio.run(load_contacts(dsn, task, seed, options, batch_size))
+
+
+async def prepare(dsn: str, groups: list[tuple[int, int]], password: str, drop_indexes: bool) -> tuple[int, list[str]]:
+    """
+    Create the users with ``COPY`` and optionally drop the secondary indexes of ``contacts``.
+
+    :return: The id of the first generated user and the definitions of the dropped indexes.
+    :rtype: tuple[int, list[str]]
+    """
+    connection = await asyncpg.connect(dsn)
+    try:
+        role_id = await connection.fetchval("SELECT id FROM roles WHERE name = 'user'")
+        if role_id is None:
+            await connection.execute("INSERT INTO roles (name) VALUES ('guest'), ('user'), ('admin')")
+            role_id = await connection.fetchval("SELECT id FROM roles WHERE name = 'user'")
+        first_user_id = await connection.fetchval('SELECT coalesce(max(id), 0) + 1 FROM users')
+        password_hash = auth_service.get_password_hash(password)
+        now = datetime.now()
+        total_users = sum(users for users, _ in groups)
+        for start in range(0, total_users, 50_000):
+            records = [
+                (user_id, f'seed{user_id}', f'seed-user-{user_id}@example.com', password_hash, role_id, True, now, now)
+                for user_id in range(first_user_id + start, first_user_id + min(total_users, start + 50_000))
+            ]
+            await connection.copy_records_to_table('users', records=records, columns=USER_COLUMNS)
+        await connection.execute("SELECT setval(pg_get_serial_sequence('users', 'id'), max(id)) FROM users")
+
+        indexes = []
+        if drop_indexes:
+            rows = await connection.fetch(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'contacts' "
+                "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = 'contacts'::regclass)"
+            )
+            async with connection.transaction():
+                for row in rows:
+                    await connection.execute(f'DROP INDEX {row["indexname"]}')
+            indexes = [row['indexdef'] for row in rows]
+        return first_user_id, indexes
+    finally:
+        await connection.close()
+
+
+async def restore_indexes(dsn: str, indexes: list[str]) -> None:
+    """
+    Rebuild the dropped indexes, each one even if another fails, then update the planner statistics.
+
+    :raises RuntimeError: With the definitions of the indexes that could not be rebuilt.
+    """
+    connection = await asyncpg.connect(dsn)
+    try:
+        failed = []
+        for definition in indexes:
+            try:
+                await connection.execute(definition)
+            except asyncpg.PostgresError as error:
+                failed.append(f'{definition}: {error}')
+        if failed:
+            raise RuntimeError('Indexes not rebuilt, create them by hand:\n' + '\n'.join(failed))
+        await connection.execute('ANALYZE users')
+        await connection.execute('ANALYZE contacts')
+    finally:
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load synthetic users and contacts into Postgres')
+    parser.add_argument('--dsn', default=asyncpg_dsn(app_config.DB_URL))
+    parser.add_argument('--group', type=parse_group, action='append', metavar='USERS:CONTACTS',
+                        help='USERS users with CONTACTS contacts each, repeatable (default: 10:1000, 1000:10)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--task-size', type=int, default=200_000, help='Contacts per worker task')
+    parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per COPY')
+    parser.add_argument('--birthday-clusters', type=int, default=3, help='Number of birthday peaks')
+    parser.add_argument('--birthday-cluster-share', type=float, default=0.3)
+    parser.add_argument('--birthday-cluster-spread', type=float, default=4.0, help='Days')
+    parser.add_argument('--password', default='123456')
+    parser.add_argument('--drop-indexes', action='store_true',
+                        help='Drop the secondary contacts indexes during the load and rebuild them after')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    groups = args.group or [(10, 1000), (1000, 10)]
+    rng = random.Random(args.seed)
+    options = {
+        'clusters': [rng.randrange(365) for _ in range(args.birthday_clusters)],
+        'cluster_share': args.birthday_cluster_share,
+        'cluster_spread': args.birthday_cluster_spread,
+    }
+
+    started = time.perf_counter()
+    first_user_id, indexes = asyncio.run(prepare(args.dsn, groups, args.password, args.drop_indexes))
+    tasks = plan_tasks(first_user_id, groups, args.task_size)
+    try:
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            futures = [
+                executor.submit(load_contacts_task, args.dsn, task, args.seed + number, options, args.batch_size)
+                for number, task in enumerate(tasks)
+            ]
+            loaded = sum(future.result() for future in futures)
+        loaded_at = time.perf_counter()
+    finally:
+        # Even if a worker failed: the unique (user_id, email, phone) index is among the dropped ones
+        asyncio.run(restore_indexes(args.dsn, indexes))
+    finished = time.perf_counter()
+
+    users = sum(users for users, _ in groups)
+    print(f'Loaded {users} users and {loaded} contacts in {loaded_at - started:.1f}s '
+          f'({loaded / (loaded_at - started):,.0f} contacts/s), indexes and ANALYZE in {finished - loaded_at:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
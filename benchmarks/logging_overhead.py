@@ -0,0 +1,113 @@
+"""
+What logging costs a request, in the thread of the event loop.
+
+Each variant logs the request line of ``main`` ``--records`` times, with its ``extra`` fields and the
+request context set, and reports the microseconds per record spent by the caller:
+
+- ``sync``: a ``StreamHandler`` writing text to a file, as before the pipeline;
+- ``queue``: the ``LogPipeline``, JSON written by its listener thread;
+- ``queue_sampled``: the same with ``uvicorn.error.requests`` sampled at ``--rate``.
+
+``--write-delay`` makes every write of the stream that long, like a full pipe to a slow log collector:
+the synchronous handler pays it in every request, the pipeline drops the records it has no room for.
+
+Usage::
+
+    python -m benchmarks.logging_overhead [--records 20000] [--rate 0.1] [--write-delay 0]
+"""
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+
+from src.services.metrics import log_records_dropped
+from src.services.request_context import current_scope, request_id
+from src.services.structured_logging import LogPipeline
+
+LOGGER = 'uvicorn.error.requests'
+
+
+class SlowFile:
+    def __init__(self, file, delay: float):
+        self.file, self.delay = file, delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.file.write(text)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+def log_requests(records: int) -> float:
+    """
+    :return: Microseconds per record spent by the caller.
+    """
+    logger = logging.getLogger(LOGGER)
+    started = time.perf_counter()
+    for number in range(records):
+        logger.info(
+            f"GET /api/contacts/{number} status=200 duration_ms=3.21 db_queries=1 db_ms=1.05",
+            extra={'method': 'GET', 'path': f'/api/contacts/{number}', 'status_code': 200,
+                   'duration_ms': 3.21, 'db_queries': 1, 'db_ms': 1.05}
+        )
+    return (time.perf_counter() - started) / records * 1e6
+
+
+def run_variant(name: str, records: int, rate: float, delay: float) -> dict:
+    logging.getLogger('uvicorn').setLevel(logging.INFO)
+    dropped = log_records_dropped._values.get(log_records_dropped._key({}), 0)
+    with tempfile.TemporaryFile('w+') as file:
+        stream = SlowFile(file, delay)
+        if name == 'sync':
+            logger = logging.getLogger('uvicorn')
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(logging.Formatter('%(levelname)s:     %(message)s'))
+            logger.handlers, logger.propagate = [handler], False
+            per_record = log_requests(records)
+            drained = per_record
+        else:
+            pipeline = LogPipeline('json', f'{LOGGER}={rate}' if name == 'queue_sampled' else '')
+            pipeline.start(stream)
+            started = time.perf_counter()
+            per_record = log_requests(records)
+            pipeline.stop()
+            drained = (time.perf_counter() - started) / records * 1e6
+        file.seek(0)
+        written = sum(1 for _ in file)
+    return {
+        'caller_us_per_record': round(per_record, 2),
+        'us_per_record_until_written': round(drained, 2),
+        'written': written,
+        'dropped': log_records_dropped._values.get(log_records_dropped._key({}), 0) - dropped,
+    }
+
+
+def run(records: int, rate: float, delay: float) -> dict:
+    results = {}
+    id_token = request_id.set('0123456789abcdef0123456789abcdef')
+    scope_token = current_scope.set({'type': 'http', 'path': '/api/contacts/1'})
+    try:
+        for name in ('sync', 'queue', 'queue_sampled'):
+            results[name] = run_variant(name, records, rate, delay)
+            print(f'{name:>14}: {json.dumps(results[name])}', file=sys.stderr)
+    finally:
+        request_id.reset(id_token)
+        current_scope.reset(scope_token)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-request cost of the logging pipeline')
+    parser.add_argument('--records', type=int, default=20000, help='Request log records per variant')
+    parser.add_argument('--rate', type=float, default=0.1, help='Share of the request records kept when sampled')
+    parser.add_argument('--write-delay', type=float, default=0, help='Seconds every write of the stream takes')
+    args = parser.parse_args()
+    print(json.dumps(run(args.records, args.rate, args.write_delay), indent=2))
+
+
+if __name__ == '__main__':
+    main()
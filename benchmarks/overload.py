@@ -0,0 +1,129 @@
+"""
+Latency of an overloaded worker with and without the admission control.
+
+An app with the database session of the API serves three routes, one per priority, whose query is a
+``pg_sleep``: slow admin reports, contact reads and logins. Requests arrive at ``--rate`` per second,
+more than the ``--pool`` connections can serve, for ``--duration`` seconds; the report has the latency
+percentiles and the number of 503 by priority of both variants. Postgres from ``DB_URL`` must be running.
+
+Usage::
+
+    python -m benchmarks.overload [--rate 400] [--duration 5] [--pool 4]
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import httpx
+from fastapi import APIRouter, Depends, FastAPI
+from sqlalchemy import text
+
+from benchmarks.api import summarize
+from conf.config import app_config
+from database.db import DatabaseSessionManager
+from src.services.admission import AdmissionMiddleware, Priority, RoutePriorities
+from src.services.loop_lag import LoopLagMonitor
+
+# Route: (priority, query seconds, share of the requests)
+ROUTES = {
+    '/admin/report': (Priority.LOW, 0.05, 0.4),
+    '/contacts': (Priority.NORMAL, 0.01, 0.5),
+    '/auth/login': (Priority.HIGH, 0.005, 0.1),
+}
+
+
+def create_app(manager: DatabaseSessionManager, priorities: RoutePriorities) -> FastAPI:
+    async def get_db():
+        async with manager.session() as session:
+            yield session
+
+    def create_endpoint(seconds: float):
+        async def endpoint(db=Depends(get_db)):
+            await db.execute(text('SELECT pg_sleep(:seconds)'), {'seconds': seconds})
+            return {}
+        return endpoint
+
+    app = FastAPI()
+    for path, (priority, seconds, _) in ROUTES.items():
+        router = APIRouter()
+        router.add_api_route(path, create_endpoint(seconds))
+        priorities.declare(router, priority)
+        app.include_router(router)
+    return app
+
+
+async def run_variant(rate: float, duration: float, pool: int, admission: bool) -> dict:
+    app_config.DB_POOL_SIZE, app_config.DB_MAX_OVERFLOW = pool, 0
+    app_config.ADMISSION_MAX_LOOP_LAG = 0.5 if admission else 0
+    app_config.ADMISSION_MAX_POOL_WAIT = 0.2 if admission else 0
+    app_config.ADMISSION_MAX_IN_FLIGHT = 0
+    manager = DatabaseSessionManager(app_config.DB_URL)
+    loop_lag = LoopLagMonitor()
+    loop_lag.start()
+    priorities = RoutePriorities()
+    inner = create_app(manager, priorities)
+    app = AdmissionMiddleware(inner, inner.routes, lambda: loop_lag.lag, manager.pool_wait, priorities)
+    latencies = {path: [] for path in ROUTES}
+    rejected = {path: 0 for path in ROUTES}
+    errors = {path: 0 for path in ROUTES}
+
+    async def request(client: httpx.AsyncClient, path: str) -> None:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+        except Exception:
+            errors[path] += 1
+            return
+        if response.status_code == 503:
+            rejected[path] += 1
+        elif response.status_code >= 400:
+            errors[path] += 1
+        else:
+            latencies[path].append(time.perf_counter() - started)
+
+    paths, weights = list(ROUTES), [share for _, _, share in ROUTES.values()]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=60) as client:
+        await asyncio.gather(*(request(client, '/contacts') for _ in range(pool)))
+        for values in latencies.values():
+            values.clear()
+        # Open loop: the arrivals do not wait for the responses
+        tasks, started = [], time.perf_counter()
+        while (elapsed := time.perf_counter() - started) < duration:
+            due = int(elapsed * rate) - len(tasks)
+            tasks += [asyncio.create_task(request(client, random.choices(paths, weights)[0])) for _ in range(due)]
+            await asyncio.sleep(0.005)
+        await asyncio.gather(*tasks)
+        total = time.perf_counter() - started
+
+    await loop_lag.stop()
+    await manager.close()
+    results = {}
+    for path in ROUTES:
+        results[path] = summarize(latencies[path], errors[path], total)
+        results[path]['rejected'] = rejected[path]
+    return results
+
+
+async def run(rate: float, duration: float, pool: int) -> dict:
+    results = {}
+    for name, admission in (('without_admission', False), ('with_admission', True)):
+        results[name] = await run_variant(rate, duration, pool, admission)
+        print(f'{name:>18}: {json.dumps(results[name])}', file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Overload latency benchmark of the admission control')
+    parser.add_argument('--rate', type=float, default=400, help='Requests per second')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds')
+    parser.add_argument('--pool', type=int, default=4, help='Database connections')
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.rate, args.duration, args.pool)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Requests per second of the landing page ``/``, in-process through httpx's ASGI transport.
+
+Three variants are measured: the cached page, the cached page revalidated with ``If-None-Match``
+and, as the baseline, ``index.html`` rendered through ``Jinja2Templates`` on every request. The full
+stack numbers include every middleware, ``handler_us`` is the cost of building the response alone.
+No database or Redis is needed.
+
+Usage::
+
+    python -m benchmarks.pages [--requests 5000] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import json
+import timeit
+
+import httpx
+from fastapi import Request
+
+from benchmarks.api import run_scenario
+from main import app
+from src.services.routes_pages import templates, index_page
+
+RENDERED_PATH = '/_bench/rendered'
+
+
+async def rendered_index(request: Request):
+    return templates.TemplateResponse(request, 'index.html', {'page_title': 'Python Test Landing Page'})
+
+
+def handler_cost(iterations: int) -> dict:
+    request = Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': []})
+    variants = {
+        'cached': lambda: index_page.response(request),
+        'rendered_per_request': lambda: templates.TemplateResponse(
+            request, 'index.html', {'page_title': 'Python Test Landing Page'}),
+    }
+    return {name: round(timeit.timeit(variant, number=iterations) / iterations * 1e6, 2)
+            for name, variant in variants.items()}
+
+
+async def run(requests: int, concurrency: int) -> dict:
+    app.add_api_route(RENDERED_PATH, rendered_index, include_in_schema=False)
+    variants = {
+        'cached': lambda client, index: client.get('/'),
+        'cached_not_modified': lambda client, index: client.get('/', headers={'If-None-Match': index_page.etag}),
+        'rendered_per_request': lambda client, index: client.get(RENDERED_PATH),
+    }
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        for name, request in variants.items():
+            # Warm up the route and template caches
+            await run_scenario(client, request, min(requests, 200), concurrency)
+            results[name] = await run_scenario(client, request, requests, concurrency)
+    results['handler_us'] = handler_cost(requests)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Landing page throughput benchmark')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
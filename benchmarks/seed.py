@@ -0,0 +1,113 @@
+"""
+Seed the database configured by ``DB_URL`` with benchmark users and Faker contacts.
+
+Usage::
+
+    python -m benchmarks.seed --users 20 --contacts 1000
+"""
+import argparse
+import asyncio
+import random
+from datetime import date
+
+from faker import Faker
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from database.db import sessionmanager
+from src.contacts.models import Contact
+from src.services.auth.jwt_auth import auth_service
+from src.users.models import User, Role
+from src.users.schemas import RoleEnum
+from tests.seed_contacts import fake_contacts
+
+BENCH_PASSWORD = '123456'
+BATCH_SIZE = 1000
+
+
+def bench_email(index: int) -> str:
+    return f'bench-user-{index}@example.com'
+
+
+def fake_contact(faker: Faker) -> dict:
+    """
+    Generate one contact in the same shape as ``tests.seed_contacts.fake_contacts``.
+
+    :param faker: The Faker instance.
+    :type faker: Faker
+    :return: The contact data.
+    :rtype: dict
+    """
+    return {
+        'first_name': faker.first_name()[:50],
+        'last_name': faker.last_name()[:50],
+        'email': faker.unique.email(),
+        'phone': f'{random.randint(0, 9999999999):010d}',
+        'birthday': faker.date_of_birth(minimum_age=1, maximum_age=90),
+        'description': faker.sentence()[:300],
+    }
+
+
+async def get_role_id(db) -> int:
+    role_id = (await db.execute(select(Role.id).where(Role.name == RoleEnum.USER.value))).scalar_one_or_none()
+    if role_id is None:
+        db.add_all([Role(name=role.value) for role in RoleEnum])
+        await db.commit()
+        role_id = (await db.execute(select(Role.id).where(Role.name == RoleEnum.USER.value))).scalar_one()
+    return role_id
+
+
+async def seed(users: int, contacts: int, seed_value: int = 0) -> list[str]:
+    """
+    Create ``users`` confirmed benchmark users sharing ``contacts`` contacts between them.
+
+    The first user also gets the hand-written contacts from ``tests.seed_contacts``. Users that already
+    exist are reused, so seeding the same database twice only adds contacts.
+
+    :param users: The number of benchmark users.
+    :type users: int
+    :param contacts: The total number of contacts to generate.
+    :type contacts: int
+    :param seed_value: The Faker and random seed, for reproducible data sets.
+    :type seed_value: int
+    :return: The emails of the benchmark users.
+    :rtype: list[str]
+    """
+    faker = Faker()
+    Faker.seed(seed_value)
+    random.seed(seed_value)
+    password = auth_service.get_password_hash(BENCH_PASSWORD)
+    emails = [bench_email(index) for index in range(users)]
+
+    async with sessionmanager.session() as db:
+        role_id = await get_role_id(db)
+        existing = set((await db.execute(select(User.email).where(User.email.in_(emails)))).scalars().all())
+        db.add_all([
+            User(username=f'bench{index}', email=email, password=password, confirmed=True, role_id=role_id)
+            for index, email in enumerate(emails) if email not in existing
+        ])
+        await db.commit()
+        user_ids = (await db.execute(select(User.id).where(User.email.in_(emails)).order_by(User.id))).scalars().all()
+
+        rows = [dict(contact, birthday=date.fromisoformat(contact['birthday']), user_id=user_ids[0])
+                for contact in fake_contacts]
+        for _ in range(contacts):
+            rows.append(dict(fake_contact(faker), user_id=random.choice(user_ids)))
+        for start in range(0, len(rows), BATCH_SIZE):
+            await db.execute(insert(Contact).on_conflict_do_nothing(), rows[start:start + BATCH_SIZE])
+        await db.commit()
+    return emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed benchmark users and contacts')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--contacts', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    emails = asyncio.run(seed(args.users, args.contacts, args.seed))
+    print(f'Seeded {len(emails)} users and {args.contacts} contacts, password: {BENCH_PASSWORD}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Cold start benchmark: ``import main`` in a fresh interpreter under ``python -X importtime``.
+
+Every ``--routers`` value is a deployment (``ENABLED_ROUTERS``), measured ``--runs`` times. The report
+has the median wall time of the import, the median cumulative import time of ``main`` and the
+packages with the largest self import time.
+
+Usage::
+
+    python -m benchmarks.startup [--runs 5] [--top 15] [--routers default api,health,metrics]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from conf.config import app_config
+
+DEFAULT_ROUTERS = 'default'
+
+
+def parse_importtime(output: str) -> tuple[int, Counter]:
+    """
+    Parse the ``-X importtime`` report.
+
+    :param output: The stderr of the interpreter.
+    :type output: str
+    :return: The cumulative microseconds of ``main`` and the self microseconds by top-level package.
+    :rtype: tuple[int, Counter]
+    """
+    main_us, packages = 0, Counter()
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        packages[name.split('.')[0]] += int(self_us)
+        if name == 'main':
+            main_us = int(cumulative_us)
+    return main_us, packages
+
+
+def measure(routers: str) -> tuple[float, int, Counter]:
+    env = dict(os.environ)
+    if routers != DEFAULT_ROUTERS:
+        env['ENABLED_ROUTERS'] = routers
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=app_config.BASE_DIR,
+                            env=env, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - started
+    main_us, packages = parse_importtime(result.stderr)
+    return elapsed, main_us, packages
+
+
+def run(routers: str, runs: int, top: int) -> dict:
+    walls, mains, packages = [], [], Counter()
+    for _ in range(runs):
+        elapsed, main_us, run_packages = measure(routers)
+        walls.append(elapsed)
+        mains.append(main_us)
+        packages.update(run_packages)
+    return {
+        'wall_ms': round(statistics.median(walls) * 1000, 1),
+        'import_main_ms': round(statistics.median(mains) / 1000, 1),
+        'top_packages_ms': {name: round(us / runs / 1000, 1) for name, us in packages.most_common(top)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start import time benchmark')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--routers', nargs='+', default=[DEFAULT_ROUTERS],
+                        help=f'ENABLED_ROUTERS values to compare, "{DEFAULT_ROUTERS}" for the configured one')
+    args = parser.parse_args()
+    print(json.dumps({routers: run(routers, args.runs, args.top) for routers in args.routers}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
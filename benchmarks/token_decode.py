@@ -0,0 +1,43 @@
+"""
+Microbenchmark of the access token verification cost paid by ``Auth.get_current_user`` per request.
+
+Usage::
+
+    python -m benchmarks.token_decode [--iterations 20000]
+"""
+import argparse
+import asyncio
+import json
+import timeit
+
+from jose import jwt
+
+from conf.config import app_config
+from src.services.auth.jwt_auth import auth_service, VerifiedTokenCache
+
+
+def run(iterations: int) -> dict:
+    token = asyncio.run(auth_service.create_access_token(data={'sub': 'benchmark@example.com'}))
+    key, algorithms = app_config.JWT_SECRET_KEY, [app_config.ALGORITHM]
+    results = {}
+
+    seconds = timeit.timeit(lambda: jwt.decode(token, key, algorithms=algorithms), number=iterations)
+    results['decode'] = seconds / iterations * 1e6
+
+    cache = VerifiedTokenCache(maxsize=10000)
+    cache.put(token, jwt.decode(token, key, algorithms=algorithms))
+    seconds = timeit.timeit(lambda: cache.get(token), number=iterations)
+    results['verified_token_cache_hit'] = seconds / iterations * 1e6
+
+    return {name: round(us, 2) for name, us in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Token decode cost per request, in microseconds')
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Concurrent user lookups with and without the batched ``UserLoader``.
+
+Every round starts ``--concurrency`` lookups at once, each in its own session like concurrent requests
+authenticating, and the report has the queries executed and the lookup latency percentiles of both
+variants. The benchmark users are seeded in the database from ``DB_URL``, Postgres must be running.
+
+Usage::
+
+    python -m benchmarks.user_loader [--concurrency 1000] [--rounds 5] [--users 20]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+from benchmarks.api import summarize
+from benchmarks.seed import seed
+from database.db import sessionmanager
+from src.users.repository import get_user_by_email, users_by_email
+
+
+async def lookup(email: str, latencies: list[float]) -> None:
+    started = time.perf_counter()
+    async with sessionmanager.session() as db:
+        await get_user_by_email(email, db)
+    latencies.append(time.perf_counter() - started)
+
+
+async def run_variant(emails: list[str], concurrency: int, rounds: int) -> dict:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    latencies, errors = [], 0
+    # Warm up the pool
+    await asyncio.gather(*(lookup(email, []) for email in emails))
+    event.listen(sessionmanager.engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    started = time.perf_counter()
+    try:
+        for _ in range(rounds):
+            results = await asyncio.gather(*(lookup(random.choice(emails), latencies) for _ in range(concurrency)),
+                                           return_exceptions=True)
+            errors += sum(isinstance(result, Exception) for result in results)
+    finally:
+        event.remove(sessionmanager.engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    summary = summarize(latencies, errors, time.perf_counter() - started)
+    summary['queries'] = len(statements)
+    return summary
+
+
+async def run(concurrency: int, rounds: int, users: int) -> dict:
+    emails = await seed(users, 0)
+    results = {}
+    try:
+        with patch.object(users_by_email, 'max_batch', 0):
+            results['per_request'] = await run_variant(emails, concurrency, rounds)
+        results['batched'] = await run_variant(emails, concurrency, rounds)
+    finally:
+        await sessionmanager.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batched user lookup benchmark')
+    parser.add_argument('--concurrency', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--users', type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.concurrency, args.rounds, args.users)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,8 @@ from fastapi_cache import FastAPICache
 from starlette.requests import Request
 from starlette.responses import Response
 
+from src.services.metrics import cache_requests
+
 class CustomKeyBuilder:
     def __call__(
         self,
@@ -17,6 +19,7 @@ class CustomKeyBuilder:
         kwargs: Dict[str, Any],
     ) -> Union[Awaitable[str], str]:
 
+        cache_requests.inc(namespace=__namespace.split(':')[-1])
         key_parts = [__namespace]
 
         signature = inspect.signature(__function)
@@ -48,6 +51,8 @@ class CustomKeyBuilder:
         return cache_key
 
 async def clear_cache(user_id):
+    # With Redis, the keys are deleted by SCAN and pipelined UNLINK, or queued while Redis is unavailable,
+    # see ResilientCacheBackend.clear
     await FastAPICache.clear(namespace=f'get_my_contacts:user={user_id}')
 
 custom_key_builder = CustomKeyBuilder()
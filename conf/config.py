@@ -1,7 +1,7 @@
 from pathlib import Path
 
 from sqlalchemy.orm import DeclarativeBase
-from pydantic import field_validator, EmailStr, ConfigDict
+from pydantic import field_validator, EmailStr, ConfigDict, Field, ValidationInfo
 from pydantic_settings import BaseSettings
 
 
@@ -17,6 +17,14 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = '5432'
 
     DB_URL: str = 'postgresql+asyncpg://postgres@localhost:5432/database_name'
+    DB_ECHO: bool = False  # SQL statements in the logs
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_STATEMENT_TIMEOUT: float = 30.0  # Seconds a Postgres query may run, 0 - for no limit, routes may set their own
+    DB_SEARCH_STATEMENT_TIMEOUT: float = 5.0  # Seconds a contact search query may run
+    SLOW_QUERY_MS: int = 200  # Milliseconds, 0 - for disable slow query log
+    USER_LOADER_WINDOW_MS: float = 0.0  # Milliseconds concurrent user lookups are collected for, 0 - one event loop tick
+    USER_LOADER_MAX_BATCH: int = 100  # Users loaded by one query, 0 - for disable batching
 
     # Mail settings ----------------------------------------------------------------------------------
     MAIL_USERNAME: EmailStr = 'email@example.com'
@@ -26,6 +34,11 @@ class Settings(BaseSettings):
     MAIL_SMTP_PORT: str = '993'
     MAIL_IMAP_PORT: str = '465'
     VERIFY_EMAIL_TOKEN_LIFETIME: int = 1  # Days
+    EMAIL_OPEN_BUFFER_SIZE: int = 10000  # Open events kept in memory until flushed
+    EMAIL_OPEN_BATCH_SIZE: int = 500  # Open events per database transaction
+    EMAIL_OPEN_FLUSH_INTERVAL: float = 5.0  # Seconds
+    MAIL_TIMEOUT: float = 10.0  # Seconds an email may take to send, connecting included
+    MAIL_CONCURRENCY: int = 4  # Emails sent at once per worker
 
 
     # JWT Key --------------------------------------------------------------------------------------
@@ -33,12 +46,31 @@ class Settings(BaseSettings):
     ALGORITHM: str = 'HS256'
     TOKEN_LIFETIME: int = 15  # Minutes
     REFRESH_TOKEN_LIFETIME: int = 7  # Days
+    VERIFIED_TOKEN_CACHE_SIZE: int = 10000  # Tokens, 0 - for disable cache
+    BCRYPT_WORKERS: int = 4  # Threads hashing and verifying passwords
+    # Seconds an authenticated user is reused by a worker, 0 - for disable cache. A change is seen at once by the
+    # worker that made it only: the others, e.g. after a role change or a ban, keep the previous user until then
+    AUTH_USER_CACHE_TTL: float = 10.0
+    TOKEN_REVOCATION_CHECK: bool = False  # Reject access tokens issued before a per-user revocation, one Redis GET per request
 
     # Redis --------------------------------------------------------------------------------------
     REDIS_DOMAIN: str = 'localhost'
     REDIS_PORT: str = '6379'
     REDIS_PASSWORD: str | None = None
-    REDIS_URL: str = 'redis://${REDIS_USER}:${REDIS_PASSWORD}@${REDIS_DOMAIN}:${REDIS_PORT}/${REDIS_DB}'
+    REDIS_DB: int = 0
+    REDIS_URL: str = Field('', validate_default=True)  # Empty - built from the settings above
+    REDIS_MAX_CONNECTIONS: int = 50  # Per pool
+    REDIS_POOL_TIMEOUT: float = 5.0  # Seconds a command waits for a free connection of its pool
+    REDIS_SOCKET_TIMEOUT: float = 2.0  # Seconds
+    REDIS_CONNECT_TIMEOUT: float = 2.0  # Seconds
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # Seconds a connection may be idle before it is pinged on checkout
+    REDIS_SEPARATE_POOLS: str = ''  # Comma separated workloads with a pool of their own: cache, limiter, tokens
+    REDIS_OPERATION_TIMEOUT: float = 0.5  # Seconds a Redis call may take before the local fallback answers
+    REDIS_BREAKER_THRESHOLD: int = 5  # Consecutive Redis failures that switch to the local fallbacks
+    REDIS_BREAKER_BACKOFF: float = 1.0  # Seconds before Redis is probed again, doubled per failed probe
+    REDIS_BREAKER_MAX_BACKOFF: float = 30.0  # Seconds
+    # Responses cached per worker while Redis is unavailable, the other workers may serve stale ones until they expire
+    REDIS_FALLBACK_CACHE_SIZE: int = 1000
 
     # Cloudinary --------------------------------------------------------------------------------------
     CLOUDINARY_FOLDER: str = 'first_app'
@@ -46,6 +78,41 @@ class Settings(BaseSettings):
     CLOUDINARY_API_KEY: int = 123465790
     CLOUDINARY_API_SECRET: str = 'secret'
     CLOUDINARY_URL: str = f'cloudinary://{CLOUDINARY_API_KEY}:{CLOUDINARY_API_SECRET}@{CLOUDINARY_NAME}'
+    CLOUDINARY_TIMEOUT: float = 15.0  # Seconds an upload may take
+    CLOUDINARY_CONCURRENCY: int = 4  # Uploads at once per worker
+
+    # Outbound integrations --------------------------------------------------------------------------
+    OUTBOUND_BREAKER_THRESHOLD: int = 5  # Consecutive failures that stop the calls to an SMTP or storage provider
+    OUTBOUND_BREAKER_BACKOFF: float = 5.0  # Seconds before the provider is probed again, doubled per failed probe
+    OUTBOUND_BREAKER_MAX_BACKOFF: float = 60.0  # Seconds
+
+    # Health checks --------------------------------------------------------------------------------------
+    HEALTH_PROBE_TIMEOUT: float = 2.0  # Seconds per dependency
+    HEALTH_CACHE_TTL: float = 5.0  # Seconds, 0 - for disable cache
+    HEALTH_POOL_SATURATION: float = 0.9  # Share of the pool in use that makes the instance not ready
+
+    # Admission control --------------------------------------------------------------------------------
+    LOOP_LAG_INTERVAL: float = 0.1  # Seconds between two event loop lag samples
+    LOOP_BLOCK_THRESHOLD: float = 0.0  # Seconds the event loop may be blocked before its stack is logged, 0 - off
+    ADMISSION_MAX_LOOP_LAG: float = 0.5  # Seconds of event loop lag from which low-priority routes are shed, 0 - off
+    ADMISSION_MAX_POOL_WAIT: float = 1.0  # Seconds the oldest database checkout may wait, 0 - off
+    ADMISSION_MAX_IN_FLIGHT: int = 100  # Requests in flight per worker, 0 - off
+    ADMISSION_RETRY_AFTER: int = 1  # Seconds, the Retry-After of the shed requests
+
+    # Logging --------------------------------------------------------------------------------------
+    LOG_FORMAT: str = 'json'  # json | text
+    LOG_SAMPLE_RATES: str = ''  # Share of the records kept by logger, e.g. "uvicorn.error.requests=0.1", '' - all
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting to be written, the next ones are dropped
+
+    # Metrics --------------------------------------------------------------------------------------
+    METRICS_MULTIPROC_DIR: str | None = None  # Shared by the uvicorn workers, None - for a single process
+    METRICS_FLUSH_INTERVAL: int = 5  # Seconds
+    METRICS_TOKEN: str | None = None  # Bearer token of the scraper, None - open, keep /metrics behind the proxy
+
+    # Deployment --------------------------------------------------------------------------------------
+    # Comma separated router groups: api, pages, health, email_tracking, profiler, metrics.
+    # E.g. 'api,health,metrics' for an API-only worker without the HTML and static routes
+    ENABLED_ROUTERS: str = 'api,pages,health,email_tracking,profiler,metrics'
 
     # Temporary code --------------------------------------------------------------------------------------
     TEMP_CODE_LIFETIME: int = 15  # minutes
@@ -60,6 +127,16 @@ class Settings(BaseSettings):
             raise ValueError('Algorithm must be HS256 or HS512.')
         return v
 
+    @field_validator('REDIS_URL')
+    @classmethod
+    def build_redis_url(cls, v, info: ValidationInfo):
+        # An unset URL, or a template the environment did not interpolate, is built from its parts
+        if v and '${' not in v:
+            return v
+        data = info.data
+        password = f":{data['REDIS_PASSWORD']}@" if data.get('REDIS_PASSWORD') else ''
+        return f"redis://{password}{data['REDIS_DOMAIN']}:{data['REDIS_PORT']}/{data['REDIS_DB']}"
+
     model_config = ConfigDict(extra = 'ignore', env_file = '.env', env_file_encoding = 'utf-8') # noqa
         # env_file = ConfigDict(extra='ignore', env_file='.env', env_file_encoding='utf-8')
         # extra = 'ignore'
@@ -11,5 +11,11 @@ CONTACT_ALREADY_EXISTS = 'Contact already exists'
 CONTACT_NOT_FOUND = 'Contact not found'
 USER_NOT_FOUND = 'User not found'
 INVALID_SCOPE_TOKEN = 'Invalid scope token'
+INVALID_SYNC_TOKEN = 'Invalid sync token'
+PROFILER_BUSY = 'A profile is already running on this worker'
+STORAGE_UNAVAILABLE = 'The image storage is unavailable, try again later'
+QUERY_TIMEOUT = 'The query took too long, try narrower filters'
+OVERLOADED = 'The service is overloaded, try again later'
+METRICS_UNAUTHORIZED = 'Invalid metrics token'
 
-# TODO REPLACE ALL ERROR MESSAGES IN PROJECT
\ No newline at end of file
+# TODO REPLACE ALL ERROR MESSAGES IN PROJECT
@@ -1,27 +1,91 @@
 import contextlib
 import logging
 
-from sqlalchemy.exc import SQLAlchemyError
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from conf.config import app_config
+from database.instrumentation import instrument_engine, TimedQueuePool
+from src.services.metrics import db_pool_checked_out
 
 logger = logging.getLogger("uvicorn.error")
+# The SQLSTATE of a query cancelled by its statement timeout or by a cancel request
+QUERY_CANCELED = '57014'
+
+
+def _apply_statement_timeout(session: Session, transaction, connection) -> None:
+    # A route deadline, for the transaction only: the connection keeps the DB_STATEMENT_TIMEOUT default
+    timeout = session.info.get('statement_timeout')
+    if timeout and connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout * 1000)}')
+
+
+def is_query_canceled(error: DBAPIError) -> bool:
+    """
+    :return: Whether the query was cancelled by the server, e.g. when its statement timeout passed.
+    :rtype: bool
+    """
+    return getattr(error.orig, 'sqlstate', None) == QUERY_CANCELED
+
 
 class DatabaseSessionManager:
+    """
+    Owns the engine and the session factory. The engine, and with it the database driver, is only
+    created on first use, so importing the app does not pay for it.
+
+    :param url: The database URL.
+    :type url: str
+    """
+
     def __init__(self, url: str):
-        self._engine: AsyncEngine | None = create_async_engine(url, echo=True)
-        self._session_maker: async_sessionmaker = async_sessionmaker(
+        self.url = url
+        self._engine: AsyncEngine | None = None
+        self._session_maker: async_sessionmaker | None = None
+
+    def _create_engine(self) -> None:
+        connect_args = {}
+        if self.url.startswith('postgresql+asyncpg') and app_config.DB_STATEMENT_TIMEOUT:
+            # Set once per connection, without a round trip per transaction
+            connect_args['server_settings'] = {'statement_timeout': str(int(app_config.DB_STATEMENT_TIMEOUT * 1000))}
+        self._engine = create_async_engine(
+            self.url,
+            poolclass=TimedQueuePool,
+            pool_size=app_config.DB_POOL_SIZE,
+            max_overflow=app_config.DB_MAX_OVERFLOW,
+            connect_args=connect_args,
+        )
+        db_pool_checked_out.set_function(self._engine.pool.checkedout)
+        instrument_engine(self._engine.sync_engine, app_config.SLOW_QUERY_MS)
+        sync_session_maker = sessionmaker()
+        event.listen(sync_session_maker, 'after_begin', _apply_statement_timeout)
+        self._session_maker = async_sessionmaker(
             autocommit=False,
             autoflush=False,
-            bind=self._engine
+            expire_on_commit=False,
+            bind=self._engine,
+            sync_session_class=sync_session_maker,
         )
 
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._create_engine()
+        return self._engine
+
     @contextlib.asynccontextmanager
-    async def session(self):
+    async def session(self, statement_timeout: float | None = None):
+        """
+        :param statement_timeout: Seconds the queries of a transaction may run on Postgres, the
+            ``DB_STATEMENT_TIMEOUT`` of the connection by default.
+        :type statement_timeout: float | None
+        """
         if self._session_maker is None:
-            raise Exception('Session maker not defined')
+            self._create_engine()
         session = self._session_maker()
+        session.info['statement_timeout'] = statement_timeout
         try:
             yield session
         except SQLAlchemyError as error:
@@ -31,10 +95,61 @@ class DatabaseSessionManager:
         finally:
             await session.close()
 
+    async def ping(self) -> None:
+        """
+        Run ``SELECT 1`` on a pooled connection, outside of any request session.
+        """
+        async with self.engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+
+    async def close(self) -> None:
+        """
+        Close the pooled connections, the engine is created again on next use.
+        """
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine, self._session_maker = None, None
+
+    def pool_wait(self) -> float:
+        """
+        :return: Seconds the longest pending connection checkout has been waiting.
+        :rtype: float
+        """
+        return self._engine.pool.current_wait() if self._engine is not None else 0.0
+
+    def pool_status(self) -> dict:
+        """
+        The usage of the connection pool.
+
+        :return: The pool capacity, the connections checked out and their share of the capacity.
+        :rtype: dict
+        """
+        capacity = app_config.DB_POOL_SIZE + app_config.DB_MAX_OVERFLOW
+        checked_out = self._engine.pool.checkedout() if self._engine is not None else 0
+        return {'capacity': capacity, 'checked_out': checked_out, 'usage': round(checked_out / capacity, 3)}
+
 
 sessionmanager = DatabaseSessionManager(app_config.DB_URL)
 
 
-async def get_db():
-    async with sessionmanager.session() as session:
+class StatementTimeout:
+    """
+    Route dependency setting the deadline of the route's queries, listed before the dependencies
+    that open the database session:
+
+        @router.get('/all', dependencies=[Depends(StatementTimeout(seconds=5))])
+
+    :param seconds: Seconds every query of the request may run.
+    :type seconds: float
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def __call__(self, request: Request) -> None:
+        request.state.statement_timeout = self.seconds
+
+
+async def get_db(request: Request):
+    async with sessionmanager.session(getattr(request.state, 'statement_timeout', None)) as session:
         yield session
@@ -0,0 +1,123 @@
+import logging
+import re
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.services.metrics import db_pool_checkout_wait
+
+logger = logging.getLogger("uvicorn.error")
+
+_QUOTED = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"\$\d+(?:::\w+(?:\(\d+\))?)?|%\(\w+\)s|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"IN \((?:\?, )+\?\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryStats:
+    """
+    Number of statements and the time spent executing them within one request.
+    """
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+
+    def server_timing(self, total: float) -> str:
+        """
+        Render the stats as a ``Server-Timing`` header value.
+
+        :param total: The whole request time, in seconds.
+        :type total: float
+        :return: The header value.
+        :rtype: str
+        """
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries", app;dur={total * 1000:.2f}'
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool recording how long each checkout waited for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The start of the checkouts in progress, oldest first
+        self._checkouts: dict[object, float] = {}
+
+    def _do_get(self):
+        started = time.perf_counter()
+        checkout = object()
+        self._checkouts[checkout] = started
+        try:
+            return super()._do_get()
+        finally:
+            del self._checkouts[checkout]
+            db_pool_checkout_wait.observe(time.perf_counter() - started)
+
+    def current_wait(self) -> float:
+        """
+        :return: Seconds the longest checkout in progress has been waiting, 0 if none is.
+        :rtype: float
+        """
+        for started in self._checkouts.values():
+            return time.perf_counter() - started
+        return 0.0
+
+
+query_stats: ContextVar[QueryStats | None] = ContextVar('query_stats', default=None)
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Replace literals and bind parameters with ``?`` so that the same query always logs the same way.
+
+    :param statement: The SQL statement.
+    :type statement: str
+    :return: The normalized statement.
+    :rtype: str
+    """
+    statement = _QUOTED.sub('?', statement)
+    statement = _PLACEHOLDER.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    return _IN_LIST.sub('IN (?)', statement)
+
+
+def instrument_engine(engine: Engine, slow_query_ms: int = 0) -> None:
+    """
+    Count and time every statement of the engine into the current ``query_stats`` and log the slow ones.
+
+    :param engine: The sync engine, ``AsyncEngine.sync_engine`` for the async one.
+    :type engine: Engine
+    :param slow_query_ms: Statements running at least this long are logged, 0 - for disable.
+    :type slow_query_ms: int
+    """
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['query_started'].pop()
+        stats = query_stats.get()
+        if stats is not None:
+            stats.add(duration)
+        if slow_query_ms and duration * 1000 >= slow_query_ms:
+            logger.warning(f"Slow query {duration * 1000:.1f} ms: {normalize_statement(statement)}")
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(exception_context):
+        started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+        if started:
+            started.pop()
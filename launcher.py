@@ -0,0 +1,318 @@
+"""
+Production launcher: a master process that owns the listening socket and forks uvicorn workers.
+
+- The app is imported in the master before forking, so the workers share the imported code and data
+  copy-on-write. With ``--no-preload`` every worker imports it itself, which a reload then picks up.
+- ``SIGHUP`` restarts the workers one at a time: a new worker is started, and only once its lifespan
+  startup completed the old one is asked to stop. The socket stays open, no connection is refused.
+- ``SIGTERM`` and ``SIGINT`` stop the workers gracefully: they stop accepting, finish the requests in
+  flight within ``--graceful-timeout`` and run the lifespan shutdown.
+- A worker that dies is replaced, a worker that fails to boot stops the launcher.
+
+Usage::
+
+    python -m launcher --host 0.0.0.0 --port 8000 --workers 4
+    kill -HUP <master pid>  # rolling restart
+"""
+import argparse
+import logging
+import logging.config
+import os
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+from uvicorn.importer import import_from_string
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    A uvicorn server that tells the master when its lifespan startup completed.
+
+    :param config: The uvicorn config.
+    :type config: uvicorn.Config
+    :param ready_fd: The pipe the readiness byte is written to.
+    :type ready_fd: int
+    """
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        await super().startup(sockets=sockets)
+        if not self.should_exit:
+            os.write(self.ready_fd, b'1')
+        os.close(self.ready_fd)
+
+
+@dataclass
+class Worker:
+    pid: int
+    ready_fd: int | None
+    ready: bool = False
+    retiring: bool = False
+
+
+def _exit_on_signal(signum, frame):
+    sys.exit(0)
+
+
+class Launcher:
+    """
+    The master process.
+
+    :param app: The app import string, ``module:attribute``.
+    :type app: str
+    :param host: The address to bind.
+    :type host: str
+    :param port: The port to bind.
+    :type port: int
+    :param workers: The number of worker processes.
+    :type workers: int
+    :param preload: Import the app in the master before forking.
+    :type preload: bool
+    :param graceful_timeout: Seconds a stopping worker has to finish its requests.
+    :type graceful_timeout: float
+    :param ready_timeout: Seconds a new worker has to complete its startup.
+    :type ready_timeout: float
+    :param log_level: The uvicorn log level of the workers.
+    :type log_level: str
+    """
+
+    def __init__(self, app: str, host: str, port: int, workers: int, preload: bool = True,
+                 graceful_timeout: float = 30.0, ready_timeout: float = 60.0, log_level: str = 'info'):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.preload = preload
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.log_level = log_level
+        self.workers: dict[int, Worker] = {}
+        self.socket: socket.socket | None = None
+        self.loaded_app = None
+        self._wakeup_fds: tuple[int, int] | None = None
+        self._stopping = False
+
+    def bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def run(self) -> int:
+        """
+        Serve until ``SIGTERM`` or ``SIGINT``.
+
+        :return: The exit code.
+        :rtype: int
+        """
+        self.socket = self.bind()
+        if self.preload:
+            self.loaded_app = import_from_string(self.app)
+
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        os.set_blocking(write_fd, False)
+        self._wakeup_fds = (read_fd, write_fd)
+        # The handlers do nothing, the signal numbers are read from the wakeup pipe by the main loop
+        signal.set_wakeup_fd(write_fd)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, lambda *args: None)
+
+        logger.info(f"Launcher [{os.getpid()}] listening on {self.host}:{self.port} "
+                    f"with {self.worker_count} workers, preload={self.preload}")
+        for _ in range(self.worker_count):
+            self.spawn()
+
+        exit_code = 0
+        while not self._stopping:
+            pending = [worker.ready_fd for worker in self.workers.values() if worker.ready_fd is not None]
+            readable, _, _ = select.select([read_fd, *pending], [], [], 1.0)
+            for fd in readable:
+                if fd != read_fd:
+                    self.read_ready(fd)
+            if read_fd in readable:
+                for signum in self.read_signals():
+                    if signum in (signal.SIGTERM, signal.SIGINT):
+                        logger.info(f"Launcher received {signal.Signals(signum).name}, stopping the workers")
+                        self._stopping = True
+                    elif signum == signal.SIGHUP:
+                        self.rolling_restart()
+            if not self._stopping and not self.reap():
+                exit_code = 1
+                self._stopping = True
+
+        self.stop()
+        return exit_code
+
+    def read_signals(self) -> bytes:
+        try:
+            return os.read(self._wakeup_fds[0], 1024)
+        except BlockingIOError:
+            return b''
+
+    def spawn(self) -> Worker:
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            code = 0
+            try:
+                self.run_worker(ready_write)
+            except SystemExit as exit_:
+                code = exit_.code if isinstance(exit_.code, int) else 0
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(ready_write)
+        worker = self.workers[pid] = Worker(pid, ready_read)
+        logger.info(f"Launcher started worker [{pid}]")
+        return worker
+
+    def run_worker(self, ready_fd: int) -> None:
+        signal.set_wakeup_fd(-1)
+        for fd in self._wakeup_fds:
+            os.close(fd)
+        for worker in self.workers.values():
+            if worker.ready_fd is not None:
+                os.close(worker.ready_fd)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        # Until uvicorn installs its handlers, and after it restores them, a stop request just exits
+        signal.signal(signal.SIGTERM, _exit_on_signal)
+        signal.signal(signal.SIGINT, _exit_on_signal)
+
+        config = uvicorn.Config(self.loaded_app if self.preload else self.app, lifespan='on',
+                                timeout_graceful_shutdown=self.graceful_timeout, log_level=self.log_level)
+        WorkerServer(config, ready_fd).run(sockets=[self.socket])
+
+    def read_ready(self, fd: int) -> None:
+        worker = next(worker for worker in self.workers.values() if worker.ready_fd == fd)
+        if os.read(fd, 1):
+            worker.ready = True
+        os.close(fd)
+        worker.ready_fd = None
+
+    def wait_ready(self, worker: Worker) -> bool:
+        readable, _, _ = select.select([worker.ready_fd], [], [], self.ready_timeout)
+        if readable:
+            self.read_ready(worker.ready_fd)
+        return worker.ready
+
+    def rolling_restart(self) -> None:
+        """
+        Replace the workers one at a time, each old worker is stopped once its replacement is ready.
+        """
+        logger.info("Launcher rolling restart")
+        for old in [worker for worker in self.workers.values() if not worker.retiring]:
+            new = self.spawn()
+            if not self.wait_ready(new):
+                logger.error(f"Worker [{new.pid}] failed to start, rolling restart aborted")
+                self.kill(new)
+                return
+            if old.pid in self.workers:
+                self.terminate(old)
+        logger.info("Launcher rolling restart completed")
+
+    def terminate(self, worker: Worker) -> None:
+        worker.retiring = True
+        try:
+            os.kill(worker.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def kill(self, worker: Worker) -> None:
+        try:
+            os.kill(worker.pid, signal.SIGKILL)
+            os.waitpid(worker.pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        if worker.ready_fd is not None:
+            os.close(worker.ready_fd)
+        self.workers.pop(worker.pid, None)
+
+    def reap(self) -> bool:
+        """
+        Collect the exited workers and replace the ones that were not asked to stop.
+
+        :return: False if a worker exited before it was ready, the app cannot start.
+        :rtype: bool
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return True
+            if pid == 0:
+                return True
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            if worker.ready_fd is not None:
+                self.read_ready(worker.ready_fd)
+            if worker.retiring:
+                logger.info(f"Worker [{pid}] stopped")
+                continue
+            if not worker.ready:
+                logger.error(f"Worker [{pid}] failed to boot, exit status {os.waitstatus_to_exitcode(status)}")
+                return False
+            logger.warning(f"Worker [{pid}] died, exit status {os.waitstatus_to_exitcode(status)}, replacing it")
+            self.spawn()
+
+    def stop(self) -> None:
+        """
+        Ask every worker to drain and stop, kill the ones still running after the graceful timeout.
+        """
+        for worker in list(self.workers.values()):
+            self.terminate(worker)
+        # The workers also need the time of their lifespan shutdown
+        deadline = time.monotonic() + self.graceful_timeout + 10
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for worker in list(self.workers.values()):
+            logger.error(f"Worker [{worker.pid}] did not stop in time, killing it")
+            self.kill(worker)
+        self.socket.close()
+        logger.info("Launcher stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-worker launcher with preload and graceful drain')
+    parser.add_argument('--app', default='main:app')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='Import the app in every worker, a SIGHUP then reloads the code')
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    parser.add_argument('--ready-timeout', type=float, default=60.0)
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+
+    logging.config.dictConfig(LOGGING_CONFIG)
+    logger.setLevel(args.log_level.upper())
+    launcher = Launcher(args.app, args.host, args.port, args.workers, preload=args.preload,
+                        graceful_timeout=args.graceful_timeout, ready_timeout=args.ready_timeout,
+                        log_level=args.log_level)
+    sys.exit(launcher.run())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,104 @@
+import asyncio
+import contextlib
+import importlib
+import logging
 import re
+import time
 from contextlib import asynccontextmanager
 from typing import Callable, Dict
 
-from pathlib import Path
-
-from redis import asyncio as aioredis
-from fastapi import FastAPI, status, Request
+from fastapi import FastAPI, status, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
-from fastapi_limiter import FastAPILimiter
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
-from fastapi.templating import Jinja2Templates
+from fastapi_limiter import FastAPILimiter, http_default_callback
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError
 
 from conf import messages
-from src.contacts import routes_users as contacts_routes
-from src.contacts import routes_admin as contacts_admin_routes
-from src.services import health_checker, routes_email_status
-from src.services.auth import routes as auth_routes
-from src.users import routes as users_routes
+from database.db import is_query_canceled, sessionmanager
+from database.instrumentation import QueryStats, query_stats
+from src.services import metrics
+from src.services.admission import AdmissionMiddleware
+from src.services.email_tracking.buffer import email_open_buffer
+from src.services.loop_lag import loop_lag_monitor
+from src.services.redis_client import redis_clients
+from src.services.redis_fallback import ResilientCacheBackend, ResilientLimiterRedis
+from src.services.request_cancellation import CancelOnDisconnectMiddleware
+from src.services.request_context import RequestContextMiddleware
+from src.services.static_assets import static_assets
+from src.services.structured_logging import log_pipeline
 from conf.config import app_config
 
+logger = logging.getLogger("uvicorn.error")
+# One record per request, the logger LOG_SAMPLE_RATES samples
+request_logger = logging.getLogger("uvicorn.error.requests")
 user_agent_ban_list = []
-BASE_DIR = Path(__file__).parent
-templates_path = BASE_DIR.joinpath('src', 'templates')
-static_files_path = BASE_DIR.joinpath('src', 'static')
-FAVICON_PATH = BASE_DIR.joinpath('src', 'static', 'images', 'favicon.png')
-templates = Jinja2Templates(directory=templates_path)
+# Group: (module, prefix) of its routers. Only the modules of the groups in ENABLED_ROUTERS are imported.
+ROUTER_GROUPS = {
+    'api': [
+        ('src.services.auth.routes', '/api'),
+        ('src.users.routes', '/api'),
+        ('src.contacts.routes_admin', '/api'),
+        ('src.contacts.routes_users', '/api'),
+    ],
+    'pages': [('src.services.routes_pages', '')],
+    'health': [('src.services.health_checker', '/api')],
+    'email_tracking': [('src.services.routes_email_status', '/api')],
+    'profiler': [('src.services.routes_profiler', '/api')],
+    'metrics': [('src.services.metrics', '')],
+}
+
+
+def enabled_router_groups() -> list[str]:
+    groups = [group.strip() for group in app_config.ENABLED_ROUTERS.split(',') if group.strip()]
+    unknown = set(groups) - set(ROUTER_GROUPS)
+    if unknown:
+        raise ValueError(f'Unknown router groups in ENABLED_ROUTERS: {", ".join(sorted(unknown))}')
+    return groups
+
+
+async def rate_limit_callback(request: Request, response: Response, pexpire: int):
+    route = request.scope.get('route')
+    metrics.rate_limit_rejections.inc(route=route.path if route else request.url.path)
+    return await http_default_callback(request, response, pexpire)
+
+
+async def close_step(name: str, awaitable) -> None:
+    try:
+        await awaitable
+        logger.info(f"Shutdown: {name} closed")
+    except Exception as error:
+        logger.error(f"Shutdown: closing {name} failed: {error!r}")
 
 
 @asynccontextmanager
 async def lifespan(fastapi_app: FastAPI):
-    redis = aioredis.from_url(app_config.REDIS_URL, encoding='utf-8')
-    FastAPICache.init(RedisBackend(redis), prefix='fastapi_cache')
-    await FastAPILimiter.init(redis)
+    # First, so that the startup is logged through the queue
+    log_pipeline.start()
+    # One pool shared by the workloads, or one per workload listed in REDIS_SEPARATE_POOLS,
+    # with per-worker fallbacks while Redis is unavailable
+    FastAPICache.init(ResilientCacheBackend(redis_clients.get('cache')), prefix='fastapi_cache')
+    await FastAPILimiter.init(ResilientLimiterRedis(redis_clients.get('limiter')), http_callback=rate_limit_callback)
+    metrics_writer = asyncio.create_task(metrics.registry.write_periodically(app_config.METRICS_FLUSH_INTERVAL))
+    email_open_writer = asyncio.create_task(email_open_buffer.flush_periodically(app_config.EMAIL_OPEN_FLUSH_INTERVAL))
+    loop_lag_monitor.start()
+
+    # The database driver is loaded here rather than by the first request
+    sessionmanager.engine
 
     yield
-    # Shutdown events
-    await redis.close()
+    # Shutdown events, in dependency order: the requests are already drained by the server,
+    # the email outbox is flushed into the database, then the database engine and the Redis pools are closed
+    for task in (metrics_writer, email_open_writer):
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await loop_lag_monitor.stop()
+    await close_step('email outbox', email_open_buffer.close())
+    metrics.registry.write()
+    await close_step('database engine', sessionmanager.close())
+    await close_step('redis pools', redis_clients.aclose())
+    log_pipeline.stop()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -51,13 +111,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.mount('/static', StaticFiles(directory=static_files_path), name="static")
-app.include_router(auth_routes.router, prefix="/api")
-app.include_router(users_routes.router, prefix="/api")
-app.include_router(contacts_admin_routes.router, prefix="/api")
-app.include_router(contacts_routes.router, prefix="/api")
-app.include_router(health_checker.router, prefix="/api")
-app.include_router(routes_email_status.router, prefix="/api")
+for router_group in enabled_router_groups():
+    for module_name, prefix in ROUTER_GROUPS[router_group]:
+        app.include_router(importlib.import_module(module_name).router, prefix=prefix)
+    if router_group == 'pages':
+        app.mount('/static', static_assets.files(), name="static")
 
 
 @app.middleware('http')
@@ -76,20 +134,58 @@ async def user_agent_ban_middleware(request: Request, call_next: Callable):
         raise
 
 
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    return JSONResponse(
-        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={"detail": messages.INTERNAL_SERVER_ERROR}
+@app.middleware('http')
+async def request_instrumentation_middleware(request: Request, call_next: Callable):
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        query_stats.reset(token)
+    total = time.perf_counter() - started
+    route = request.scope.get('route')
+    route = route.path if route else 'unmatched'
+    metrics.http_requests.inc(method=request.method, route=route, status=response.status_code)
+    metrics.http_request_duration.observe(total, method=request.method, route=route)
+    response.headers['Server-Timing'] = stats.server_timing(total)
+    request_logger.info(
+        f"{request.method} {request.url.path} status={response.status_code} duration_ms={total * 1000:.2f} "
+        f"db_queries={stats.count} db_ms={stats.duration * 1000:.2f}",
+        extra={'method': request.method, 'path': request.url.path, 'status_code': response.status_code,
+               'duration_ms': total * 1000, 'db_queries': stats.count, 'db_ms': stats.duration * 1000}
     )
+    return response
 
 
-@app.get("/favicon.ico", include_in_schema=False)
-async def favicon():
-    return FileResponse(FAVICON_PATH)
+# Around the http middleware, so that the handler is cancelled with every middleware it runs in
+app.add_middleware(CancelOnDisconnectMiddleware)  # type: ignore
+# The shed requests cost no more than a route lookup
+app.add_middleware(
+    AdmissionMiddleware,  # type: ignore
+    routes=app.routes,
+    loop_lag=lambda: loop_lag_monitor.lag,
+    pool_wait=sessionmanager.pool_wait,
+)
+# Outermost, the request scope is in the context of every task of the request
+app.add_middleware(RequestContextMiddleware)  # type: ignore
 
 
-@app.get("/", response_class=HTMLResponse)
-def index(request: Request):
-    return templates.TemplateResponse('index.html', {'request': request, 'page_title': 'Python Test Landing Page'})
+@app.exception_handler(DBAPIError)
+async def database_error_handler(request: Request, exc: DBAPIError):
+    if not is_query_canceled(exc):
+        return await global_exception_handler(request, exc)
+    route = request.scope.get('route')
+    metrics.db_statement_timeouts.inc(route=route.path if route else 'unmatched')
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": messages.QUERY_TIMEOUT}
+    )
 
+
+@app.exception_handler(Exception)
+async def global_exception_handler(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        content={"detail": messages.INTERNAL_SERVER_ERROR}
+    )
@@ -12,6 +12,7 @@ from conf.config import Base
 from src.contacts.models import Contact
 from src.users.models import User
 from src.services.temp_code.model import TemporaryCode
+from src.services.email_tracking.model import EmailOpenEvent, EmailOpenStats
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
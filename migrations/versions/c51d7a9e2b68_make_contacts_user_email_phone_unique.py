@@ -0,0 +1,33 @@
+"""Make contacts (user_id, email, phone) unique
+
+Revision ID: c51d7a9e2b68
+Revises: 8b2e4d6f0a13
+Create Date: 2026-10-19 12:21:05.117436
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c51d7a9e2b68'
+down_revision: Union[str, None] = '8b2e4d6f0a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the oldest row of every duplicate left by the former exists-check-then-insert race
+    op.execute(
+        "DELETE FROM contacts c USING contacts d "
+        "WHERE c.user_id = d.user_id AND c.email = d.email AND c.phone = d.phone AND c.id > d.id"
+    )
+    op.drop_index('ix_contacts_user_id_email_phone', table_name='contacts')
+    op.create_index('ix_contacts_user_id_email_phone', 'contacts', ['user_id', 'email', 'phone'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_email_phone', table_name='contacts')
+    op.create_index('ix_contacts_user_id_email_phone', 'contacts', ['user_id', 'email', 'phone'], unique=False)
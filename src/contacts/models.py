@@ -1,13 +1,18 @@
-from sqlalchemy import String, DateTime, func, Integer, ForeignKey
+from sqlalchemy import String, DateTime, func, Integer, ForeignKey, Index, text
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.testing.pickleable import User
 
 from conf.config import Base
 
 
 class Contact(Base):
     __tablename__ = 'contacts'
+    __table_args__ = (
+        Index('ix_contacts_user_id_updated_at_id', 'user_id', 'updated_at', 'id'),
+        Index('ix_contacts_user_id_email_phone', 'user_id', 'email', 'phone', unique=True),
+        Index('ix_contacts_user_id_birthday_doy', 'user_id', func.date_part('doy', text('birthday')),
+              postgresql_where=text('birthday IS NOT NULL')).ddl_if(dialect='postgresql'),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     first_name: Mapped[str] = mapped_column(String(50), nullable=False)
     last_name: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -17,8 +22,8 @@ class Contact(Base):
     description: Mapped[str] = mapped_column(String(300), nullable=True)
 
     created_at: Mapped[DateTime] = mapped_column('created_at', DateTime, nullable=True, default=func.now())
-    updated_at: Mapped[DateTime] = mapped_column('updated_at', DateTime, nullable=True, default=func.now(),
-                                                 onupdate=func.now())
+    updated_at: Mapped[DateTime] = mapped_column('updated_at', DateTime, nullable=False, default=func.now(),
+                                                 server_default=func.now(), onupdate=func.now())
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'))
     user: Mapped['User'] = relationship('User', backref='contacts', lazy='joined')
 
@@ -29,3 +34,14 @@ class Contact(Base):
     @fullname.expression
     def fullname(cls) -> str:
         return func.concat(cls.first_name, ' ', cls.last_name)
+
+
+class DeletedContact(Base):
+    __tablename__ = 'deleted_contacts'
+    __table_args__ = (
+        Index('ix_deleted_contacts_user_id_deleted_at_id', 'user_id', 'deleted_at', 'id'),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    contact_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
+    deleted_at: Mapped[DateTime] = mapped_column('deleted_at', DateTime, nullable=False, default=func.now())
@@ -1,12 +1,16 @@
-from datetime import date, timedelta
+import base64
+import json
+from datetime import date, datetime, timedelta
 
 from fastapi_cache.decorator import cache
-from sqlalchemy import select, func, or_, and_
+from sqlalchemy import select, update, delete, func, or_, and_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from conf.cache import clear_cache, custom_key_builder
-from src.contacts.models import Contact
+from src.contacts.models import Contact, DeletedContact
 from src.contacts.schemas import ContactSchema, ContactUpdateSchema
+from src.services.metrics import cache_misses
 from src.users.models import User
 
 
@@ -118,6 +122,7 @@ async def get_my_contacts(db: AsyncSession, user: User, limit: int = 10, skip: i
     :return: A list of contacts
     :rtype: List[Contact]
     """
+    cache_misses.inc(namespace='get_my_contacts')
     stmt = select(Contact).filter_by(user_id=user.id)
     stmt = stmt.offset(skip).limit(limit)
     stmt = await apply_contact_filters(stmt, days, email, fullname)
@@ -144,30 +149,39 @@ async def get_contact_by_id(contact_id: int, db: AsyncSession, user: User) -> Co
     return contact.scalar_one_or_none()
 
 
-async def create_contact(body: ContactSchema, db: AsyncSession, user: User) -> Contact:
+async def create_contact(body: ContactSchema, db: AsyncSession, user: User) -> Contact | None:
     """
     Create a new contact for the given user.
 
+    The contact is inserted with a single ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` statement,
+    so a duplicate (user, email, phone) is detected by the unique index instead of a separate lookup.
+
     :param body: The data for the new contact
     :type body: ContactSchema
     :param db: The database session
     :type db: AsyncSession
     :param user: The user object containing the user's details
     :type user: User
-    :return: The created contact object
-    :rtype: Contact
+    :return: The created contact object, or None if the contact already exists
+    :rtype: Contact | None
     """
-    await clear_cache(user.id)
-    contact = Contact(**body.model_dump(exclude_unset=True), user=user)
-    db.add(contact)
+    stmt = (
+        insert(Contact)
+        .values(**body.model_dump(exclude_unset=True), user_id=user.id)
+        .on_conflict_do_nothing(index_elements=['user_id', 'email', 'phone'])
+        .returning(Contact)
+    )
+    result = await db.execute(stmt)
+    contact = result.scalar_one_or_none()
     await db.commit()
-    await db.refresh(contact)
+    if contact:
+        await clear_cache(user.id)
     return contact
 
 
 async def update_contact(contact_id: int, body: ContactUpdateSchema, db: AsyncSession, user: User):
     """
-    Update a contact by id.
+    Update a contact by id with a single ``UPDATE ... RETURNING`` statement.
 
     :param contact_id: The id of the contact to update
     :type contact_id: int
@@ -180,25 +194,23 @@ async def update_contact(contact_id: int, body: ContactUpdateSchema, db: AsyncSe
     :return: The updated contact or None if not found
     :rtype: Optional[Contact]
     """
-    stmt = select(Contact).filter_by(id=contact_id, user=user)
+    stmt = (
+        update(Contact)
+        .where(Contact.id == contact_id, Contact.user_id == user.id)
+        .values(**body.model_dump(exclude_unset=True))
+        .returning(Contact)
+    )
     result = await db.execute(stmt)
     contact = result.scalar_one_or_none()
-
+    await db.commit()
     if contact:
-        for key, value in body.model_dump(exclude_unset=True).items():
-            setattr(contact, key, value)
-
-        db.add(contact)
-        await db.commit()
-        await db.refresh(contact)
         await clear_cache(user.id)
-
     return contact
 
 
 async def delete_contact(contact_id: int, db: AsyncSession, user: User):
     """
-    Delete a contact by id.
+    Delete a contact by id with a single ``DELETE ... RETURNING`` statement and log its tombstone.
 
     :param contact_id: The id of the contact to delete
     :type contact_id: int
@@ -209,12 +221,115 @@ async def delete_contact(contact_id: int, db: AsyncSession, user: User):
     :return: The deleted contact or None if not found
     :rtype: Optional[Contact]
     """
-    await clear_cache(user.id)
-    stmt = select(Contact).filter_by(id=contact_id, user=user)
-    contact = await db.execute(stmt)
-    contact = contact.scalar_one_or_none()
+    stmt = delete(Contact).where(Contact.id == contact_id, Contact.user_id == user.id).returning(Contact)
+    result = await db.execute(stmt)
+    contact = result.scalar_one_or_none()
     if contact:
-        await db.delete(contact)
+        db.add(DeletedContact(contact_id=contact.id, user_id=user.id))
         await db.commit()
+        await clear_cache(user.id)
     return contact
 
+
+def encode_sync_token(contacts_cursor: tuple | None, deleted_cursor: tuple | None) -> str:
+    """
+    Pack the contacts and tombstones cursors into an opaque sync token.
+
+    :param contacts_cursor: The (updated_at, id) of the last contact sent to the client, or None.
+    :type contacts_cursor: tuple | None
+    :param deleted_cursor: The (deleted_at, id) of the last tombstone sent to the client, or None.
+    :type deleted_cursor: tuple | None
+    :return: The URL-safe sync token.
+    :rtype: str
+    """
+    payload = {
+        'c': [contacts_cursor[0].isoformat(), contacts_cursor[1]] if contacts_cursor else None,
+        'd': [deleted_cursor[0].isoformat(), deleted_cursor[1]] if deleted_cursor else None,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_sync_token(token: str) -> tuple[tuple | None, tuple | None]:
+    """
+    Unpack a sync token produced by :func:`encode_sync_token`.
+
+    :param token: The sync token received from the client.
+    :type token: str
+    :return: The contacts cursor and the tombstones cursor.
+    :rtype: tuple[tuple | None, tuple | None]
+    :raises ValueError: If the token is malformed.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        cursors = []
+        for key in ('c', 'd'):
+            cursor = payload[key]
+            cursors.append((datetime.fromisoformat(cursor[0]), int(cursor[1])) if cursor else None)
+    except (ValueError, TypeError, KeyError, IndexError) as error:
+        raise ValueError('Invalid sync token') from error
+    return cursors[0], cursors[1]
+
+
+async def get_contact_changes(db: AsyncSession, user: User, since: str = None, limit: int = 100) -> dict:
+    """
+    Retrieve the contacts created or updated and the tombstones of contacts deleted since the sync token.
+
+    Both streams are paged by a ``(user_id, updated_at, id)`` / ``(user_id, deleted_at, id)`` cursor, so the
+    cost of a sync is proportional to the number of changes, not to the size of the address book.
+    Without a token a full snapshot is returned and the tombstones cursor starts at the latest deletion.
+
+    :param db: The database session
+    :type db: AsyncSession
+    :param user: The user object containing the user's details
+    :type user: User
+    :param since: The sync token returned by the previous call, or None for the initial sync
+    :type since: str
+    :param limit: The maximum number of contacts and of tombstones to return
+    :type limit: int
+    :return: The changed contacts, the tombstones, the next sync token and whether more changes are pending
+    :rtype: dict
+    :raises ValueError: If the sync token is malformed.
+    """
+    contacts_cursor, deleted_cursor = decode_sync_token(since) if since else (None, None)
+
+    stmt = select(Contact).filter_by(user_id=user.id)
+    if contacts_cursor:
+        updated_at, contact_id = contacts_cursor
+        stmt = stmt.where(or_(Contact.updated_at > updated_at,
+                              and_(Contact.updated_at == updated_at, Contact.id > contact_id)))
+    stmt = stmt.order_by(Contact.updated_at, Contact.id).limit(limit + 1)
+    result = await db.execute(stmt)
+    changes = list(result.scalars().all())
+
+    deleted = []
+    if since:
+        stmt = select(DeletedContact).filter_by(user_id=user.id)
+        if deleted_cursor:
+            deleted_at, tombstone_id = deleted_cursor
+            stmt = stmt.where(or_(DeletedContact.deleted_at > deleted_at,
+                                  and_(DeletedContact.deleted_at == deleted_at, DeletedContact.id > tombstone_id)))
+        stmt = stmt.order_by(DeletedContact.deleted_at, DeletedContact.id).limit(limit + 1)
+        result = await db.execute(stmt)
+        deleted = list(result.scalars().all())
+    else:
+        stmt = (select(DeletedContact).filter_by(user_id=user.id)
+                .order_by(DeletedContact.deleted_at.desc(), DeletedContact.id.desc()).limit(1))
+        result = await db.execute(stmt)
+        latest = result.scalar_one_or_none()
+        if latest:
+            deleted_cursor = (latest.deleted_at, latest.id)
+
+    has_more = len(changes) > limit or len(deleted) > limit
+    changes, deleted = changes[:limit], deleted[:limit]
+    if changes:
+        contacts_cursor = (changes[-1].updated_at, changes[-1].id)
+    if deleted:
+        deleted_cursor = (deleted[-1].deleted_at, deleted[-1].id)
+
+    return {
+        'changes': changes,
+        'deleted': deleted,
+        'next_token': encode_sync_token(contacts_cursor, deleted_cursor),
+        'has_more': has_more,
+    }
+
@@ -3,22 +3,24 @@ from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from conf import messages
-from database.db import get_db
+from conf.config import app_config
+from database.db import get_db, StatementTimeout
 from src.contacts import repository as repo_contacts
 from src.contacts.schemas import ContactResponseSchema
-from src.services.auth.jwt_auth import auth_service
+from src.services.admission import Priority, route_priorities
 from src.users.repository import get_user_by_id
 from src.users.roles_checker import RoleChecker
-from src.users.models import User
 from src.users.schemas import RoleEnum
 
 
 router = APIRouter(prefix="/contacts", tags=["admin options"])
+route_priorities.declare(router, Priority.LOW)
 access_to_all_routes = RoleChecker([RoleEnum.ADMIN])
 
 
 @router.get('/all', response_model=list[ContactResponseSchema],
-            dependencies=[Depends(access_to_all_routes), Depends(RateLimiter(times=5, seconds=60))])
+            dependencies=[Depends(StatementTimeout(app_config.DB_SEARCH_STATEMENT_TIMEOUT)), Depends(access_to_all_routes),
+                          Depends(RateLimiter(times=5, seconds=60))])
 async def get_all_contacts_by_filters(
         limit: int = Query(10, ge=10, le=100),
         offset: int = Query(None, ge=0),
@@ -26,10 +28,9 @@ async def get_all_contacts_by_filters(
         email: str = Query(None, description='Full or part of an email'),
         fullname: str = Query(None, description='Full or part of a name'),
         db: AsyncSession = Depends(get_db),
-        user_id: int = Query(None, description='Filter contacts by specified user "user id"'),
-        user: User = Depends(auth_service.get_current_user)):
+        user_id: int = Query(None, description='Filter contacts by specified user "user id"')):
     """
-    Retrieve a list of contacts based on provided filters.
+    Retrieve a list of contacts based on provided filters, authorized from the role claim of the token.
 
     :param limit: Maximum number of contacts to retrieve (default: 10, range: 10-100).
     :type limit: int
@@ -45,8 +46,6 @@ async def get_all_contacts_by_filters(
     :type db: AsyncSession
     :param user_id: Filter contacts by specified user's ID (default: None).
     :type user_id: int, optional
-    :param user: The currently authenticated user.
-    :type user: User
 
     :return: A list of contacts matching the specified filters.
     :rtype: list[ContactResponseSchema]
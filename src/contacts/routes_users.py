@@ -5,13 +5,14 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from conf import messages
-from database.db import get_db
+from conf.config import app_config
+from database.db import get_db, StatementTimeout
 from src.contacts import repository as repo_contacts
-from src.contacts.repository import is_contact_exist
 from src.contacts.schemas import (
     ContactSchema,
     ContactResponseSchema,
     ContactUpdateSchema,
+    ContactChangesResponseSchema,
 )
 from src.services.auth.jwt_auth import auth_service
 from src.users.models import User
@@ -20,7 +21,8 @@ router = APIRouter(prefix="/contacts", tags=["contacts"])
 
 
 @router.get("/",response_model=list[ContactResponseSchema],
-            dependencies=[Depends(RateLimiter(times=60, seconds=60))])
+            dependencies=[Depends(StatementTimeout(app_config.DB_SEARCH_STATEMENT_TIMEOUT)),
+                          Depends(RateLimiter(times=60, seconds=60))])
 async def get_contacts_by_filters(
     limit: int = Query(10, ge=10, le=100),
     offset: int = Query(0, ge=0),
@@ -54,6 +56,39 @@ async def get_contacts_by_filters(
     return contacts
 
 
+@router.get("/changes", response_model=ContactChangesResponseSchema,
+            dependencies=[Depends(RateLimiter(times=60, seconds=60))])
+async def get_contacts_changes(
+    since: str = Query(None, description="Sync token from the previous response, None - for the initial sync"),
+    limit: int = Query(100, ge=10, le=1000),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve the contacts changed and deleted since the given sync token.
+
+    :param since: The sync token returned by the previous call (optional).
+    :type since: str, optional
+    :param limit: The maximum number of changed contacts and of deleted contacts per page (default 100).
+    :type limit: int
+    :param db: Database session dependency.
+    :type db: AsyncSession
+    :param user: The current authenticated user.
+    :type user: User
+
+    :return: The changed contacts, the tombstones of deleted contacts and the token for the next call.
+    :rtype: ContactChangesResponseSchema
+
+    :raises HTTPException: If the sync token is malformed, raises a 400 error.
+    """
+    try:
+        changes = await repo_contacts.get_contact_changes(db, user, since, limit)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_SYNC_TOKEN
+        )
+    return changes
+
+
 @router.get("/{contact_id}", response_model=ContactResponseSchema,
             dependencies=[Depends(RateLimiter(times=60, seconds=60))])
 async def get_contact(
@@ -104,12 +139,11 @@ async def create_contact(
 
     :raises HTTPException: If the contact already exists, raises a 409 error.
     """
-    result = await is_contact_exist(body.email, body.phone, db, user)
-    if result:
+    contact = await repo_contacts.create_contact(body, db, user)
+    if contact is None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail=messages.CONTACT_ALREADY_EXISTS
         )
-    contact = await repo_contacts.create_contact(body, db, user)
     return contact
 
 
@@ -134,9 +168,15 @@ async def update_contact(
     :return: The updated contact.
     :rtype: ContactResponseSchema
 
-    :raises HTTPException: If the contact is not found, raises a 409 error.
+    :raises HTTPException: If the contact is not found or the new email and phone belong to another contact,
+        raises a 409 error.
     """
-    contact = await repo_contacts.update_contact(contact_id, body, db, user)
+    try:
+        contact = await repo_contacts.update_contact(contact_id, body, db, user)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=messages.CONTACT_ALREADY_EXISTS
+        )
     if contact is None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail=messages.CONTACT_NOT_FOUND
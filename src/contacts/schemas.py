@@ -30,3 +30,16 @@ class ContactUpdateSchema(ContactSchema):
     phone: str = Field(None, max_length=10)
     birthday: date = Field(None)
     description: str = Field(None, max_length=300)
+
+
+class ContactTombstoneSchema(BaseModel):
+    id: int = Field(validation_alias='contact_id')
+    deleted_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ContactChangesResponseSchema(BaseModel):
+    changes: list[ContactResponseSchema]
+    deleted: list[ContactTombstoneSchema]
+    next_token: str
+    has_more: bool
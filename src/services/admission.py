@@ -0,0 +1,144 @@
+"""
+Admission control: shed the low-priority requests first when the worker is overloaded, with a quick
+503 and ``Retry-After`` rather than a slow failure once the database pool times out.
+
+The load is the highest of three ratios to their limit: the event loop lag, the wait of the oldest
+pending database connection checkout and the requests in flight. A route is rejected once the load
+reaches the shedding level of its priority, declared on its router:
+
+    router = APIRouter(prefix="/auth", tags=["auth"])
+    route_priorities.declare(router, Priority.HIGH)
+"""
+import enum
+import json
+from typing import Callable
+
+from fastapi import APIRouter
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from conf import messages
+from conf.config import app_config
+from src.services.metrics import admission_rejections, http_requests_in_flight, router as metrics_router
+
+
+class Priority(enum.IntEnum):
+    LOW = 0  # Admin listings, exports, diagnostics
+    NORMAL = 1  # Contact and user reads and writes
+    HIGH = 2  # Authentication
+    CRITICAL = 3  # Health checks and metrics, never shed
+
+
+# The load, as a ratio to the limits, from which the requests of a priority are rejected
+SHED_AT = {Priority.LOW: 1.0, Priority.NORMAL: 2.0, Priority.HIGH: 4.0, Priority.CRITICAL: float('inf')}
+
+
+class RoutePriorities:
+    """
+    The priorities declared on the routers, by endpoint: the routes of a router are only known
+    once its module is imported, the lookup table is built on first use.
+
+    :param default: The priority of the routes of the routers without a declaration.
+    :type default: Priority
+    """
+
+    def __init__(self, default: Priority = Priority.NORMAL):
+        self.default = default
+        self._routers: list[tuple[APIRouter, Priority]] = []
+        self._endpoints: dict[Callable, Priority] | None = None
+
+    def declare(self, router: APIRouter, priority: Priority) -> None:
+        self._routers.append((router, priority))
+        self._endpoints = None
+
+    def get(self, route: BaseRoute | None) -> Priority:
+        if self._endpoints is None:
+            self._endpoints = {route.endpoint: priority for router, priority in self._routers
+                               for route in router.routes if hasattr(route, 'endpoint')}
+        return self._endpoints.get(getattr(route, 'endpoint', None), self.default)
+
+
+route_priorities = RoutePriorities()
+# Declared here, the metrics module cannot import this one: scrapes go on during an overload
+route_priorities.declare(metrics_router, Priority.CRITICAL)
+
+
+class AdmissionMiddleware:
+    """
+    Count the requests in flight and reject the ones whose priority is shed at the current load.
+    The route of a request is only looked up while the worker is overloaded.
+
+    :param app: The wrapped ASGI app.
+    :type app: ASGIApp
+    :param routes: The routes of the app, to find the priority of a request.
+    :type routes: list[BaseRoute]
+    :param loop_lag: Returns the current event loop lag, in seconds.
+    :type loop_lag: Callable[[], float]
+    :param pool_wait: Returns the wait of the oldest pending database checkout, in seconds.
+    :type pool_wait: Callable[[], float]
+    :param priorities: The route priorities, ``route_priorities`` by default.
+    :type priorities: RoutePriorities
+    """
+
+    def __init__(self, app: ASGIApp, routes: list[BaseRoute], loop_lag: Callable[[], float],
+                 pool_wait: Callable[[], float], priorities: RoutePriorities = route_priorities):
+        self.app = app
+        self.routes = routes
+        self.loop_lag = loop_lag
+        self.pool_wait = pool_wait
+        self.priorities = priorities
+        self.in_flight = 0
+        self._body = json.dumps({'detail': messages.OVERLOADED}).encode()
+
+    def load(self) -> float:
+        """
+        :return: The highest ratio of the load signals to their limit, a limit of 0 disables its signal.
+        :rtype: float
+        """
+        load = 0.0
+        for value, limit in ((self.loop_lag(), app_config.ADMISSION_MAX_LOOP_LAG),
+                             (self.pool_wait(), app_config.ADMISSION_MAX_POOL_WAIT),
+                             (self.in_flight, app_config.ADMISSION_MAX_IN_FLIGHT)):
+            if limit:
+                load = max(load, value / limit)
+        return load
+
+    def route(self, scope: Scope) -> BaseRoute | None:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        load = self.load()
+        if load >= SHED_AT[Priority.LOW]:
+            priority = self.priorities.get(self.route(scope))
+            if load >= SHED_AT[priority]:
+                admission_rejections.inc(priority=priority.name.lower())
+                await self.reject(send)
+                return
+
+        self.in_flight += 1
+        http_requests_in_flight.set(self.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            http_requests_in_flight.set(self.in_flight)
+
+    async def reject(self, send: Send) -> None:
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(self._body)).encode()),
+                (b'retry-after', str(app_config.ADMISSION_RETRY_AFTER).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': self._body})
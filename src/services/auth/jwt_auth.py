@@ -1,3 +1,9 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -10,7 +16,166 @@ from jose import JWTError, jwt
 from conf import messages
 from conf.config import app_config
 from database.db import get_db
+from src.services.metrics import bcrypt_queue_depth, bcrypt_duration, redis_fallbacks
+from src.services.redis_client import redis_clients
+from src.services.redis_fallback import call_redis, FALLBACK_ERRORS
 from src.users import repository as user_repository
+from src.users.cache import user_cache
+from src.users.models import User
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already verified token payloads, keyed by the SHA-256 of the token.
+
+    An entry is dropped once the ``exp`` claim of its token has passed, so a cache hit is only
+    returned while the token itself is still valid.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, dict] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        """
+        Return the cached payload of the token, or None on a miss or if the token has expired.
+
+        :param token: The encoded JWT token.
+        :type token: str
+        :return: The verified payload or None.
+        :rtype: dict | None
+        """
+        key = self._key(token)
+        payload = self._entries.get(key)
+        if payload is None:
+            return None
+        if payload['exp'] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def put(self, token: str, payload: dict) -> None:
+        """
+        Store the payload of a token whose signature has been verified.
+
+        :param token: The encoded JWT token.
+        :type token: str
+        :param payload: The decoded payload, it must contain the ``exp`` claim.
+        :type payload: dict
+        """
+        if self.maxsize <= 0 or 'exp' not in payload:
+            return
+        key = self._key(token)
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(app_config.VERIFIED_TOKEN_CACHE_SIZE)
+
+
+class TokenVersions:
+    """
+    Per-user access token version counters in Redis, used when ``TOKEN_REVOCATION_CHECK`` is enabled.
+
+    Access tokens carry the version current at issue time in the ``ver`` claim; revoking bumps the
+    counter, so every token issued before is rejected while the user's new tokens are accepted.
+
+    While Redis is unavailable the check fails open, except for the users revoked by this worker:
+    their tokens issued before the second of the revocation are rejected, and the revocation is
+    written to Redis once it answers again. ``iat`` has a one-second resolution, so a token issued
+    in the same second as the revocation is accepted: the new token of a login right after a
+    password reset must not be rejected.
+    """
+
+    prefix = 'token_version'
+
+    def __init__(self):
+        # Revocations made by this worker: user id -> (issued-at limit, increments not in Redis yet)
+        self._revoked: dict[int, tuple[int, int]] = {}
+
+    async def get(self, user_id: int) -> int:
+        """
+        :param user_id: The user id.
+        :type user_id: int
+        :return: The current token version of the user, 0 if never revoked.
+        :rtype: int
+        :raises CircuitOpenError: If Redis is unavailable, see ``FALLBACK_ERRORS``.
+        """
+        await self.flush()
+        redis = redis_clients.get('tokens')
+        version = await call_redis(lambda: redis.get(f'{self.prefix}:{user_id}'))
+        return int(version) if version is not None else 0
+
+    async def version_or_default(self, user_id: int) -> int:
+        """
+        The version for a new token, 0 while Redis is unavailable.
+        """
+        try:
+            return await self.get(user_id)
+        except FALLBACK_ERRORS:
+            redis_fallbacks.inc(workload='tokens')
+            return 0
+
+    async def is_revoked(self, claims: dict) -> bool:
+        """
+        :param claims: The verified claims of an access token.
+        :type claims: dict
+        :return: Whether the token was issued before a revocation of its user.
+        :rtype: bool
+        """
+        try:
+            return await self.get(claims['uid']) > claims.get('ver', 0)
+        except FALLBACK_ERRORS:
+            redis_fallbacks.inc(workload='tokens')
+            revoked = self._revoked.get(claims['uid'])
+            return revoked is not None and claims.get('iat', 0) < revoked[0]
+
+    async def revoke(self, user_id: int) -> None:
+        """
+        Reject every access token issued to the user so far, a no-op when the check is disabled.
+
+        :param user_id: The user id.
+        :type user_id: int
+        """
+        if not app_config.TOKEN_REVOCATION_CHECK:
+            return
+        now = int(time.time())
+        # The tokens issued before the oldest revocations have expired
+        for revoked_id, (issued_at, increments) in list(self._revoked.items()):
+            if not increments and issued_at < now - app_config.TOKEN_LIFETIME * 60:
+                del self._revoked[revoked_id]
+        _, increments = self._revoked.get(user_id, (0, 0))
+        self._revoked[user_id] = (now, increments + 1)
+        try:
+            await self.flush()
+        except FALLBACK_ERRORS:
+            redis_fallbacks.inc(workload='tokens')
+
+    async def flush(self) -> None:
+        """
+        Write the revocations that did not reach Redis yet.
+        """
+        redis = redis_clients.get('tokens')
+        for user_id, (issued_at, increments) in list(self._revoked.items()):
+            if increments:
+                await call_redis(lambda: redis.incrby(f'{self.prefix}:{user_id}', increments))
+                self._revoked[user_id] = (issued_at, 0)
+
+
+token_versions = TokenVersions()
+password_executor = ThreadPoolExecutor(max_workers=app_config.BCRYPT_WORKERS, thread_name_prefix='bcrypt')
 
 
 class Auth:
@@ -40,6 +205,39 @@ class Auth:
         """
         return self.pwd_context.hash(password)
 
+    async def _run_in_pool(self, operation: str, function, *args):
+        bcrypt_queue_depth.inc()
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(password_executor, function, *args)
+        finally:
+            bcrypt_queue_depth.dec()
+            bcrypt_duration.observe(time.perf_counter() - started, operation=operation)
+
+    async def verify_password_in_pool(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify the password in the bcrypt thread pool, without blocking the event loop.
+
+        :param plain_password: The plain text password to verify.
+        :type plain_password: str
+        :param hashed_password: The hashed password to compare against.
+        :type hashed_password: str
+        :return: True if the passwords match, False otherwise.
+        :rtype: bool
+        """
+        return await self._run_in_pool('verify', self.verify_password, plain_password, hashed_password)
+
+    async def get_password_hash_in_pool(self, password: str) -> str:
+        """
+        Hash the password in the bcrypt thread pool, without blocking the event loop.
+
+        :param password: The plain text password to hash.
+        :type password: str
+        :return: The hashed password.
+        :rtype: str
+        """
+        return await self._run_in_pool('hash', self.get_password_hash, password)
+
     oauth2_verify_email_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
     oauth2_reset_password_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/reset_password")
 
@@ -69,6 +267,9 @@ class Auth:
         """
         Create a JWT access token.
 
+        Tokens issued at login carry the ``uid`` and ``role`` claims next to ``sub``, see ``user_claims``;
+        with ``TOKEN_REVOCATION_CHECK`` the current token version of the user is added as ``ver``.
+
         :param data: The data to encode inside the token.
         :type data: dict
         :param expires_delta: Optional expiration time in seconds.
@@ -81,6 +282,8 @@ class Auth:
             expire = datetime.now(timezone.utc) + timedelta(seconds=expires_delta)
         else:
             expire = datetime.now(timezone.utc) + timedelta(minutes=app_config.TOKEN_LIFETIME)
+        if app_config.TOKEN_REVOCATION_CHECK and 'uid' in data:
+            to_encode['ver'] = await token_versions.version_or_default(data['uid'])
         to_encode.update({'iat': datetime.now(timezone.utc), 'exp': expire, 'scope': 'access_token'})
         encoded_access_token = jwt.encode(to_encode, app_config.JWT_SECRET_KEY, algorithm=app_config.ALGORITHM)
         return encoded_access_token
@@ -127,17 +330,27 @@ class Auth:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INCORRECT_REFRESH_TOKEN)
 
     @staticmethod
-    async def get_current_user(token: str = Depends(oauth2_verify_email_scheme), db: AsyncSession = Depends(get_db)):
+    def user_claims(user: User) -> dict:
         """
-        Get the current user from the provided JWT token.
+        The claims identifying a user in an access token: ``sub`` (the email), ``uid`` and ``role``.
+
+        :param user: The user, with its role loaded.
+        :type user: User
+        :return: The claims.
+        :rtype: dict
+        """
+        return {'sub': user.email, 'uid': user.id, 'role': user.role.name if user.role is not None else None}
+
+    @staticmethod
+    async def get_token_claims(token: str = Depends(oauth2_verify_email_scheme)) -> dict:
+        """
+        Verify an access token and return its claims, without loading the user.
 
         :param token: The JWT token to decode.
         :type token: str
-        :param db: Database session dependency.
-        :type db: AsyncSession
-        :return: The user associated with the email in the token.
+        :return: The verified claims.
         :rtype: dict
-        :raises HTTPException: If the token is invalid or the user is not found.
+        :raises HTTPException: If the token is invalid, has another scope or has been revoked.
         """
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -146,20 +359,44 @@ class Auth:
         )
 
         try:
-            # Decode JWT
-            payload = jwt.decode(token, app_config.JWT_SECRET_KEY, algorithms=[app_config.ALGORITHM])
-            if payload['scope'] == 'access_token':
-                email = payload["sub"]
-                if email is None:
-                    raise credentials_exception
-            else:
-                raise credentials_exception
-        except JWTError as e:
+            # Decode JWT, tokens seen before skip the signature check until they expire
+            payload = verified_tokens.get(token)
+            if payload is None:
+                payload = jwt.decode(token, app_config.JWT_SECRET_KEY, algorithms=[app_config.ALGORITHM])
+                verified_tokens.put(token, payload)
+        except JWTError:
+            raise credentials_exception
+        if payload.get('scope') != 'access_token' or payload.get('sub') is None:
             raise credentials_exception
+        if app_config.TOKEN_REVOCATION_CHECK:
+            if 'uid' not in payload or await token_versions.is_revoked(payload):
+                raise credentials_exception
+        return payload
 
-        user = await user_repository.get_user_by_email(email, db)
+    @staticmethod
+    async def get_current_user(token: str = Depends(oauth2_verify_email_scheme), db: AsyncSession = Depends(get_db)):
+        """
+        Get the current user from the provided JWT token.
+
+        :param token: The JWT token to decode.
+        :type token: str
+        :param db: Database session dependency.
+        :type db: AsyncSession
+        :return: The user associated with the email in the token.
+        :rtype: dict
+        :raises HTTPException: If the token is invalid or the user is not found.
+        """
+        email = (await Auth.get_token_claims(token))['sub']
+        user = user_cache.get(email)
         if user is None:
-            raise credentials_exception
+            user = await user_repository.get_user_by_email(email, db)
+            if user is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Could not validate credentials (inner)",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+            user_cache.put(user)
         return user
 
     @staticmethod
@@ -194,7 +431,7 @@ class Auth:
             email = payload['sub']
             return email
         except JWTError as err:
-            print(err)
+            logger.info(f"Invalid email verification token: {err}")
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                                 detail='Invalid email verification token')
 
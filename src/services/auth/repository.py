@@ -1,26 +1,82 @@
+import asyncio
+import functools
+import logging
+import math
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
 
 from src.services.auth.jwt_auth import auth_service
+from src.services.circuit_breaker import CircuitOpenError
+from src.services.metrics import email_send_duration
+from src.services.outbound import mail_service
 from conf.config import app_config
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=app_config.MAIL_USERNAME,
-    MAIL_PASSWORD=app_config.MAIL_PASSWORD,
-    MAIL_FROM=app_config.MAIL_FROM,
-    MAIL_PORT=app_config.MAIL_IMAP_PORT,
-    MAIL_SERVER=app_config.MAIL_SERVER,
-    MAIL_FROM_NAME=f'Woolyc.com msg system - {datetime.now().strftime("%I:%M %p")}',
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / "templates",
-)
+logger = logging.getLogger("uvicorn.error")
+
+if TYPE_CHECKING:
+    from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+
+
+@functools.cache
+def get_mail_config() -> 'ConnectionConfig':
+    """
+    The SMTP settings, built on first use: fastapi-mail and its dependencies are only imported
+    by the workers that send mail.
+
+    :return: The mail connection settings.
+    :rtype: ConnectionConfig
+    """
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=app_config.MAIL_USERNAME,
+        MAIL_PASSWORD=app_config.MAIL_PASSWORD,
+        MAIL_FROM=app_config.MAIL_FROM,
+        MAIL_PORT=app_config.MAIL_IMAP_PORT,
+        MAIL_SERVER=app_config.MAIL_SERVER,
+        MAIL_FROM_NAME=f'Woolyc.com msg system - {datetime.now().strftime("%I:%M %p")}',
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=True,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        TEMPLATE_FOLDER=Path(__file__).parent / "templates",
+        # The socket timeout of aiosmtplib, the whole send is bounded by MAIL_TIMEOUT
+        TIMEOUT=math.ceil(app_config.MAIL_TIMEOUT),
+    )
+
+
+def get_mailer() -> 'FastMail':
+    from fastapi_mail import FastMail
+
+    return FastMail(get_mail_config())
+
+
+async def send_message(fm: 'FastMail', message: 'MessageSchema', template_name: str):
+    """
+    Send the message through ``mail_service``, within ``MAIL_TIMEOUT`` and the mail concurrency limit,
+    and record the send latency by template and result.
+
+    :param fm: The mail client.
+    :type fm: FastMail
+    :param message: The message to send.
+    :type message: MessageSchema
+    :param template_name: The template of the message body.
+    :type template_name: str
+    :raises CircuitOpenError: If the SMTP server is failing.
+    :raises asyncio.TimeoutError: If the send did not complete in time.
+    """
+    started = time.perf_counter()
+    result = 'error'
+    try:
+        await mail_service.call(lambda: fm.send_message(message, template_name=template_name))
+        result = 'ok'
+    finally:
+        email_send_duration.observe(time.perf_counter() - started, template=template_name, result=result)
+
 
 async def send_verify_email(email: str, username: str, host: str):
     """
@@ -33,8 +89,11 @@ async def send_verify_email(email: str, username: str, host: str):
     :param host: The host URL for email links.
     :type host: str
 
-    :raises ConnectionErrors: If any connection error occurs during the email sending process.
+    The errors of the SMTP server, its timeouts and open circuit are logged, not raised.
     """
+    from fastapi_mail import MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
     try:
         token_verification = auth_service.create_email_token({'sub': email})
         message = MessageSchema(
@@ -43,10 +102,10 @@ async def send_verify_email(email: str, username: str, host: str):
             template_body={'host': host, 'username': username, 'token': token_verification},
             subtype=MessageType.html
         )
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name='verify_email.html')
-    except ConnectionErrors as err:
-        print(err)
+        fm = get_mailer()
+        await send_message(fm, message, 'verify_email.html')
+    except (ConnectionErrors, CircuitOpenError, asyncio.TimeoutError) as err:
+        logger.error(f"Verification email not sent: {err!r}")
 
 
 async def send_reset_password_email(email: str, username: str, temp_code: str, host: str):
@@ -62,8 +121,11 @@ async def send_reset_password_email(email: str, username: str, temp_code: str, h
     :param host: The host URL for email links.
     :type host: str
 
-    :raises ConnectionErrors: If any connection error occurs during the email sending process.
+    The errors of the SMTP server, its timeouts and open circuit are logged, not raised.
     """
+    from fastapi_mail import MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
     try:
         token_password_reset = auth_service.create_reset_password_token(email)
         message = MessageSchema(
@@ -73,7 +135,7 @@ async def send_reset_password_email(email: str, username: str, temp_code: str, h
                            'expires_at': app_config.TEMP_CODE_LIFETIME, 'token': token_password_reset},
             subtype=MessageType.html
         )
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name='get_temp_code.html')
-    except ConnectionErrors as err:
-        print(err)
+        fm = get_mailer()
+        await send_message(fm, message, 'get_temp_code.html')
+    except (ConnectionErrors, CircuitOpenError, asyncio.TimeoutError) as err:
+        logger.error(f"Password reset email not sent: {err!r}")
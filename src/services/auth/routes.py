@@ -18,7 +18,6 @@ from fastapi.security import (
 )
 
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from fastapi_limiter.depends import RateLimiter
 from jose import JWTError
@@ -27,19 +26,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from conf.config import app_config
 from conf import messages
 from database.db import get_db
+from src.services.admission import Priority, route_priorities
 from src.services.auth.repository import send_verify_email, send_reset_password_email
 from src.services.temp_code.repository import get_temp_code, create_temp_code, update_temp_code
 from src.users import repository as user_repository
 from src.users.schemas import UserSchema, UserResponseSchema, TokenSchema, RequestEmailSchema
-from src.services.auth.jwt_auth import auth_service
+from src.services.auth.jwt_auth import auth_service, token_versions
+from src.services.page_cache import StaticPage, FragmentTemplate
+from src.services.static_assets import static_assets
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
+route_priorities.declare(router, Priority.HIGH)
 get_refresh_token = HTTPBearer()
 BASE_DIR = app_config.BASE_DIR
 templates = Jinja2Templates(directory=BASE_DIR / 'src' / 'templates')
-
-router.mount('/static', StaticFiles(directory=BASE_DIR / 'src' / 'static'), name="static")
+templates.env.globals['static_url'] = static_assets.url
+expired_page = StaticPage(templates, 'expired.html', {'page_title': 'Link has expired'})
+reset_password_template = FragmentTemplate(templates, 'password-reset.html', {'page_title': 'Reset Password'},
+                                           variables=('token',))
 
 
 @router.post("/signup", response_model=UserResponseSchema, status_code=status.HTTP_201_CREATED)
@@ -54,7 +59,7 @@ async def signup(
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail=messages.ACCOUNT_EXIST
         )
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash_in_pool(body.password)
     new_user = await user_repository.create_user(body, db)
     bt.add_task(send_verify_email, new_user.email, new_user.username, str(request.base_url))
     return new_user
@@ -76,7 +81,7 @@ async def login(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=messages.EMAIL_NOT_CONFIRMED
         )
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password_in_pool(body.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=messages.INCORRECT_PASSWORD
@@ -93,7 +98,9 @@ async def refresh_token(
     email = await auth_service.decode_refresh_token(token)
     user = await user_repository.get_user_by_email(email, db)
     if user.refresh_token != token:
+        # A reused refresh token may be stolen, the access tokens issued with it are revoked as well
         await user_repository.update_token(user, None, db)
+        await token_versions.revoke(user.id)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=messages.INCORRECT_REFRESH_TOKEN
@@ -138,19 +145,9 @@ async def reset_password_page(token: str, request: Request):
     try:
         await auth_service.is_active(token)
     except JWTError as e:
-        return templates.TemplateResponse("expired.html",
-                                          {"request": request,
-                                           "page_title": 'Link has expired'
-                                           })
-
+        return expired_page.response(request)
 
-    email = await auth_service.get_email_from_token(token)
-    return templates.TemplateResponse("password-reset.html",
-                                      {"request": request,
-                                       "page_title": "Reset Password",
-                                       "email": email,
-                                       "token": token
-                                       })
+    return HTMLResponse(reset_password_template.render(token=token))
 
 
 @router.post('/reset_password/{token}', dependencies=[Depends(RateLimiter(times=1, seconds=3))])
@@ -174,8 +171,9 @@ async def reset_password(
     if temp_code_obj is None or temp_code_obj.expires_at < datetime.now() or temp_code_obj.used_at:
         return JSONResponse(content={"message": "Code is invalid or expired"}, status_code=status.HTTP_400_BAD_REQUEST)
 
-    new_password = auth_service.get_password_hash(password)
-    await user_repository.update_user_password(email, new_password, db)
+    new_password = await auth_service.get_password_hash_in_pool(password)
+    user = await user_repository.update_user_password(email, new_password, db)
+    await token_versions.revoke(user.id)
     await update_temp_code(temp_code_obj, db)
 
     return JSONResponse(content={"message": "Password successfully updated"}, status_code=200)
@@ -197,7 +195,7 @@ async def request_reset_password(
 
 
 async def create_and_update_tokens(user, db):
-    new_access_token = await auth_service.create_access_token(data={"sub": user.email})
+    new_access_token = await auth_service.create_access_token(data=auth_service.user_claims(user))
     new_refresh_token = await auth_service.create_refresh_token(
         data={"sub": user.email}
     )
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from src.services.metrics import circuit_breaker_open
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a dependency whose circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing dependency, then re-probe it with exponential backoff.
+
+    - Closed: calls pass, ``failure_threshold`` consecutive failures open the breaker.
+    - Open: calls fail fast with ``CircuitOpenError`` for ``backoff`` seconds.
+    - Half-open: once the backoff elapsed one call is let through as a probe. Its success closes the
+      breaker, its failure opens it again with the backoff doubled, up to ``max_backoff``.
+
+    :param name: The dependency, the label of the ``circuit_breaker_open`` gauge.
+    :type name: str
+    :param failure_threshold: Consecutive failures that open the breaker.
+    :type failure_threshold: int
+    :param backoff: Seconds before the first probe.
+    :type backoff: float
+    :param max_backoff: The maximum seconds between two probes.
+    :type max_backoff: float
+    :param errors: The exceptions that count as failures, others pass through.
+    :type errors: tuple[type[BaseException], ...]
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, backoff: float = 1.0, max_backoff: float = 30.0,
+                 errors: tuple[type[BaseException], ...] = (Exception,)):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.errors = errors
+        self.reset()
+
+    def reset(self) -> None:
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.retry_at = 0.0
+        self._current_backoff = self.backoff
+        self._probing = False
+        circuit_breaker_open.set(0, name=self.name)
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if self._probing or time.monotonic() >= self.retry_at else 'open'
+
+    def allow(self) -> bool:
+        """
+        :return: Whether a call may be made now; in half-open state only the caller that gets True probes.
+        :rtype: bool
+        """
+        if self.opened_at is None:
+            return True
+        if self._probing or time.monotonic() < self.retry_at:
+            return False
+        self._probing = True
+        return True
+
+    def success(self) -> None:
+        if self.opened_at is not None:
+            logger.info(f"Circuit breaker {self.name} closed")
+        self.reset()
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None:
+            # A failed probe
+            self._probing = False
+            self._current_backoff = min(self._current_backoff * 2, self.max_backoff)
+        elif self.failures < self.failure_threshold:
+            return
+        else:
+            self.opened_at = time.monotonic()
+            logger.warning(f"Circuit breaker {self.name} opened after {self.failures} failures")
+        self.retry_at = time.monotonic() + self._current_backoff
+        circuit_breaker_open.set(1, name=self.name)
+
+    async def call(self, function: Callable[[], Awaitable], timeout: float | None = None):
+        """
+        Call the dependency through the breaker.
+
+        :param function: Returns the awaitable of the call.
+        :type function: Callable[[], Awaitable]
+        :param timeout: Seconds after which the call is cancelled and counts as a failure.
+        :type timeout: float | None
+        :return: The result of the call.
+        :raises CircuitOpenError: If the breaker is open.
+        :raises asyncio.TimeoutError: If the call timed out.
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        try:
+            result = await asyncio.wait_for(function(), timeout)
+        except (asyncio.TimeoutError, *self.errors):
+            self.failure()
+            raise
+        except BaseException:
+            # Cancelled, or an error that says nothing about the health of the dependency
+            self._probing = False
+            raise
+        self.success()
+        return result
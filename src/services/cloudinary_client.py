@@ -0,0 +1,25 @@
+import functools
+
+from conf.config import app_config
+
+
+@functools.cache
+def get_cloudinary():
+    """
+    The configured Cloudinary SDK, imported on first use: the SDK and urllib3 are only loaded
+    by the workers that upload avatars or probe the storage.
+
+    :return: The ``cloudinary`` module with ``uploader`` and ``api`` loaded.
+    :rtype: module
+    """
+    import cloudinary
+    import cloudinary.api
+    import cloudinary.uploader
+
+    cloudinary.config(
+        cloud_name=app_config.CLOUDINARY_NAME,
+        api_key=app_config.CLOUDINARY_API_KEY,
+        api_secret=app_config.CLOUDINARY_API_SECRET,
+        secure=True,
+    )
+    return cloudinary
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from conf.config import app_config
+from database.db import sessionmanager
+from src.services.email_tracking.repository import save_open_events
+from src.services.metrics import email_opens, email_opens_dropped
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class EmailOpenBuffer:
+    """
+    In-memory ring buffer of email open events, flushed to the database in batches.
+
+    When the database falls behind and the buffer is full, the oldest events are dropped and counted
+    in ``email_opens_dropped_total``. A batch the database rejects is dropped and counted too, so that
+    it cannot block the events behind it.
+
+    :param capacity: The maximum number of buffered events.
+    :type capacity: int
+    :param batch_size: The number of events per transaction, a full batch triggers a flush.
+    :type batch_size: int
+    """
+
+    def __init__(self, capacity: int, batch_size: int):
+        self.batch_size = batch_size
+        self.session = sessionmanager.session
+        self._events = deque(maxlen=capacity)
+        self._flushing = None
+
+    def __len__(self):
+        return len(self._events)
+
+    def record(self, username: str, campaign: str) -> None:
+        """
+        Buffer an open event, no I/O is done here.
+
+        :param username: The recipient who opened the email.
+        :type username: str
+        :param campaign: The email campaign.
+        :type campaign: str
+        """
+        if len(self._events) == self._events.maxlen:
+            email_opens_dropped.inc()
+        self._events.append((username, campaign, datetime.now()))
+        email_opens.inc(campaign=campaign)
+        if len(self._events) >= self.batch_size and not self._is_flushing():
+            self._flushing = asyncio.get_running_loop().create_task(self._flush())
+
+    def _is_flushing(self) -> bool:
+        return (self._flushing is not None and not self._flushing.done()
+                and self._flushing.get_loop() is asyncio.get_running_loop())
+
+    async def flush(self) -> None:
+        """
+        Write the buffered events in batches, or wait for the flush in progress: one flush runs at a time.
+        """
+        if not self._is_flushing():
+            self._flushing = asyncio.get_running_loop().create_task(self._flush())
+        await self._flushing
+
+    async def _flush(self) -> None:
+        """
+        A batch that failed because the database is unavailable goes back to the front of the buffer;
+        one the database rejects, e.g. a value too long for its column, is dropped.
+        """
+        while self._events:
+            batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+            try:
+                async with self.session() as db:
+                    await save_open_events(batch, db)
+            except (DataError, IntegrityError) as error:
+                logger.error(f"Dropped {len(batch)} email open events the database rejected: {error}")
+                email_opens_dropped.inc(len(batch))
+            except Exception as error:
+                logger.error(f"Failed to flush {len(batch)} email open events: {error}")
+                self._requeue(batch)
+                return
+            except asyncio.CancelledError:
+                self._requeue(batch)
+                raise
+
+    def _requeue(self, batch: list) -> None:
+        # The newest events recorded during the flush no longer fit, a full deque drops them on extendleft
+        overflow = len(self._events) + len(batch) - self._events.maxlen
+        if overflow > 0:
+            email_opens_dropped.inc(overflow)
+        self._events.extendleft(reversed(batch))
+
+    async def close(self) -> None:
+        """
+        Wait for a batch flush in progress, then flush the rest; run before the database engine is closed.
+        """
+        # The flush in progress may have stopped at a failed batch, the second one retries it
+        await self.flush()
+        await self.flush()
+        if self._events:
+            logger.error(f"{len(self._events)} email open events were not saved")
+
+    async def flush_periodically(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+
+email_open_buffer = EmailOpenBuffer(app_config.EMAIL_OPEN_BUFFER_SIZE, app_config.EMAIL_OPEN_BATCH_SIZE)
@@ -0,0 +1,30 @@
+from datetime import date, datetime
+
+from sqlalchemy import String, DateTime, Date, Integer, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from conf.config import Base
+
+
+class EmailOpenEvent(Base):
+    __tablename__ = 'email_open_events'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    username: Mapped[str] = mapped_column(String(150), nullable=False)
+    campaign: Mapped[str] = mapped_column(String(50), nullable=False)
+    opened_at: Mapped[datetime] = mapped_column('opened_at', DateTime, nullable=False)
+
+
+class EmailOpenStats(Base):
+    """
+    Daily rollup of the open events, updated with every flushed batch.
+    """
+    __tablename__ = 'email_open_stats'
+    username: Mapped[str] = mapped_column(String(150), primary_key=True)
+    campaign: Mapped[str] = mapped_column(String(50), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    opens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_opened_at: Mapped[datetime] = mapped_column('last_opened_at', DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_email_open_stats_campaign_day', 'campaign', 'day'),
+    )
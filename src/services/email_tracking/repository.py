@@ -0,0 +1,73 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services.email_tracking.model import EmailOpenEvent, EmailOpenStats
+
+
+async def save_open_events(events: list[tuple[str, str, datetime]], db: AsyncSession) -> None:
+    """
+    Store a batch of open events and add them to the daily rollups, in one transaction.
+
+    :param events: The (username, campaign, opened_at) events, oldest first.
+    :type events: list[tuple[str, str, datetime]]
+    :param db: The database session.
+    :type db: AsyncSession
+    """
+    if not events:
+        return
+    await db.execute(insert(EmailOpenEvent), [
+        {'username': username, 'campaign': campaign, 'opened_at': opened_at}
+        for username, campaign, opened_at in events
+    ])
+
+    rollups = defaultdict(lambda: {'opens': 0, 'last_opened_at': None})
+    for username, campaign, opened_at in events:
+        rollup = rollups[(username, campaign, opened_at.date())]
+        rollup['opens'] += 1
+        rollup['last_opened_at'] = opened_at
+    stmt = insert(EmailOpenStats).values([
+        {'username': username, 'campaign': campaign, 'day': day, **rollup}
+        for (username, campaign, day), rollup in rollups.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['username', 'campaign', 'day'],
+        set_={'opens': EmailOpenStats.opens + stmt.excluded.opens, 'last_opened_at': stmt.excluded.last_opened_at},
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+
+async def get_open_stats(db: AsyncSession, username: str = None, campaign: str = None, days: int = None) -> list:
+    """
+    Sum the daily rollups by username and campaign.
+
+    :param db: The database session.
+    :type db: AsyncSession
+    :param username: Only the opens of this recipient (optional).
+    :type username: str, optional
+    :param campaign: Only the opens of this campaign (optional).
+    :type campaign: str, optional
+    :param days: Only the opens of the last days, today included (optional).
+    :type days: int, optional
+    :return: The username, campaign, opens and last_opened_at rows, the most opened first.
+    :rtype: list
+    """
+    opens = func.sum(EmailOpenStats.opens).label('opens')
+    stmt = select(
+        EmailOpenStats.username,
+        EmailOpenStats.campaign,
+        opens,
+        func.max(EmailOpenStats.last_opened_at).label('last_opened_at'),
+    ).group_by(EmailOpenStats.username, EmailOpenStats.campaign).order_by(opens.desc())
+    if username:
+        stmt = stmt.where(EmailOpenStats.username == username)
+    if campaign:
+        stmt = stmt.where(EmailOpenStats.campaign == campaign)
+    if days:
+        stmt = stmt.where(EmailOpenStats.day > date.today() - timedelta(days=days))
+    result = await db.execute(stmt)
+    return result.all()
@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class EmailOpenStatsSchema(BaseModel):
+    username: str
+    campaign: str
+    opens: int
+    last_opened_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
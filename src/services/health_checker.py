@@ -1,10 +1,123 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.db import get_db
+from conf.config import app_config
+from database.db import get_db, sessionmanager
+from src.services.admission import Priority, route_priorities
+from src.services.auth.repository import get_mail_config
+from src.services.cloudinary_client import get_cloudinary
+from src.services.redis_client import redis_clients
 
+logger = logging.getLogger("uvicorn.error")
 router = APIRouter(prefix="/health_checker", tags=["health_checker"])
+route_priorities.declare(router, Priority.CRITICAL)
+
+
+async def check_postgres() -> None:
+    await sessionmanager.ping()
+
+
+async def check_redis() -> None:
+    await redis_clients.ping()
+
+
+async def check_mail() -> None:
+    mail_conf = get_mail_config()
+    _, writer = await asyncio.open_connection(mail_conf.MAIL_SERVER, mail_conf.MAIL_PORT)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def check_storage() -> None:
+    await asyncio.to_thread(get_cloudinary().api.ping)
+
+
+# Name: (probe, critical). A failing non-critical dependency is reported but keeps the instance ready,
+# every instance shares it, so taking them all out of the load balancer would not help. Redis is one of
+# them: the cache and the rate limiter fall back to per-worker state while it is down.
+PROBES = {
+    'postgres': (check_postgres, True),
+    'redis': (check_redis, False),
+    'mail': (check_mail, False),
+    'storage': (check_storage, False),
+}
+
+
+async def run_probe(probe, timeout: float) -> dict:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(probe(), timeout)
+        result = {'status': 'ok'}
+    except asyncio.TimeoutError:
+        result = {'status': 'timeout'}
+    except Exception as error:
+        logger.warning(f"Health probe {probe.__name__} failed: {error!r}")
+        result = {'status': 'error', 'error': type(error).__name__}
+    result['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+class ReadinessCheck:
+    """
+    Runs all the dependency probes concurrently and caches the report for ``ttl`` seconds.
+
+    Concurrent callers during a refresh share the same probe run.
+
+    :param ttl: How long a report is reused, 0 - for disable cache.
+    :type ttl: float
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._report = None
+        self._expires_at = 0.0
+        self._pending = None
+
+    async def _probe(self) -> dict:
+        results = await asyncio.gather(*(run_probe(probe, app_config.HEALTH_PROBE_TIMEOUT)
+                                         for probe, _ in PROBES.values()))
+        checks = dict(zip(PROBES, results))
+        pool = sessionmanager.pool_status()
+        pool['saturated'] = pool['usage'] >= app_config.HEALTH_POOL_SATURATION
+        ready = not pool['saturated'] and all(
+            checks[name]['status'] == 'ok' for name, (_, critical) in PROBES.items() if critical
+        )
+        report = {
+            'status': 'ready' if ready else 'not_ready',
+            'checked_at': datetime.now(timezone.utc).isoformat(),
+            'checks': checks,
+            'pool': pool,
+            'redis_pools': redis_clients.pool_status(),
+        }
+        self._report, self._expires_at = report, time.monotonic() + self.ttl
+        return report
+
+    async def check(self) -> tuple[dict, bool]:
+        """
+        Return the cached report if it is fresh, otherwise probe the dependencies.
+
+        :return: The report and whether it came from the cache.
+        :rtype: tuple[dict, bool]
+        """
+        if self._report is not None and time.monotonic() < self._expires_at:
+            return self._report, True
+        loop = asyncio.get_running_loop()
+        if self._pending is None or self._pending.done() or self._pending.get_loop() is not loop:
+            self._pending = loop.create_task(self._probe())
+        return await asyncio.shield(self._pending), False
+
+    def clear(self) -> None:
+        self._report, self._expires_at = None, 0.0
+
+
+readiness_check = ReadinessCheck(app_config.HEALTH_CACHE_TTL)
 
 
 @router.get('/')
@@ -16,5 +129,34 @@ async def healthcheck(db: AsyncSession = Depends(get_db)):
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database is not configured correctly")
         return {"message": "Database is healthy"}
     except Exception as e:
-        print(e)
+        logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error connecting to the database")
+
+
+@router.get('/live')
+async def liveness():
+    """
+    Liveness probe: the worker is up and its event loop answers. No dependency is checked.
+
+    :return: The liveness status.
+    :rtype: dict
+    """
+    return {'status': 'alive'}
+
+
+@router.get('/ready')
+async def readiness():
+    """
+    Readiness probe: Postgres, Redis, the mail server and the storage are probed concurrently,
+    each with ``HEALTH_PROBE_TIMEOUT``, and the report is cached for ``HEALTH_CACHE_TTL``.
+
+    The instance is not ready when Postgres fails or when the connection pool is saturated;
+    Redis, mail and storage failures are only reported.
+
+    :return: The report with the status and latency of every dependency and the pools usage,
+        with a 503 status code when the instance is not ready.
+    :rtype: JSONResponse
+    """
+    report, cached = await readiness_check.check()
+    status_code = status.HTTP_200_OK if report['status'] == 'ready' else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(content=dict(report, cached=cached), status_code=status_code)
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import math
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from conf.config import app_config
+from src.services.metrics import event_loop_blocks, event_loop_lag
+from src.services.request_context import current_scope, route_name
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class LoopLagMonitor:
+    """
+    Measure how late the event loop runs its callbacks: a task sleeps ``interval`` seconds in a loop,
+    and the lag is how much longer the sleep took. A loop busy with CPU work or blocked by a
+    synchronous call wakes the task late. ``lag`` is the highest sample of the last ``window`` seconds,
+    so that a spike is still seen after the loop caught up.
+
+    With a ``block_threshold``, a watchdog thread also checks that the task keeps waking up: once it is
+    ``block_threshold`` seconds late, the stack of the event loop thread is logged with the route of the
+    running request, pointing at the synchronous call that blocks the loop.
+
+    :param interval: Seconds between two samples.
+    :type interval: float
+    :param window: Seconds of samples ``lag`` covers.
+    :type window: float
+    :param block_threshold: Seconds the loop may be blocked before the watchdog logs its stack, 0 - off.
+    :type block_threshold: float
+    """
+
+    def __init__(self, interval: float = 0.1, window: float = 1.0, block_threshold: float = 0.0):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self._samples: deque[float] = deque(maxlen=max(math.ceil(window / interval), 1))
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        # When the sampling task is due to wake up, written by the loop and read by the watchdog
+        self._due = 0.0
+
+    @property
+    def lag(self) -> float:
+        return max(self._samples, default=0.0)
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        loop = asyncio.get_running_loop()
+        self._due = time.perf_counter() + self.interval
+        self._task = loop.create_task(self._run())
+        if self.block_threshold > 0:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, args=(loop, threading.get_ident()),
+                                              name='loop-watchdog', daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            self._stopped.set()
+            await asyncio.to_thread(watchdog.join)
+        self._samples.clear()
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            self._due = started + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - started - self.interval, 0.0)
+            self._samples.append(lag)
+            event_loop_lag.observe(lag)
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, thread_id: int) -> None:
+        reported = None
+        while not self._stopped.wait(self.block_threshold / 2):
+            due = self._due
+            blocked = time.perf_counter() - due
+            # One report per stall: the sampling task sets a new due time once the loop runs again
+            if blocked < self.block_threshold or due == reported:
+                continue
+            reported = due
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = ''.join(traceback.format_stack(frame))
+            task = asyncio.current_task(loop)
+            route = route_name(task.get_context().get(current_scope)) if task is not None else 'unknown'
+            event_loop_blocks.inc(route=route)
+            logger.warning(f"Event loop blocked for {blocked * 1000:.0f} ms in {route}:\n{stack}",
+                           extra={'route': route, 'blocked_ms': blocked * 1000})
+
+
+loop_lag_monitor = LoopLagMonitor(app_config.LOOP_LAG_INTERVAL, block_threshold=app_config.LOOP_BLOCK_THRESHOLD)
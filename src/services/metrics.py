@@ -0,0 +1,390 @@
+import asyncio
+import fcntl
+import hmac
+import json
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from conf import messages
+from conf.config import app_config
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names: list[str], values: list[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: Path, data: dict) -> None:
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(data))
+    os.replace(temporary, path)
+
+
+def _merge(target: dict, snapshot: dict, gauges: bool) -> None:
+    """
+    Add the values of a snapshot to ``target``, whose values are dicts keyed by the label values tuples.
+    """
+    for name, metric in snapshot.items():
+        if metric['type'] == 'gauge' and not gauges:
+            continue
+        merged = target.setdefault(name, dict(metric, values={}))
+        for key, value in metric['values']:
+            key = tuple(key)
+            current = merged['values'].get(key)
+            if current is None:
+                merged['values'][key] = value
+            elif metric['type'] == 'histogram':
+                merged['values'][key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged['values'][key] = current + value
+
+
+def _listed(merged: dict) -> dict:
+    return {name: dict(metric, values=[[list(key), value] for key, value in metric['values'].items()])
+            for name, metric in merged.items()}
+
+
+class Registry:
+    """
+    The metrics of this process, optionally shared with other workers through snapshot files.
+
+    Every worker writes its own ``metrics_<pid>_<start>.json`` into ``directory``; the worker answering a
+    scrape merges all of them. The start time tells apart the workers that had the same pid. The counters
+    and histograms of the exited workers are folded into ``accumulated.json`` so the totals never go back,
+    gauges only count live workers. Empty the directory before starting the server.
+
+    :param directory: The directory shared by the workers, None - for a single process.
+    :type directory: str | None
+    """
+
+    accumulated = 'accumulated.json'
+
+    def __init__(self, directory: str | None = None):
+        self.directory = Path(directory) if directory else None
+        self.metrics: dict[str, 'Metric'] = {}
+        self._pid: int | None = None
+        self._path: Path | None = None
+
+    def register(self, metric: 'Metric') -> None:
+        self.metrics[metric.name] = metric
+
+    def snapshot(self) -> dict:
+        return {
+            name: {
+                'type': metric.type,
+                'help': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', [])),
+                'values': metric.collect(),
+            }
+            for name, metric in self.metrics.items()
+        }
+
+    @property
+    def path(self) -> Path:
+        # Named on the first write of the process, a worker forked after the import gets a file of its own
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._path = self.directory / f'metrics_{self._pid}_{time.time_ns()}.json'
+        return self._path
+
+    def write(self) -> None:
+        """
+        Atomically replace the snapshot file of this process.
+        """
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_json(self.path, self.snapshot())
+
+    async def write_periodically(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.write()
+
+    def _exited(self) -> list[Path]:
+        """
+        :return: The snapshots of the exited workers: their pid is gone, or reused by a newer worker.
+        :rtype: list[Path]
+        """
+        latest: dict[int, tuple[int, Path]] = {}
+        exited = []
+        for path in self.directory.glob('metrics_*.json'):
+            try:
+                pid, started = map(int, path.stem.split('_')[1:])
+            except ValueError:
+                continue
+            if pid in latest and latest[pid][0] > started:
+                exited.append(path)
+                continue
+            if pid in latest:
+                exited.append(latest[pid][1])
+            latest[pid] = (started, path)
+        exited += [path for pid, (_, path) in latest.items() if pid != os.getpid() and not _pid_alive(pid)]
+        return exited
+
+    def fold_exited(self) -> None:
+        """
+        Add the counters and histograms of the exited workers to ``accumulated.json`` and delete their snapshots.
+        """
+        with open(self.directory / 'metrics.lock', 'w') as lock:
+            # The workers answering concurrent scrapes must not fold a snapshot twice
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            exited = self._exited()
+            if not exited:
+                return
+            accumulated = {}
+            _merge(accumulated, _read_json(self.directory / self.accumulated) or {}, gauges=False)
+            for path in exited:
+                _merge(accumulated, _read_json(path) or {}, gauges=False)
+            _write_json(self.directory / self.accumulated, _listed(accumulated))
+            for path in exited:
+                path.unlink(missing_ok=True)
+
+    def merged(self) -> dict:
+        """
+        Merge the snapshots of all the workers, or return the local one in single process mode.
+
+        :return: The metrics in the ``snapshot`` format.
+        :rtype: dict
+        """
+        if self.directory is None:
+            return self.snapshot()
+        self.write()
+        self.fold_exited()
+        merged = {}
+        _merge(merged, _read_json(self.directory / self.accumulated) or {}, gauges=False)
+        for path in self.directory.glob('metrics_*.json'):
+            _merge(merged, _read_json(path) or {}, gauges=True)
+        return _listed(merged)
+
+    def render(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        :return: The exposition text.
+        :rtype: str
+        """
+        lines = []
+        for name, metric in sorted(self.merged().items()):
+            lines.append(f'# HELP {name} {metric["help"]}')
+            lines.append(f'# TYPE {name} {metric["type"]}')
+            names = metric['labelnames']
+            for key, value in metric['values']:
+                if metric['type'] != 'histogram':
+                    lines.append(f'{name}{_labels(names, key)} {float(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric['buckets'] + ['+Inf'], value[:-2]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(names, key, f"le=\"{bound}\"")} {float(cumulative)}')
+                lines.append(f'{name}_sum{_labels(names, key)} {float(value[-2])}')
+                lines.append(f'{name}_count{_labels(names, key)} {float(value[-1])}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(app_config.METRICS_MULTIPROC_DIR)
+
+
+class Metric:
+    """
+    Base class of the metrics. Values live in a plain dict keyed by label values, updates are only done
+    from the event loop thread, so no locks are taken.
+
+    :param name: The metric name.
+    :type name: str
+    :param documentation: The ``# HELP`` text.
+    :type documentation: str
+    :param labelnames: The label names, their values are passed as keyword arguments to the updates.
+    :type labelnames: tuple[str, ...]
+    :param registry: The registry to register in, the module ``registry`` by default.
+    :type registry: Registry
+    """
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), registry: Registry = registry):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self) -> list:
+        return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A gauge. With several workers the values of the live processes are summed.
+    """
+    type = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function = None
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """
+        Compute the unlabelled value on collection instead of tracking it.
+
+        :param function: Returns the current value.
+        :type function: Callable[[], float]
+        """
+        self._function = function
+
+    def collect(self) -> list:
+        if self._function is not None:
+            return [[[], self._function()]]
+        return super().collect()
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        values = self._values.get(key)
+        if values is None:
+            # Per bucket counts (the last one is +Inf), then sum and count
+            values = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def time(self, **labels) -> 'HistogramTimer':
+        return HistogramTimer(self, labels)
+
+
+class HistogramTimer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+http_requests = Counter('http_requests_total', 'HTTP requests by route and status code', ('method', 'route', 'status'))
+http_request_duration = Histogram('http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'))
+event_loop_lag = Histogram('event_loop_lag_seconds', 'How late the event loop ran a timer callback',
+                           buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+event_loop_blocks = Counter('event_loop_blocks_total', 'Event loop stalls caught by the watchdog by route', ('route',))
+http_requests_in_flight = Gauge('http_requests_in_flight', 'HTTP requests being handled')
+admission_rejections = Counter('admission_rejections_total', 'Requests shed by the admission control by priority',
+                               ('priority',))
+http_requests_cancelled = Counter('http_requests_cancelled_total', 'Requests cancelled because the client disconnected',
+                                  ('route',))
+db_pool_checkout_wait = Histogram('db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled database connection',
+                                  buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+db_statement_timeouts = Counter('db_statement_timeouts_total', 'Requests whose query ran past its statement timeout',
+                                ('route',))
+db_pool_checked_out = Gauge('db_pool_checked_out', 'Database connections currently checked out of the pool')
+user_loader_batch_size = Histogram('user_loader_batch_size', 'Users requested by one batched lookup query', ('key',),
+                                   buckets=(1, 2, 5, 10, 20, 50, 100, 200))
+redis_pool_wait = Histogram('redis_pool_wait_seconds', 'Time spent waiting for a pooled Redis connection', ('pool',),
+                            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+redis_pool_in_use = Gauge('redis_pool_connections_in_use', 'Redis connections currently checked out by pool', ('pool',))
+circuit_breaker_open = Gauge('circuit_breaker_open', 'Whether the circuit breaker of a dependency is open', ('name',))
+redis_fallbacks = Counter('redis_fallbacks_total', 'Redis operations served by the local fallback', ('workload',))
+cache_requests = Counter('cache_requests_total', 'Cache lookups by namespace', ('namespace',))
+cache_misses = Counter('cache_misses_total', 'Cache lookups that had to compute the value', ('namespace',))
+rate_limit_rejections = Counter('rate_limit_rejections_total', 'Requests rejected by the rate limiter', ('route',))
+bcrypt_queue_depth = Gauge('bcrypt_queue_depth', 'Password hash operations waiting for or running in the bcrypt pool')
+bcrypt_duration = Histogram('bcrypt_duration_seconds', 'Password hash operation latency, including the queue wait',
+                            ('operation',))
+email_send_duration = Histogram('email_send_duration_seconds', 'Email send latency', ('template', 'result'))
+email_opens = Counter('email_opens_total', 'Tracking pixel hits by campaign', ('campaign',))
+email_opens_dropped = Counter('email_opens_dropped_total', 'Email open events dropped because the buffer was full')
+outbound_call_duration = Histogram('outbound_call_duration_seconds', 'Outbound integration call latency by result',
+                                   ('service', 'result'))
+outbound_in_flight = Gauge('outbound_in_flight', 'Outbound integration calls in flight', ('service',))
+log_records_dropped = Counter('log_records_dropped_total', 'Log records dropped because the logging queue was full')
+
+
+def verify_scraper(request: Request) -> None:
+    """
+    Require ``Authorization: Bearer <METRICS_TOKEN>`` when the token is set. Without it the route is open,
+    and must only be reachable from the scraper, e.g. not proxied to the public.
+
+    :raises HTTPException: 401 if the token is missing or wrong.
+    """
+    if not app_config.METRICS_TOKEN:
+        return
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), app_config.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.METRICS_UNAUTHORIZED,
+                            headers={'WWW-Authenticate': 'Bearer'})
+
+
+@router.get('/metrics', include_in_schema=False, dependencies=[Depends(verify_scraper)])
+async def metrics():
+    """
+    Expose the metrics of all the workers in the Prometheus text format.
+
+    :return: The exposition text.
+    :rtype: PlainTextResponse
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from conf.config import app_config
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.services.metrics import outbound_call_duration, outbound_in_flight
+
+
+class OutboundService:
+    """
+    The resilience layer of an outbound integration, e.g. the SMTP server or the image storage.
+
+    Every call has a deadline covering both the wait for a free slot and the call itself; at most
+    ``concurrency`` calls are in flight per worker, so a slow provider cannot take every worker or
+    background task slot; and a circuit breaker fails the calls fast while the provider is down,
+    probing it again with exponential backoff. Latency by result and the calls in flight are recorded
+    under the service ``name``.
+
+    :param name: The service name, the label of the metrics and of the breaker.
+    :type name: str
+    :param timeout: The default deadline of a call, in seconds.
+    :type timeout: float
+    :param concurrency: The maximum number of calls in flight.
+    :type concurrency: int
+    :param errors: Returns the exceptions that mean the provider is failing, called on first use so that
+        the client library is only imported by the workers that call it. Timeouts and ``OSError`` always are.
+    :type errors: Callable[[], tuple[type[BaseException], ...]]
+    """
+
+    def __init__(self, name: str, timeout: float, concurrency: int,
+                 errors: Callable[[], tuple[type[BaseException], ...]] = tuple):
+        self.name = name
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.breaker = CircuitBreaker(name, app_config.OUTBOUND_BREAKER_THRESHOLD, app_config.OUTBOUND_BREAKER_BACKOFF,
+                                      app_config.OUTBOUND_BREAKER_MAX_BACKOFF, errors=(OSError,))
+        self._errors = errors
+        self._errors_loaded = False
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # A semaphore is bound to the event loop of the worker that first waits on it
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.concurrency), loop
+        return self._semaphore
+
+    async def call(self, function: Callable[[], Awaitable], timeout: float | None = None):
+        """
+        Call the provider.
+
+        :param function: Returns the awaitable of the call, e.g. ``asyncio.to_thread`` of a blocking SDK call.
+        :type function: Callable[[], Awaitable]
+        :param timeout: The deadline in seconds, the service ``timeout`` by default.
+        :type timeout: float | None
+        :return: The result of the call.
+        :raises CircuitOpenError: If the provider is failing, without waiting.
+        :raises asyncio.TimeoutError: If the deadline passed, waiting for a slot or for the provider.
+        """
+        if not self._errors_loaded:
+            self.breaker.errors = (OSError, *self._errors())
+            self._errors_loaded = True
+        deadline = time.monotonic() + (timeout or self.timeout)
+        started = time.perf_counter()
+        result = 'error'
+        try:
+            if self.breaker.state == 'open':
+                result = 'open'
+                raise CircuitOpenError(self.name)
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                result = 'busy'
+                raise
+            outbound_in_flight.inc(service=self.name)
+            try:
+                value = await self.breaker.call(function, max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                result = 'timeout'
+                raise
+            except CircuitOpenError:
+                # Another call is probing the provider
+                result = 'open'
+                raise
+            finally:
+                outbound_in_flight.dec(service=self.name)
+                self._semaphore.release()
+            result = 'ok'
+            return value
+        finally:
+            outbound_call_duration.observe(time.perf_counter() - started, service=self.name, result=result)
+
+
+def _mail_errors() -> tuple[type[BaseException], ...]:
+    from fastapi_mail.errors import ConnectionErrors
+
+    return (ConnectionErrors,)
+
+
+def _storage_errors() -> tuple[type[BaseException], ...]:
+    # Not the 4xx errors, e.g. an invalid image, which say nothing about the health of the storage
+    from cloudinary.exceptions import GeneralError, RateLimited
+
+    return (GeneralError, RateLimited)
+
+
+mail_service = OutboundService('smtp', app_config.MAIL_TIMEOUT, app_config.MAIL_CONCURRENCY, _mail_errors)
+storage_service = OutboundService('cloudinary', app_config.CLOUDINARY_TIMEOUT, app_config.CLOUDINARY_CONCURRENCY,
+                                  _storage_errors)
@@ -0,0 +1,89 @@
+import hashlib
+
+from fastapi import Request, Response
+from fastapi.templating import Jinja2Templates
+from markupsafe import escape
+
+MARKER = '\x00'
+
+
+class StaticPage:
+    """
+    A page whose content never changes while the process runs: rendered once, served as bytes with an ETag.
+
+    :param templates: The templates environment.
+    :type templates: Jinja2Templates
+    :param name: The template name.
+    :type name: str
+    :param context: The template variables.
+    :type context: dict
+    """
+
+    def __init__(self, templates: Jinja2Templates, name: str, context: dict):
+        self.body = templates.get_template(name).render(context).encode('utf-8')
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.headers = {'ETag': self.etag, 'Cache-Control': 'no-cache'}
+
+    def response(self, request: Request) -> Response:
+        """
+        The page, or 304 Not Modified when the client already has this version.
+
+        :param request: The current request.
+        :type request: Request
+        :return: The response.
+        :rtype: Response
+        """
+        if_none_match = request.headers.get('if-none-match', '')
+        if self.etag in (tag.strip() for tag in if_none_match.split(',')) or if_none_match.strip() == '*':
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type='text/html', headers=self.headers)
+
+
+class FragmentTemplate:
+    """
+    A page with only a few variables: rendered once with markers in place of the variables and split
+    into fragments, so a request only escapes the values and joins the strings.
+
+    The variables must be plain ``{{ name }}`` outputs, a variable used in a condition, a loop or a filter
+    would be rendered with the marker value; the constructor checks the result against a real render.
+
+    :param templates: The templates environment.
+    :type templates: Jinja2Templates
+    :param name: The template name.
+    :type name: str
+    :param context: The template variables that are the same for every request.
+    :type context: dict
+    :param variables: The names of the per-request variables.
+    :type variables: tuple[str, ...]
+    """
+
+    def __init__(self, templates: Jinja2Templates, name: str, context: dict, variables: tuple[str, ...]):
+        template = templates.get_template(name)
+        rendered = template.render(context, **{variable: f'{MARKER}{variable}{MARKER}' for variable in variables})
+        parts = rendered.split(MARKER)
+        # Text and variable names alternate: text, name, text, name, ..., text
+        self.fragments = parts[::2]
+        self.variables = parts[1::2]
+        unknown = set(self.variables) - set(variables)
+        if unknown:
+            raise ValueError(f'{name}: unexpected markers {unknown}')
+
+        # An empty value catches the variables used in conditions, the marker itself is truthy
+        for sample in ({variable: f'sample-{variable}-<&>' for variable in variables},
+                       {variable: '' for variable in variables}):
+            if self.render(**sample) != template.render(context, **sample):
+                raise ValueError(f'{name}: {", ".join(variables)} must only be used as plain {{{{ variable }}}} outputs')
+
+    def render(self, **values) -> str:
+        """
+        Join the fragments with the escaped values.
+
+        :return: The rendered page.
+        :rtype: str
+        """
+        escaped = {variable: str(escape(value)) for variable, value in values.items()}
+        parts = [self.fragments[0]]
+        for variable, fragment in zip(self.variables, self.fragments[1:]):
+            parts.append(escaped[variable])
+            parts.append(fragment)
+        return ''.join(parts)
@@ -0,0 +1,157 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from conf.config import app_config
+
+_ROOT = str(app_config.BASE_DIR)
+_running = False
+
+
+def _frame_label(filename: str, lineno: int, name: str) -> str:
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT) + 1:]
+    else:
+        filename = Path(filename).name
+    return f'{name} ({filename}:{lineno})'
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the Python stacks of all the other threads every ``interval`` seconds.
+
+    Nothing is hooked into the interpreter, the cost is only paid while the thread runs.
+
+    :param interval: The sampling interval, in seconds.
+    :type interval: float
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+
+    def collapsed(self) -> str:
+        """
+        The samples in the collapsed-stack format read by flamegraph.pl and speedscope.
+
+        :return: One ``frame;frame;frame count`` line per distinct stack.
+        :rtype: str
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+def _task_stack(task: asyncio.Task) -> tuple[list[str], str | None]:
+    stack, coro = [], task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        stack.append(_frame_label(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+        awaited = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+        if awaited is None or not (hasattr(awaited, 'cr_frame') or hasattr(awaited, 'gi_frame')):
+            return stack, repr(awaited)[:200] if awaited is not None else None
+        coro = awaited
+    return stack, None
+
+
+class TaskSampler:
+    """
+    Samples the pending asyncio tasks of the running loop and measures how long each one stays
+    suspended at the same await.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+
+    def sample(self) -> None:
+        now = time.monotonic()
+        current = asyncio.current_task()
+        for task in asyncio.all_tasks():
+            if task is current or task.done():
+                continue
+            stack, waiting_on = _task_stack(task)
+            location = stack[-1] if stack else None
+            known = self.tasks.get(task)
+            if known is None or known['location'] != location:
+                known = self.tasks[task] = {'location': location, 'since': now}
+            known.update(stack=stack, waiting_on=waiting_on, seen=now)
+
+    def dump(self) -> list[dict]:
+        """
+        The tasks seen in the last sample, the longest suspended first.
+
+        ``awaiting_for`` is a lower bound, it is only measured while the profiler runs.
+
+        :return: The task name, coroutine, await location, awaited object and stack of every task.
+        :rtype: list[dict]
+        """
+        last = max((task['seen'] for task in self.tasks.values()), default=0)
+        dump = [
+            {
+                'name': task.get_name(),
+                'coro': getattr(task.get_coro(), '__qualname__', repr(task.get_coro())),
+                'awaiting_at': info['location'],
+                'awaiting_for': round(info['seen'] - info['since'], 3),
+                'waiting_on': info['waiting_on'],
+                'stack': info['stack'],
+            }
+            for task, info in self.tasks.items() if info['seen'] == last
+        ]
+        return sorted(dump, key=lambda task: task['awaiting_for'], reverse=True)
+
+
+def is_running() -> bool:
+    return _running
+
+
+async def profile(seconds: float, interval: float) -> tuple[str, list[dict]]:
+    """
+    Sample the thread stacks and the asyncio tasks of this worker for ``seconds``.
+
+    Only one profile runs at a time per worker, check ``is_running`` first.
+
+    :param seconds: The profiling duration.
+    :type seconds: float
+    :param interval: The sampling interval, in seconds.
+    :type interval: float
+    :return: The collapsed stacks and the task dump.
+    :rtype: tuple[str, list[dict]]
+    """
+    global _running
+    _running = True
+    sampler = StackSampler(interval)
+    tasks = TaskSampler()
+    sampler.start()
+    try:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            tasks.sample()
+            await asyncio.sleep(interval)
+    finally:
+        sampler.stop()
+        await asyncio.to_thread(sampler.join)
+        _running = False
+    return sampler.collapsed(), tasks.dump()
@@ -0,0 +1,160 @@
+import time
+from typing import AsyncIterator
+
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from conf.config import app_config
+from src.services.metrics import redis_pool_wait, redis_pool_in_use
+
+# The workloads using Redis. Each one gets the shared pool unless it is listed in REDIS_SEPARATE_POOLS.
+WORKLOADS = ('cache', 'limiter', 'tokens')
+SHARED_POOL = 'shared'
+
+
+class TimedConnectionPool(BlockingConnectionPool):
+    """
+    Connection pool with a maximum size that waits up to ``timeout`` seconds for a free connection,
+    recording the wait and the connections in use under its ``name``.
+
+    :param name: The pool label of the metrics.
+    :type name: str
+    """
+
+    def __init__(self, name: str, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        finally:
+            redis_pool_wait.observe(time.perf_counter() - started, pool=self.name)
+        redis_pool_in_use.inc(pool=self.name)
+        return connection
+
+    async def release(self, connection) -> None:
+        await super().release(connection)
+        redis_pool_in_use.dec(pool=self.name)
+
+    def status(self) -> dict:
+        in_use = len(self._in_use_connections)
+        return {'capacity': self.max_connections, 'in_use': in_use, 'usage': round(in_use / self.max_connections, 3)}
+
+
+def create_redis(name: str, url: str = None) -> Redis:
+    """
+    Build a Redis client on a pool of its own, tuned by the ``REDIS_*`` settings.
+
+    :param name: The pool label of the metrics.
+    :type name: str
+    :param url: The server URL, ``REDIS_URL`` by default.
+    :type url: str
+    :return: The client.
+    :rtype: Redis
+    """
+    pool = TimedConnectionPool.from_url(
+        url or app_config.REDIS_URL,
+        name=name,
+        max_connections=app_config.REDIS_MAX_CONNECTIONS,
+        timeout=app_config.REDIS_POOL_TIMEOUT,
+        socket_timeout=app_config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=app_config.REDIS_CONNECT_TIMEOUT,
+        health_check_interval=app_config.REDIS_HEALTH_CHECK_INTERVAL,
+        encoding='utf-8',
+    )
+    return Redis.from_pool(pool)
+
+
+class RedisClients:
+    """
+    The Redis clients of the workloads, created on first use. The workloads in ``separate`` get a pool
+    of their own, e.g. so that a burst of cache reads cannot starve the rate limiter; the others share
+    one pool.
+
+    :param separate: Comma separated workloads with a pool of their own.
+    :type separate: str
+    """
+
+    def __init__(self, separate: str = ''):
+        self.separate = {workload.strip() for workload in separate.split(',') if workload.strip()}
+        unknown = self.separate - set(WORKLOADS)
+        if unknown:
+            raise ValueError(f'Unknown Redis workloads in REDIS_SEPARATE_POOLS: {", ".join(sorted(unknown))}')
+        self._clients: dict[str, Redis] = {}
+
+    def pool_name(self, workload: str) -> str:
+        return workload if workload in self.separate else SHARED_POOL
+
+    def get(self, workload: str) -> Redis:
+        """
+        :param workload: One of ``WORKLOADS``.
+        :type workload: str
+        :return: The client of the workload.
+        :rtype: Redis
+        """
+        if workload not in WORKLOADS:
+            raise ValueError(f'Unknown Redis workload: {workload}')
+        name = self.pool_name(workload)
+        if name not in self._clients:
+            self._clients[name] = create_redis(name)
+        return self._clients[name]
+
+    async def ping(self) -> None:
+        """
+        Ping the server through every pool of the workloads.
+        """
+        for workload in WORKLOADS:
+            await self.get(workload).ping()
+
+    def pool_status(self) -> dict:
+        """
+        :return: The capacity and usage of every pool created so far.
+        :rtype: dict
+        """
+        return {name: client.connection_pool.status() for name, client in self._clients.items()}
+
+    async def aclose(self) -> None:
+        """
+        Close the pools, the clients are created again on next use.
+        """
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+async def delete_matching(redis: Redis, pattern: str, batch_size: int = 500) -> int:
+    """
+    Delete the keys matching ``pattern`` without blocking the server: the keys are found with ``SCAN``
+    and unlinked in batches, every batch sent in one pipeline round trip.
+
+    :param redis: The client.
+    :type redis: Redis
+    :param pattern: The glob-style key pattern.
+    :type pattern: str
+    :param batch_size: The keys unlinked per round trip.
+    :type batch_size: int
+    :return: The number of keys deleted.
+    :rtype: int
+    """
+    deleted = 0
+    async for batch in _batches(redis.scan_iter(match=pattern, count=batch_size), batch_size):
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in batch:
+                pipe.unlink(key)
+            deleted += sum(await pipe.execute())
+    return deleted
+
+
+async def _batches(keys: AsyncIterator, size: int) -> AsyncIterator[list]:
+    batch = []
+    async for key in keys:
+        batch.append(key)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+redis_clients = RedisClients(app_config.REDIS_SEPARATE_POOLS)
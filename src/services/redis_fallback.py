@@ -0,0 +1,258 @@
+"""
+Keep serving when Redis is slow or down.
+
+Every Redis call of the cache, the rate limiter and the token versions goes through ``redis_breaker``:
+a call that fails or takes longer than ``REDIS_OPERATION_TIMEOUT`` is answered by a per-worker
+fallback, and after ``REDIS_BREAKER_THRESHOLD`` consecutive failures Redis is not called at all
+until the breaker re-probes it, with exponential backoff.
+
+- The response cache falls back to a local LRU of ``REDIS_FALLBACK_CACHE_SIZE`` entries.
+- The rate limiter falls back to local fixed-window buckets, the limits then apply per worker.
+- Cache invalidations that did not reach Redis are queued, and the keys they cover are served from
+  the local cache until the queue is replayed after Redis answered again.
+"""
+import asyncio
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from fastapi_cache.types import Backend
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+from conf.config import app_config
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.services.metrics import redis_fallbacks
+from src.services.redis_client import delete_matching
+
+# A Redis reply, even an error reply, means the server is up: only these count as failures
+REDIS_FAILURES = (RedisConnectionError, RedisTimeoutError, OSError)
+FALLBACK_ERRORS = (CircuitOpenError, asyncio.TimeoutError, *REDIS_FAILURES)
+
+
+redis_breaker = CircuitBreaker('redis', app_config.REDIS_BREAKER_THRESHOLD, app_config.REDIS_BREAKER_BACKOFF,
+                               app_config.REDIS_BREAKER_MAX_BACKOFF, errors=REDIS_FAILURES)
+
+
+async def call_redis(function: Callable[[], Awaitable], timeout: float | None = None):
+    """
+    Call Redis through ``redis_breaker``.
+
+    :param function: Returns the awaitable of the Redis call.
+    :type function: Callable[[], Awaitable]
+    :param timeout: Seconds the call may take, ``REDIS_OPERATION_TIMEOUT`` by default.
+    :type timeout: float | None
+    :return: The result of the call.
+    :raises CircuitOpenError: If the breaker is open.
+    """
+    return await redis_breaker.call(function, timeout or app_config.REDIS_OPERATION_TIMEOUT)
+
+
+class LocalCacheBackend(Backend):
+    """
+    A bounded in-memory LRU with the interface of the fastapi-cache backends.
+
+    :param maxsize: The maximum number of entries.
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+
+    def _entry(self, key: str) -> tuple[bytes, float | None] | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        entry = self._entry(key)
+        if entry is None:
+            return 0, None
+        value, expires_at = entry
+        return (-1 if expires_at is None else math.ceil(expires_at - time.monotonic())), value
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entry(key)
+        return entry[0] if entry is not None else None
+
+    async def set(self, key: str, value: bytes, expire: int | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + expire if expire else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def clear(self, namespace: str | None = None, key: str | None = None) -> int:
+        if namespace:
+            keys = [cached for cached in self._entries if cached.startswith(f'{namespace}:')]
+        else:
+            keys = [key] if key in self._entries else []
+        for cached in keys:
+            del self._entries[cached]
+        return len(keys)
+
+
+class ResilientCacheBackend(Backend):
+    """
+    The fastapi-cache backend: Redis, with ``LocalCacheBackend`` as the fallback.
+
+    The fallback is per worker. While Redis is unavailable, a write invalidates the local entries of
+    the worker that handled it only: the other workers keep serving their local copy, e.g. a stale
+    contact list, until the entry expires. The invalidation reaches Redis once it answers again.
+
+    :param redis: The Redis client of the cache.
+    :type redis: Redis
+    :param local: The fallback, a ``LocalCacheBackend`` of ``REDIS_FALLBACK_CACHE_SIZE`` by default.
+    :type local: LocalCacheBackend | None
+    """
+
+    def __init__(self, redis: Redis, local: LocalCacheBackend | None = None):
+        self.redis = redis
+        self.local = local or LocalCacheBackend(app_config.REDIS_FALLBACK_CACHE_SIZE)
+        # Invalidations to replay in Redis: namespaces, with their trailing ':', and single keys
+        self.pending_namespaces: set[str] = set()
+        self.pending_keys: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+
+    def is_pending(self, key: str) -> bool:
+        return key in self.pending_keys or any(key.startswith(namespace) for namespace in self.pending_namespaces)
+
+    async def _call(self, function: Callable[[], Awaitable], timeout: float | None = None):
+        result = await call_redis(function, timeout)
+        if (self.pending_namespaces or self.pending_keys) and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        return result
+
+    async def get_with_ttl(self, key: str) -> tuple[int, bytes | None]:
+        if not self.is_pending(key):
+            async def read():
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    return await pipe.ttl(key).get(key).execute()
+            try:
+                return await self._call(read)
+            except FALLBACK_ERRORS:
+                redis_fallbacks.inc(workload='cache')
+        return await self.local.get_with_ttl(key)
+
+    async def get(self, key: str) -> bytes | None:
+        if not self.is_pending(key):
+            try:
+                return await self._call(lambda: self.redis.get(key))
+            except FALLBACK_ERRORS:
+                redis_fallbacks.inc(workload='cache')
+        return await self.local.get(key)
+
+    async def set(self, key: str, value: bytes, expire: int | None = None) -> None:
+        if not self.is_pending(key):
+            try:
+                await self._call(lambda: self.redis.set(key, value, ex=expire))
+                return
+            except FALLBACK_ERRORS:
+                redis_fallbacks.inc(workload='cache')
+        await self.local.set(key, value, expire)
+
+    async def clear(self, namespace: str | None = None, key: str | None = None) -> int:
+        deleted = await self.local.clear(namespace, key)
+        try:
+            if namespace:
+                # Not bounded by REDIS_OPERATION_TIMEOUT, a large namespace takes several round trips
+                deleted += await self._call(lambda: delete_matching(self.redis, f'{namespace}:*'),
+                                            timeout=app_config.REDIS_SOCKET_TIMEOUT * 5)
+            elif key:
+                deleted += await self._call(lambda: self.redis.unlink(key))
+        except FALLBACK_ERRORS:
+            redis_fallbacks.inc(workload='cache')
+            if namespace:
+                self.pending_namespaces.add(f'{namespace}:')
+            elif key:
+                self.pending_keys.add(key)
+        return deleted
+
+    async def flush(self) -> None:
+        """
+        Replay the queued invalidations, the ones that fail again stay queued.
+        """
+        for namespace in list(self.pending_namespaces):
+            try:
+                await call_redis(lambda: delete_matching(self.redis, f'{namespace}*'),
+                                 timeout=app_config.REDIS_SOCKET_TIMEOUT * 5)
+            except FALLBACK_ERRORS:
+                return
+            self.pending_namespaces.discard(namespace)
+            await self.local.clear(namespace.rstrip(':'))
+        for key in list(self.pending_keys):
+            try:
+                await call_redis(lambda: self.redis.unlink(key))
+            except FALLBACK_ERRORS:
+                return
+            self.pending_keys.discard(key)
+            await self.local.clear(key=key)
+
+
+class LocalRateLimiter:
+    """
+    Per-worker fixed-window counters with the semantics of the fastapi-limiter Lua script.
+
+    :param maxsize: The maximum number of counters kept, the oldest are dropped first.
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[int, float]] = OrderedDict()
+
+    def hit(self, key: str, limit: int, expire_ms: int) -> int:
+        """
+        Count a request.
+
+        :return: 0 if the request is allowed, else the milliseconds until the window resets.
+        :rtype: int
+        """
+        now = time.monotonic()
+        count, resets_at = self._buckets.get(key, (0, 0.0))
+        if resets_at <= now:
+            self._buckets[key] = (1, now + expire_ms / 1000)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return 0
+        if count + 1 > limit:
+            return max(1, math.ceil((resets_at - now) * 1000))
+        self._buckets[key] = (count + 1, resets_at)
+        return 0
+
+
+class ResilientLimiterRedis:
+    """
+    The client given to ``FastAPILimiter.init``: the two calls the limiter makes go to Redis, or to
+    ``LocalRateLimiter`` when Redis is unavailable.
+
+    :param redis: The Redis client of the rate limiter.
+    :type redis: Redis
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self.local = LocalRateLimiter()
+
+    async def script_load(self, script: str) -> str:
+        try:
+            return await call_redis(lambda: self.redis.script_load(script))
+        except FALLBACK_ERRORS:
+            # The SHA1 Redis would return, the script is loaded by the limiter on its first NOSCRIPT reply
+            return hashlib.sha1(script.encode()).hexdigest()
+
+    async def evalsha(self, sha: str, numkeys: int, key: str, limit: str, expire_ms: str) -> int:
+        try:
+            return await call_redis(lambda: self.redis.evalsha(sha, numkeys, key, limit, expire_ms))
+        except FALLBACK_ERRORS:
+            redis_fallbacks.inc(workload='limiter')
+            return self.local.hit(key, int(limit), int(expire_ms))
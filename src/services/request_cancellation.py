@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.metrics import http_requests_cancelled
+
+logger = logging.getLogger("uvicorn.error")
+# Requests without side effects: cancelling them half way leaves nothing to clean up
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    Cancel the handler of a read request when its client disconnects, rather than let it run to the
+    end for nobody. The running query, if any, is cancelled on the server by the driver, and its
+    connection goes back to the pool.
+
+    The handler runs in a task of its own. A watcher task reads the client messages ahead of it, one
+    at a time so that a request body keeps its flow control, and hands them over through a queue.
+
+    :param app: The wrapped ASGI app.
+    :type app: ASGIApp
+    :param methods: The request methods whose handlers are cancelled.
+    :type methods: frozenset[str]
+    """
+
+    def __init__(self, app: ASGIApp, methods: frozenset[str] = SAFE_METHODS):
+        self.app = app
+        self.methods = methods
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue[Message] = asyncio.Queue(maxsize=1)
+        responded = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal responded
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                responded = True
+            await send(message)
+
+        handler = asyncio.create_task(self.app(scope, messages.get, send_wrapper))
+
+        async def watch() -> None:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    # Once the response is sent the server reports a disconnect too, the handler may
+                    # still be running its background tasks
+                    if not responded:
+                        handler.cancel()
+                    if not messages.full():
+                        messages.put_nowait(message)
+                    return
+                await messages.put(message)
+
+        watcher = asyncio.create_task(watch())
+        try:
+            # A cancellation of this task, e.g. on shutdown, is passed on to the handler
+            await handler
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            route = scope.get('route')
+            http_requests_cancelled.inc(route=route.path if route else 'unmatched')
+            logger.info(f"{scope['method']} {scope['path']} cancelled, the client disconnected")
+        finally:
+            watcher.cancel()
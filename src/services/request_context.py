@@ -0,0 +1,63 @@
+import re
+import uuid
+from contextvars import ContextVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# The scope and the id of the request being handled, in the tasks of the request
+current_scope: ContextVar[Scope | None] = ContextVar('current_scope', default=None)
+request_id: ContextVar[str | None] = ContextVar('request_id', default=None)
+
+REQUEST_ID_HEADER = b'x-request-id'
+# An id set by a proxy is kept if it cannot inject anything into the logs
+_VALID_REQUEST_ID = re.compile(rb'[A-Za-z0-9._-]{1,64}')
+
+
+def route_name(scope: Scope | None) -> str:
+    """
+    :param scope: A request scope.
+    :type scope: Scope | None
+    :return: The path template of the matched route, ``'unmatched'`` before routing or for a 404, ``'unknown'``
+        outside of a request. Never the request path, which would make a metric series per URL.
+    :rtype: str
+    """
+    if scope is None:
+        return 'unknown'
+    route = scope.get('route')
+    return route.path if route is not None else 'unmatched'
+
+
+class RequestContextMiddleware:
+    """
+    Make the request scope and id available to the code the request runs, through ``current_scope``
+    and ``request_id``. The id is the ``X-Request-ID`` header of the request, or a new one, and is
+    returned in the same header of the response.
+
+    :param app: The wrapped ASGI app.
+    :type app: ASGIApp
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        received = next((value for name, value in scope['headers'] if name == REQUEST_ID_HEADER), None)
+        if received is not None and _VALID_REQUEST_ID.fullmatch(received):
+            id_ = received.decode()
+        else:
+            id_ = uuid.uuid4().hex
+
+        async def send_with_id(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                message['headers'] = [*message.get('headers', []), (REQUEST_ID_HEADER, id_.encode())]
+            await send(message)
+
+        scope_token, id_token = current_scope.set(scope), request_id.set(id_)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            current_scope.reset(scope_token)
+            request_id.reset(id_token)
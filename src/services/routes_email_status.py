@@ -1,36 +1,64 @@
-from datetime import datetime, timezone
+from pathlib import Path
 
-from fastapi import Depends, Response, APIRouter
-from fastapi.responses import FileResponse
+from fastapi import Depends, Response, APIRouter, Query, Path as PathParam
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.db import get_db
+from src.services.admission import Priority, route_priorities
+from src.services.email_tracking.buffer import email_open_buffer
+from src.services.email_tracking.repository import get_open_stats
+from src.services.email_tracking.schemas import EmailOpenStatsSchema
+from src.users.roles_checker import RoleChecker
+from src.users.schemas import RoleEnum
 
 router = APIRouter(prefix="/email", tags=["email"])
+route_priorities.declare(router, Priority.LOW)
+access_to_stats = RoleChecker([RoleEnum.ADMIN])
+
+PIXEL = Path(__file__).parent.parent.joinpath('static', 'open_check.png').read_bytes()
+PIXEL_HEADERS = {
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0",
+    "Content-Disposition": "inline",
+}
+
+
+@router.get('/stats/', response_model=list[EmailOpenStatsSchema], dependencies=[Depends(access_to_stats)])
+async def email_open_stats(
+        username: str = Query(None, description='Only the opens of this recipient'),
+        campaign: str = Query(None, description='Only the opens of this campaign'),
+        days: int = Query(None, ge=1, le=366, description='None - for all time'),
+        db: AsyncSession = Depends(get_db)):
+    """
+    Aggregated email opens by recipient and campaign, read from the daily rollups.
+
+    Args:
+        username (str): Filter by recipient.
+        campaign (str): Filter by campaign.
+        days (int): Only count the last days.
+        db (AsyncSession): The database session dependency.
+
+    Returns:
+        list[EmailOpenStatsSchema]: The opens and the last open time, the most opened first.
+    """
+    return await get_open_stats(db, username, campaign, days)
 
 
 @router.get('/{username}')
-async def email_status(username: str, response: Response, db: AsyncSession = Depends(get_db)):
+async def email_status(username: str = PathParam(max_length=150),
+                       campaign: str = Query('default', max_length=50)):
     """
     Tracks the email status for a given username by responding with an image.
 
+    The open event is only buffered in memory, it is written to the database in batches.
+
     Args:
         username (str): The username for which the email status is being tracked.
-        response (Response): The FastAPI Response object.
-        db (AsyncSession): The database session dependency.
+        campaign (str): The email campaign, e.g. the template name.
 
     Returns:
-        FileResponse: An image file indicating that the email was opened.
+        Response: An image indicating that the email was opened.
     """
-    print('-----------------------------------------------------------------------')
-    print(f'Date / Time: {datetime.now(timezone.utc)} / {username} was opening an e-mail')
-    print('-----------------------------------------------------------------------')
-
-    headers = {
-        "Cache-Control": "no-cache, no-store, must-revalidate",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-
-    return FileResponse('src/static/open_check.png', media_type='image/png', headers=headers, content_disposition_type='inline'
-    )
+    email_open_buffer.record(username, campaign)
+    return Response(content=PIXEL, media_type='image/png', headers=PIXEL_HEADERS)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.templating import Jinja2Templates
+
+from conf.config import app_config
+from src.services.page_cache import StaticPage
+from src.services.static_assets import static_assets
+
+router = APIRouter(tags=["pages"])
+FAVICON_PATH = app_config.BASE_DIR / 'src' / 'static' / 'images' / 'favicon.png'
+templates = Jinja2Templates(directory=app_config.BASE_DIR / 'src' / 'templates')
+templates.env.globals['static_url'] = static_assets.url
+# Rendered once, the landing page has no per-request content
+index_page = StaticPage(templates, 'index.html', {'page_title': 'Python Test Landing Page'})
+
+
+@router.get("/favicon.ico", include_in_schema=False)
+async def favicon():
+    return FileResponse(FAVICON_PATH)
+
+
+@router.get("/", response_class=HTMLResponse)
+async def index(request: Request):
+    return index_page.response(request)
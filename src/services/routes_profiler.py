@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from conf import messages
+from src.services import profiler
+from src.services.admission import Priority, route_priorities
+from src.users.roles_checker import RoleChecker
+from src.users.schemas import RoleEnum
+
+router = APIRouter(prefix="/profiler", tags=["profiler"])
+route_priorities.declare(router, Priority.LOW)
+access_to_profiler = RoleChecker([RoleEnum.ADMIN])
+
+
+async def run_profile(seconds: float, interval_ms: int) -> tuple[str, list[dict]]:
+    if profiler.is_running():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=messages.PROFILER_BUSY)
+    return await profiler.profile(seconds, interval_ms / 1000)
+
+
+@router.get('/stacks', response_class=PlainTextResponse, dependencies=[Depends(access_to_profiler)])
+async def profile_stacks(
+        seconds: float = Query(5, gt=0, le=60),
+        interval_ms: int = Query(10, ge=1, le=1000)):
+    """
+    Sample the stacks of all the threads of the worker serving the request.
+
+    :param seconds: How long to profile (default 5, up to 60).
+    :type seconds: float
+    :param interval_ms: The sampling interval in milliseconds (default 10).
+    :type interval_ms: int
+
+    :return: The collapsed stacks, to be rendered with flamegraph.pl or speedscope.
+    :rtype: PlainTextResponse
+
+    :raises HTTPException: If a profile is already running on this worker, raises a 409 error.
+    """
+    collapsed, _ = await run_profile(seconds, interval_ms)
+    return PlainTextResponse(collapsed, headers={'Content-Disposition': 'attachment; filename="profile.collapsed"'})
+
+
+@router.get('/tasks', dependencies=[Depends(access_to_profiler)])
+async def profile_tasks(
+        seconds: float = Query(1, gt=0, le=60),
+        interval_ms: int = Query(10, ge=1, le=1000)):
+    """
+    Dump the pending asyncio tasks of the worker, the ones suspended the longest at the same await first.
+
+    :param seconds: How long to watch the tasks (default 1, up to 60).
+    :type seconds: float
+    :param interval_ms: The sampling interval in milliseconds (default 10).
+    :type interval_ms: int
+
+    :return: The task dump.
+    :rtype: list[dict]
+
+    :raises HTTPException: If a profile is already running on this worker, raises a 409 error.
+    """
+    _, tasks = await run_profile(seconds, interval_ms)
+    return tasks
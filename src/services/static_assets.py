@@ -0,0 +1,221 @@
+"""
+Static assets with content-hashed names and precompressed variants.
+
+The build step copies ``src/static`` into ``build/static``. Next to every file it writes a
+``name.<hash>.ext`` copy, ``.gz`` and ``.br`` variants of the compressible files, and a
+``manifest.json`` mapping the original paths to the hashed ones::
+
+    python -m src.services.static_assets
+
+Brotli variants need the optional ``brotli`` package, without it only gzip is written. When no build
+exists the source directory is served as is.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Scope
+
+from conf.config import app_config
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+SOURCE_DIR = app_config.BASE_DIR / 'src' / 'static'
+BUILD_DIR = app_config.BASE_DIR / 'build' / 'static'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.ico', '.ttf', '.eot'}
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+_CSS_URL = re.compile(r"""url\((["']?)(?!data:|[a-z]+://|//|/)([^"')?#]+)([?#][^"')]*)?\1\)""")
+
+
+def hashed_name(relative: str, content: bytes) -> str:
+    path = posixpath.splitext(relative)
+    return f'{path[0]}.{hashlib.sha256(content).hexdigest()[:12]}{path[1]}'
+
+
+def rewrite_css(css: str, relative: str, manifest: dict) -> str:
+    """
+    Point the relative ``url()`` references of a stylesheet at the hashed files.
+
+    :param css: The stylesheet.
+    :type css: str
+    :param relative: The stylesheet path, relative to the static directory.
+    :type relative: str
+    :param manifest: The original to hashed paths built so far.
+    :type manifest: dict
+    :return: The rewritten stylesheet.
+    :rtype: str
+    """
+    directory = posixpath.dirname(relative)
+
+    def replace(match):
+        quote, reference, suffix = match.group(1), match.group(2), match.group(3) or ''
+        target = manifest.get(posixpath.normpath(posixpath.join(directory, reference)))
+        if target is None:
+            return match.group(0)
+        # The hash replaces the cache-busting query string, fragments are kept
+        suffix = suffix if suffix.startswith('#') else ''
+        return f'url({quote}{posixpath.relpath(target, directory or ".")}{suffix}{quote})'
+
+    return _CSS_URL.sub(replace, css)
+
+
+def write_file(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    if path.suffix not in COMPRESSIBLE:
+        return
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(content):
+            path.with_name(path.name + suffix).write_bytes(compressed)
+
+
+def build(source: Path = SOURCE_DIR, output: Path = BUILD_DIR) -> dict:
+    """
+    Write the hashed and precompressed copies of the static files and their manifest.
+
+    :param source: The static files.
+    :type source: Path
+    :param output: The build directory, recreated from scratch.
+    :type output: Path
+    :return: The manifest.
+    :rtype: dict
+    """
+    shutil.rmtree(output, ignore_errors=True)
+    manifest = {}
+    # Stylesheets last, their url() references must already have hashed names
+    files = sorted((path for path in source.rglob('*') if path.is_file()), key=lambda path: (path.suffix == '.css', path))
+    for path in files:
+        relative = path.relative_to(source).as_posix()
+        content = path.read_bytes()
+        if path.suffix == '.css':
+            content = rewrite_css(content.decode('utf-8'), relative, manifest).encode('utf-8')
+        manifest[relative] = hashed_name(relative, content)
+        write_file(output / relative, content)
+        write_file(output / manifest[relative], content)
+    (output / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def accepted_encodings(header: str) -> set[str]:
+    encodings = set()
+    for item in header.split(','):
+        name, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        name = name.strip().lower()
+        if name and quality > 0:
+            encodings.add(name)
+    return encodings
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Serves the build directory: the precompressed variant accepted by the client if there is one,
+    ``immutable`` cache headers for the hashed files and revalidation for the others.
+
+    The variants are looked up once at start, the build directory never changes while serving.
+
+    :param directory: The build directory.
+    :type directory: Path
+    :param manifest: The original to hashed paths.
+    :type manifest: dict
+    """
+
+    def __init__(self, directory: Path, manifest: dict):
+        super().__init__(directory=directory)
+        self.immutable = {os.path.realpath(directory / hashed) for hashed in manifest.values()}
+        self.variants = {}
+        for path in Path(directory).rglob('*'):
+            for encoding, suffix in ENCODINGS:
+                if path.suffix == suffix:
+                    original = os.path.realpath(str(path)[:-len(suffix)])
+                    self.variants.setdefault(original, {})[encoding] = (str(path), path.stat())
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        headers = {'Cache-Control': IMMUTABLE if full_path in self.immutable else REVALIDATE}
+        media_type = None
+        variants = self.variants.get(full_path)
+        if variants:
+            headers['Vary'] = 'Accept-Encoding'
+            accepted = accepted_encodings(request_headers.get('accept-encoding', ''))
+            for encoding, _ in ENCODINGS:
+                if encoding in accepted and encoding in variants:
+                    media_type = mimetypes.guess_type(full_path)[0] or 'text/plain'
+                    full_path, stat_result = variants[encoding]
+                    headers['Content-Encoding'] = encoding
+                    break
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type,
+                                headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class StaticAssets:
+    """
+    The static files app and the URL resolver of the templates.
+
+    :param source: The static files.
+    :type source: Path
+    :param build_dir: The output of ``build``.
+    :type build_dir: Path
+    """
+
+    def __init__(self, source: Path = SOURCE_DIR, build_dir: Path = BUILD_DIR):
+        self.source = source
+        self.build_dir = build_dir
+        manifest_path = build_dir / MANIFEST
+        self.manifest = json.loads(manifest_path.read_text()) if manifest_path.is_file() else {}
+
+    def url(self, path: str) -> str:
+        """
+        The URL of a static file, hashed when the build has one. Exposed to Jinja as ``static_url``.
+
+        :param path: The path relative to the static directory, e.g. ``css/main.css``.
+        :type path: str
+        :return: The URL.
+        :rtype: str
+        """
+        return '/static/' + self.manifest.get(path, path)
+
+    def files(self) -> StaticFiles:
+        if self.manifest:
+            return PrecompressedStaticFiles(self.build_dir, self.manifest)
+        return StaticFiles(directory=self.source)
+
+
+static_assets = StaticAssets()
+
+
+if __name__ == '__main__':
+    built = build()
+    print(f'Built {len(built)} static files into {BUILD_DIR}' + ('' if brotli else ' (no brotli module, gzip only)'))
@@ -0,0 +1,208 @@
+"""
+The logging pipeline: the event loop only puts the log records in a queue, a listener thread formats
+and writes them, so that a slow stdout or disk never blocks the requests.
+
+- Records are rendered as JSON lines, or as text with ``LOG_FORMAT=text``, with the id and the route
+  of the request they were logged in.
+- ``LOG_SAMPLE_RATES`` keeps a share of the records of high-volume loggers, e.g. the request log
+  ``uvicorn.error.requests``. Warnings and errors are always kept.
+- When the queue is full the records are dropped and counted in ``log_records_dropped_total``.
+- With ``DB_ECHO`` the SQL statements go through the pipeline too.
+"""
+import json
+import logging
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from conf.config import app_config
+from src.services.metrics import log_records_dropped
+from src.services.request_context import current_scope, request_id, route_name
+
+# The attributes of every record, the others were passed with ``extra``
+_RECORD_ATTRIBUTES = set(logging.LogRecord('', 0, '', 0, '', None, None).__dict__) | {
+    'message', 'asctime', 'request_id', 'route', 'color_message'}
+# The loggers the pipeline handles: the app logs through "uvicorn.error" and its children
+PIPELINE_LOGGERS = ('uvicorn', 'uvicorn.access')
+SQL_LOGGER = 'sqlalchemy.engine.Engine'
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: the time, level, logger, message, request id and route, the
+    ``extra`` attributes and the formatted exception.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'route': getattr(record, 'route', None),
+        }
+        entry.update((key, value) for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a share of the records below ``WARNING`` of the sampled loggers and their children.
+
+    :param rates: The share of the records kept by logger name, between 0 and 1.
+    :type rates: dict[str, float]
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._by_logger: dict[str, float] = {}
+
+    @classmethod
+    def from_setting(cls, setting: str) -> 'SamplingFilter':
+        """
+        :param setting: Comma separated ``logger=rate`` pairs, e.g. ``uvicorn.error.requests=0.1``.
+        :type setting: str
+        """
+        rates = {}
+        for pair in filter(None, (pair.strip() for pair in setting.split(','))):
+            name, _, rate = pair.partition('=')
+            rates[name.strip()] = float(rate)
+        return cls(rates)
+
+    def rate(self, name: str) -> float:
+        rate = self._by_logger.get(name)
+        if rate is None:
+            # The rate of the closest sampled ancestor
+            parts = name.split('.')
+            rate = next((self.rates[prefix] for prefix in ('.'.join(parts[:i]) for i in range(len(parts), 0, -1))
+                         if prefix in self.rates), 1.0)
+            self._by_logger[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Queue the records without blocking, with what the listener thread cannot know: the message
+    rendered with its arguments, the exception text and the request context of the caller.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        # Unless the caller knows better, e.g. the loop watchdog thread
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = request_id.get()
+        if getattr(record, 'route', None) is None:
+            scope = current_scope.get()
+            record.route = route_name(scope) if scope is not None else None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+class DrainingQueueListener(QueueListener):
+    """
+    A ``QueueListener`` that waits for room in a full queue to stop, instead of raising ``queue.Full``.
+    """
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-8s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, 'request_id', None) or '-'
+        return super().format(record)
+
+
+class LogPipeline:
+    """
+    Route the app loggers through a ``ContextQueueHandler`` and a ``QueueListener`` thread, and
+    restore their handlers when stopped.
+
+    :param log_format: ``json`` or ``text``.
+    :type log_format: str
+    :param sample_rates: The ``LOG_SAMPLE_RATES`` setting.
+    :type sample_rates: str
+    :param queue_size: The maximum number of records waiting for the listener.
+    :type queue_size: int
+    :param sql_echo: Whether the SQL statements are logged.
+    :type sql_echo: bool
+    """
+
+    def __init__(self, log_format: str = 'json', sample_rates: str = '', queue_size: int = 10000,
+                 sql_echo: bool = False):
+        if log_format not in ('json', 'text'):
+            raise ValueError(f'Unknown LOG_FORMAT: {log_format}')
+        self.log_format = log_format
+        self.sampling = SamplingFilter.from_setting(sample_rates)
+        self.queue_size = queue_size
+        self.sql_echo = sql_echo
+        self.listener: DrainingQueueListener | None = None
+        self._replaced: dict[str, tuple[list[logging.Handler], bool, int]] = {}
+
+    def start(self, stream=None) -> None:
+        """
+        :param stream: Where the records are written, ``sys.stderr`` by default.
+        """
+        if self.listener is not None:
+            return
+        output = logging.StreamHandler(stream)
+        output.setFormatter(JsonFormatter() if self.log_format == 'json' else TextFormatter())
+        records = queue.Queue(self.queue_size)
+        handler = ContextQueueHandler(records)
+        handler.addFilter(self.sampling)
+        self.listener = DrainingQueueListener(records, output)
+        self.listener.start()
+
+        names = PIPELINE_LOGGERS + ((SQL_LOGGER,) if self.sql_echo else ())
+        for name in names:
+            logger = logging.getLogger(name)
+            self._replaced[name] = (logger.handlers[:], logger.propagate, logger.level)
+            logger.handlers = [handler]
+            logger.propagate = False
+        if self.sql_echo:
+            logging.getLogger(SQL_LOGGER).setLevel(logging.INFO)
+
+    def stop(self) -> None:
+        """
+        Write the queued records and give the loggers their handlers back.
+        """
+        if self.listener is None:
+            return
+        for name, (handlers, propagate, level) in self._replaced.items():
+            logger = logging.getLogger(name)
+            logger.handlers, logger.propagate = handlers, propagate
+            logger.setLevel(level)
+        self._replaced.clear()
+        self.listener.stop()
+        self.listener = None
+
+
+log_pipeline = LogPipeline(app_config.LOG_FORMAT, app_config.LOG_SAMPLE_RATES, app_config.LOG_QUEUE_SIZE,
+                           app_config.DB_ECHO)
@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from conf.config import app_config
+from src.services.metrics import cache_requests, cache_misses
+from src.users.models import User, Role
+
+
+def _columns(instance) -> dict:
+    return {attribute.key: getattr(instance, attribute.key) for attribute in inspect(type(instance)).column_attrs}
+
+
+def _detached(model, columns: dict):
+    instance = model(**columns)
+    make_transient_to_detached(instance)
+    return instance
+
+
+class UserCache:
+    """
+    Per-worker LRU of the users authenticated by ``Auth.get_current_user``, kept for ``ttl`` seconds,
+    so a request answered from the response cache does not need a database connection at all.
+
+    Entries hold column values, not ORM instances: every hit builds a new detached ``User`` with its
+    ``Role``, no instance is shared between concurrent requests or sessions. A user updated or deleted
+    through any ORM session is evicted from this worker when the transaction commits, see the session
+    events of ``src.users.repository``; other workers see the change once their entry expires.
+
+    :param ttl: How long a user is reused, in seconds, 0 - for disable cache.
+    :type ttl: float
+    :param maxsize: The maximum number of users kept.
+    :type maxsize: int
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, dict, dict | None]] = OrderedDict()
+
+    def get(self, email: str) -> User | None:
+        """
+        Return a detached copy of the cached user, or None on a miss or if the entry has expired.
+
+        :param email: The email of the user.
+        :type email: str
+        :return: The user or None.
+        :rtype: User | None
+        """
+        if self.ttl <= 0:
+            return None
+        cache_requests.inc(namespace='current_user')
+        entry = self._entries.get(email)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(email, None)
+            cache_misses.inc(namespace='current_user')
+            return None
+        self._entries.move_to_end(email)
+        _, user_columns, role_columns = entry
+        user = _detached(User, user_columns)
+        set_committed_value(user, 'role', _detached(Role, role_columns) if role_columns is not None else None)
+        return user
+
+    def put(self, user: User) -> None:
+        """
+        Store the column values of a user loaded from the database, with its role.
+
+        :param user: The loaded user.
+        :type user: User
+        """
+        if self.ttl <= 0:
+            return
+        role = _columns(user.role) if user.role is not None else None
+        self._entries[user.email] = (time.monotonic() + self.ttl, _columns(user), role)
+        self._entries.move_to_end(user.email)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, email: str) -> None:
+        self._entries.pop(email, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+user_cache = UserCache(app_config.AUTH_USER_CACHE_TTL)
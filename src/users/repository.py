@@ -1,16 +1,188 @@
+import asyncio
+import logging
+from typing import Any
+
 from fastapi.params import Depends
-from sqlalchemy import select
+from sqlalchemy import event, select, inspect
 from sqlalchemy.ext.asyncio import AsyncSession
-from libgravatar import Gravatar
+from sqlalchemy.orm import ORMExecuteState, Session
 
+from conf.config import app_config
 from database.db import get_db
+from src.services.metrics import user_loader_batch_size
+from src.users.cache import user_cache
 from src.users.models import User, Role
 from src.users.schemas import UserSchema, RoleEnum
 
+logger = logging.getLogger("uvicorn.error")
+
+# Returned to the only caller of a batch, which then runs its query in its own session
+_ALONE = object()
+
+
+class UserLoader:
+    """
+    Coalesce the concurrent lookups of users by one column into one ``WHERE <column> IN (...)`` query.
+
+    The first lookup of a batch schedules it ``window`` seconds later, or on the next event loop tick
+    for 0; the lookups of other requests made meanwhile join it. A lookup that stayed alone runs the
+    plain query in its own session, as without the loader. A batch of several lookups is loaded by a
+    short session of its own, and every caller merges its user into its own session without another
+    query, so no instance is shared between requests.
+
+    Results are memoized in the ``info`` of the caller's session: a request that looks up the same user
+    twice runs one query.
+
+    :param column: The ``User`` column looked up, ``email`` or ``id``.
+    :type column: str
+    :param window: Seconds the lookups are collected for, 0 - one event loop tick.
+    :type window: float
+    :param max_batch: The maximum number of lookups per query, 0 - for disable batching.
+    :type max_batch: int
+    """
+
+    def __init__(self, column: str, window: float, max_batch: int):
+        self.column = column
+        self.window = window
+        self.max_batch = max_batch
+        # The lookups collected per engine, with the future each caller waits on
+        self._pending: dict[Any, list[tuple[Any, asyncio.Future]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, key, db: AsyncSession) -> User | None:
+        """
+        Look up a user, together with the concurrent lookups of other requests.
+
+        :param key: The email or id of the user.
+        :type key: Any
+        :param db: The asynchronous database session of the caller.
+        :type db: AsyncSession
+        :return: The user, attached to ``db``, if found, else None.
+        :rtype: User | None
+        """
+        memo = db.info.setdefault('user_loader', {})
+        if (self.column, key) in memo:
+            return memo[(self.column, key)]
+
+        result = _ALONE
+        # The batches are loaded from the engine of the callers, a session without one is not batched
+        bind = getattr(db, 'bind', None)
+        if self.max_batch > 0 and bind is not None:
+            result = await self._join_batch(key, bind)
+        if result is _ALONE:
+            user = await self.query_one(key, db)
+        elif result is None:
+            user = None
+        else:
+            user = db.identity_map.get(inspect(result).key) or await db.merge(result, load=False)
+        memo[(self.column, key)] = user
+        return user
+
+    def forget(self, key, db: AsyncSession) -> None:
+        """
+        Drop a memoized lookup, e.g. after the user was created.
+        """
+        db.info.get('user_loader', {}).pop((self.column, key), None)
+
+    async def query_one(self, key, db: AsyncSession) -> User | None:
+        stmt = select(User).filter_by(**{self.column: key})
+        user = await db.execute(stmt)
+        user_loader_batch_size.observe(1, key=self.column)
+        return user.scalar_one_or_none()
+
+    async def _join_batch(self, key, bind):
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(bind)
+        if batch is None:
+            batch = self._pending[bind] = []
+            if self.window > 0:
+                loop.call_later(self.window, self._dispatch, bind, batch)
+            else:
+                loop.call_soon(self._dispatch, bind, batch)
+        future = loop.create_future()
+        batch.append((key, future))
+        if len(batch) >= self.max_batch:
+            self._dispatch(bind, batch)
+        return await future
+
+    def _dispatch(self, bind, batch: list) -> None:
+        if self._pending.get(bind) is not batch:
+            # Already dispatched when it was full
+            return
+        del self._pending[bind]
+        waiting = [(key, future) for key, future in batch if not future.done()]
+        if len(waiting) == 1:
+            waiting[0][1].set_result(_ALONE)
+        elif waiting:
+            task = asyncio.get_running_loop().create_task(self._load_batch(bind, waiting))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, bind, waiting: list) -> None:
+        try:
+            keys = list({key for key, _ in waiting})
+            async with AsyncSession(bind=bind, expire_on_commit=False) as session:
+                result = await session.execute(select(User).where(getattr(User, self.column).in_(keys)))
+                users = {getattr(user, self.column): user for user in result.scalars().all()}
+            user_loader_batch_size.observe(len(keys), key=self.column)
+        except Exception as error:
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for key, future in waiting:
+            if not future.done():
+                future.set_result(users.get(key))
+
+
+users_by_email = UserLoader('email', app_config.USER_LOADER_WINDOW_MS / 1000, app_config.USER_LOADER_MAX_BATCH)
+users_by_id = UserLoader('id', app_config.USER_LOADER_WINDOW_MS / 1000, app_config.USER_LOADER_MAX_BATCH)
+
+
+# Emails of the users changed by the transaction of a session, evicted from user_cache on commit;
+# _ALL_USERS for a bulk UPDATE or DELETE, whose rows are unknown
+_CHANGED_USERS = 'changed_users'
+_ALL_USERS = object()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, user: User) -> None:
+    changed = Session.object_session(user).info.setdefault(_CHANGED_USERS, set())
+    changed.add(user.email)
+    # The entry of the previous email of a user whose email changed
+    changed.update(inspect(user).attrs.email.history.deleted)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _users_changed(state: ORMExecuteState) -> None:
+    if (state.is_update or state.is_delete) and state.bind_mapper is inspect(User):
+        state.session.info.setdefault(_CHANGED_USERS, set()).add(_ALL_USERS)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session: Session) -> None:
+    """
+    The one place user_cache is invalidated: after the commit, so that a request cannot cache the
+    previous row again in between. Only the cache of this worker; the other workers keep their entry
+    for up to ``AUTH_USER_CACHE_TTL`` seconds.
+    """
+    changed = session.info.pop(_CHANGED_USERS, ())
+    if _ALL_USERS in changed:
+        user_cache.clear()
+        return
+    for email in changed:
+        user_cache.invalidate(email)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop(_CHANGED_USERS, None)
+
 
 async def get_user_by_email(email: str, db: AsyncSession) -> User:
     """
-    Retrieve a user by their email address.
+    Retrieve a user by their email address, batched with the concurrent lookups, see ``UserLoader``.
 
     :param email: The email address of the user to retrieve.
     :type email: str
@@ -20,17 +192,11 @@ async def get_user_by_email(email: str, db: AsyncSession) -> User:
     :return: The user object if found, else None.
     :rtype: User
     """
-    stmt = select(User).filter_by(email=email)
-    user = await db.execute(stmt)
-    user = user.scalar_one_or_none()
-    return user
+    return await users_by_email.load(email, db)
 
 
 async def get_user_by_id(user_id: int, db: AsyncSession) -> User:
-    stmt = select(User).filter_by(id=user_id)
-    user = await db.execute(stmt)
-    user = user.scalar_one_or_none()
-    return user
+    return await users_by_id.load(user_id, db)
 
 
 async def create_user(body: UserSchema, db: AsyncSession):
@@ -51,15 +217,18 @@ async def create_user(body: UserSchema, db: AsyncSession):
 
     avatar = None
     try:
+        from libgravatar import Gravatar
+
         g = Gravatar(body.email)
         avatar = g.get_image()
     except Exception as e:
-        print(e)
+        logger.warning(f"Gravatar of a new user failed: {e!r}")
 
     new_user = User(**body.model_dump(), avatar=avatar, role_id=user_role_id)
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+    users_by_email.forget(new_user.email, db)
     return new_user
 
 
@@ -92,7 +261,7 @@ async def verify_email(email: str, db: AsyncSession):
     await db.commit()
 
 
-async def update_user_password(email: str, password: str, db: AsyncSession = Depends(get_db)):
+async def update_user_password(email: str, password: str, db: AsyncSession = Depends(get_db)) -> User:
     """
     Update a user's password.
 
@@ -103,11 +272,13 @@ async def update_user_password(email: str, password: str, db: AsyncSession = Dep
     :param db: The asynchronous database session (optional).
     :type db: AsyncSession
 
-    :return: None
+    :return: The updated user object.
+    :rtype: User
     """
     user = await get_user_by_email(email, db)
     user.password = password
     await db.commit()
+    return user
 
 
 async def update_avatar_url(email: str, url: str | None, db: AsyncSession = Depends(get_db)) -> User:
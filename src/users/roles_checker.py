@@ -2,16 +2,30 @@ from fastapi.params import Depends
 from fastapi import status, HTTPException, Request
 
 from src.services.auth.jwt_auth import auth_service
-from src.users.models import User
 from src.users.schemas import RoleEnum
 
 
 class RoleChecker:
+    """
+    Authorize a request from the ``role`` claim of its access token, without loading the user.
+
+    :param allowed_roles: The roles allowed to access the route.
+    :type allowed_roles: list[RoleEnum]
+    """
+
     def __init__(self, allowed_roles: list[RoleEnum]):
-        self.allowed_roles = allowed_roles
+        self.allowed_roles = frozenset(role.value for role in allowed_roles)
 
-    async def __call__(self, request: Request, user: User = Depends(auth_service.get_current_user)):
-        if user.role is None or user.role.name not in [role.value for role in self.allowed_roles]:
+    async def __call__(self, request: Request, claims: dict = Depends(auth_service.get_token_claims)):
+        role = claims.get('role')
+        if role is None:
+            # Issued before the role claim was added, a refreshed token has it
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials (inner)",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if role not in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions",
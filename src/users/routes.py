@@ -1,26 +1,23 @@
+import asyncio
 import uuid
 from pathlib import Path
 
-import cloudinary
-import cloudinary.uploader
-from fastapi import Depends, APIRouter, UploadFile, File
+from fastapi import Depends, APIRouter, UploadFile, File, HTTPException, status
 from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.users import repository as user_repository
+from conf import messages
 from conf.config import app_config
 from database.db import get_db
 from src.users.models import User
 from src.users.schemas import UserResponseSchema
 from src.services.auth.jwt_auth import auth_service
+from src.services.circuit_breaker import CircuitOpenError
+from src.services.cloudinary_client import get_cloudinary
+from src.services.outbound import storage_service
 
 router = APIRouter(prefix="/users", tags=["users"])
-cloudinary.config(
-    cloud_name=app_config.CLOUDINARY_NAME,
-    api_key=app_config.CLOUDINARY_API_KEY,
-    api_secret=app_config.CLOUDINARY_API_SECRET,
-    secure=True,
-)
 
 
 @router.get('/me', response_model=UserResponseSchema, dependencies=[Depends(RateLimiter(times=10, seconds=60))])
@@ -48,6 +45,7 @@ async def get_current_user(file: UploadFile = File(),
 
     This endpoint allows the current authenticated user to update their avatar by uploading a new image file.
     The image is uploaded to Cloudinary, and the public URL is updated in the user's profile.
+    The upload runs in a thread through ``storage_service``, within ``CLOUDINARY_TIMEOUT``.
 
     :param file: The new avatar image file to be uploaded.
     :type file: UploadFile
@@ -58,10 +56,18 @@ async def get_current_user(file: UploadFile = File(),
 
     :return: The updated user details with the new avatar URL.
     :rtype: User
+    :raises HTTPException: 503 if the storage failed, is rate limiting or did not answer in time.
     """
+    cloudinary = get_cloudinary()
     ext = Path(file.filename).suffix.lower()
     unique_filename = uuid.uuid4().hex
-    res = cloudinary.uploader.upload(file.file, public_id=unique_filename, overwrite=True, folder=app_config.CLOUDINARY_FOLDER)
+    try:
+        res = await storage_service.call(lambda: asyncio.to_thread(
+            cloudinary.uploader.upload, file.file, public_id=unique_filename, overwrite=True,
+            folder=app_config.CLOUDINARY_FOLDER, timeout=app_config.CLOUDINARY_TIMEOUT))
+    except (CircuitOpenError, asyncio.TimeoutError,
+            cloudinary.exceptions.GeneralError, cloudinary.exceptions.RateLimited):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=messages.STORAGE_UNAVAILABLE)
     full_public_id = res.get('public_id')
     res_url = cloudinary.CloudinaryImage(full_public_id + ext).build_url(
         width=200,
@@ -1,4 +1,5 @@
 import asyncio
+import contextlib
 from datetime import datetime
 from unittest.mock import AsyncMock
 
@@ -8,14 +9,18 @@ from fastapi.testclient import TestClient
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.inmemory import InMemoryBackend
 from sqlalchemy import event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import functions
 from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from fastapi_limiter.depends import RateLimiter
 
 from conf.config import Base
 from database.db import get_db
+from database.instrumentation import instrument_engine
 from main import app
 from src.services.auth.jwt_auth import auth_service
+from src.users.cache import user_cache
 from src.users.models import User, Role
 
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -24,11 +29,18 @@ engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
 TestingSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+instrument_engine(engine.sync_engine)
 
 @event.listens_for(engine.sync_engine, "connect")
 def register_sqlite_functions(dbapi_connection, connection_record):
     dbapi_connection.create_function("date_part", 2, date_part)
 
+
+# Emulate the microsecond precision of Postgres now(), keyset cursors compare timestamps for equality
+@compiles(functions.now, 'sqlite')
+def sqlite_now(element, compiler, **kw):
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
 test_user = {'username': 'pacman', 'email': 'pacman@test.com', 'password': '000000'}
 
 
@@ -69,6 +81,11 @@ def init_models_wrap():
 
     asyncio.run(init_models())
 
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    user_cache.clear()
+
+
 @pytest.fixture(scope="module")
 def client():
     async def override_get_db():
@@ -89,7 +106,7 @@ def client():
 
 @pytest_asyncio.fixture()
 async def get_access_token():
-    access_token = await auth_service.create_access_token(data={"sub": test_user['email']})
+    access_token = await auth_service.create_access_token(data={"sub": test_user["email"], "uid": 1, "role": "admin"})
     return access_token
 #
 # @pytest_asyncio.fixture()
@@ -97,6 +114,56 @@ async def get_access_token():
 #     refresh_token = await auth_service.create_refresh_token(data={"sub": test_user['email']})
 #     return refresh_token
 
+@pytest.fixture()
+def assert_max_queries():
+    """
+    Fail when the block executes more than ``count`` statements, e.g.::
+
+        with assert_max_queries(2):
+            client.get('api/contacts')
+    """
+    @contextlib.contextmanager
+    def assert_max(count: int):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+        assert len(statements) <= count, f'{len(statements)} queries, expected at most {count}:\n' + '\n'.join(statements)
+
+    return assert_max
+
+
+@pytest.fixture()
+def count_pool_checkouts():
+    """
+    Record the connections checked out of the test pool in the block, e.g.::
+
+        with count_pool_checkouts() as checkouts:
+            client.get('api/contacts')
+        assert len(checkouts) == 1
+    """
+    @contextlib.contextmanager
+    def count():
+        checkouts = []
+
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            checkouts.append(connection_record)
+
+        event.listen(engine.sync_engine, 'checkout', on_checkout)
+        try:
+            yield checkouts
+        finally:
+            event.remove(engine.sync_engine, 'checkout', on_checkout)
+
+    return count
+
+
 @pytest_asyncio.fixture()
 async def redis_mock(monkeypatch):
     monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
@@ -0,0 +1,128 @@
+"""
+An in-memory stand-in for the asyncio Redis client, with fault injection:
+
+    redis = FakeRedis()
+    redis.latency = 1.0  # every command takes a second
+    redis.down = True  # every command fails with a ConnectionError
+
+Only the commands used by the cache, the rate limiter and the token versions are implemented.
+"""
+import asyncio
+import fnmatch
+import hashlib
+import time
+
+from redis.exceptions import ConnectionError, NoScriptError
+
+
+class FakePipeline:
+    def __init__(self, redis: 'FakeRedis'):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        await self.redis.fault()
+        return [getattr(self.redis, f'_{name}')(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict[str, tuple[bytes, float | None]] = {}
+        self.scripts: set[str] = set()
+        self.latency = 0.0
+        self.down = False
+        self.calls = 0
+
+    async def fault(self) -> None:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.down:
+            raise ConnectionError('Connection refused (injected)')
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def __getattr__(self, name):
+        command = getattr(self, f'_{name}', None)
+        if command is None:
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            await self.fault()
+            return command(*args, **kwargs)
+        return call
+
+    async def scan_iter(self, match: str = '*', count: int = 10):
+        await self.fault()
+        for key in [key for key in self.data if fnmatch.fnmatchcase(key, match)]:
+            yield key
+
+    def _alive(self, key: str) -> bytes | None:
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry[0] if entry is not None else None
+
+    def _ping(self):
+        return True
+
+    def _get(self, key):
+        return self._alive(key)
+
+    def _set(self, key, value, ex=None, px=None):
+        expires = ex or (px / 1000 if px else None)
+        self.data[key] = (value if isinstance(value, bytes) else str(value).encode(),
+                          time.monotonic() + expires if expires else None)
+        return True
+
+    def _ttl(self, key):
+        if self._alive(key) is None:
+            return -2
+        expires_at = self.data[key][1]
+        return -1 if expires_at is None else int(expires_at - time.monotonic())
+
+    def _incrby(self, key, amount=1):
+        value = int(self._alive(key) or 0) + amount
+        self.data[key] = (str(value).encode(), self.data.get(key, (None, None))[1])
+        return value
+
+    def _incr(self, key):
+        return self._incrby(key)
+
+    def _unlink(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def _script_load(self, script):
+        sha = hashlib.sha1(script.encode()).hexdigest()
+        self.scripts.add(sha)
+        return sha
+
+    def _evalsha(self, sha, numkeys, key, limit, expire_ms):
+        # The fastapi-limiter script
+        if sha not in self.scripts:
+            raise NoScriptError('NOSCRIPT No matching script')
+        current = int(self._alive(key) or 0)
+        if current == 0:
+            self._set(key, 1, px=int(expire_ms))
+            return 0
+        if current + 1 > int(limit):
+            return max(1, int((self.data[key][1] - time.monotonic()) * 1000))
+        self._incrby(key)
+        return 0
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,15 @@
+"""
+The app served by the launcher tests: answers with the worker pid after an optional delay.
+"""
+import asyncio
+import os
+
+from fastapi import FastAPI
+
+app = FastAPI()
+
+
+@app.get('/pid')
+async def pid(delay: float = 0.0):
+    await asyncio.sleep(delay)
+    return {'pid': os.getpid()}
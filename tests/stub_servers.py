@@ -0,0 +1,94 @@
+"""
+Local stand-ins for the outbound integrations, with latency injection:
+
+    async with SMTPStub() as smtp:  # smtp.port
+        smtp.latency = 1.0  # the greeting comes after a second
+    async with HTTPStub({'public_id': 'avatar', 'version': 1}) as storage:  # storage.url
+        storage.latency = 1.0  # every response comes after a second
+
+Just enough of SMTP for one message per connection, and of HTTP for one JSON response per request.
+"""
+import asyncio
+import json
+
+
+class StubServer:
+    def __init__(self):
+        self.latency = 0.0
+        self.requests = 0
+        self.port: int | None = None
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        # A client that gave up may leave its connection open, the server waits for every connection
+        for writer in self._writers:
+            writer.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.requests += 1
+        self._writers.add(writer)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            await self.handle(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        raise NotImplementedError
+
+
+class SMTPStub(StubServer):
+    def __init__(self):
+        super().__init__()
+        self.messages: list[bytes] = []
+
+    async def handle(self, reader, writer):
+        writer.write(b'220 stub ESMTP\r\n')
+        while line := await reader.readline():
+            command = line[:4].upper()
+            if command == b'EHLO':
+                writer.write(b'250-stub\r\n250 8BITMIME\r\n')
+            elif command == b'DATA':
+                writer.write(b'354 end with .\r\n')
+                await writer.drain()
+                self.messages.append(await reader.readuntil(b'\r\n.\r\n'))
+                writer.write(b'250 queued\r\n')
+            elif command == b'QUIT':
+                writer.write(b'221 bye\r\n')
+                await writer.drain()
+                return
+            else:
+                writer.write(b'250 ok\r\n')
+            await writer.drain()
+
+
+class HTTPStub(StubServer):
+    def __init__(self, response: dict):
+        super().__init__()
+        self.response = response
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    async def handle(self, reader, writer):
+        headers = await reader.readuntil(b'\r\n\r\n')
+        length = next((int(line.split(b':')[1]) for line in headers.split(b'\r\n')
+                       if line.lower().startswith(b'content-length:')), 0)
+        await reader.readexactly(length)
+        body = json.dumps(self.response).encode()
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n'
+                     b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+        await writer.drain()
@@ -0,0 +1,87 @@
+import importlib.util
+import os
+import unittest
+from pathlib import Path
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from conf.config import Base
+from src.contacts import repository as repo_contacts
+from src.users.models import User
+
+# Migrations run Postgres DDL, e.g.
+# TEST_POSTGRES_URL=postgresql+asyncpg://postgres@localhost:5432/contacts_plans
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+SCHEMA = 'test_migrations'
+VERSIONS = Path(__file__).parent.parent.joinpath('migrations', 'versions')
+
+
+def load_migration(name: str):
+    spec = importlib.util.spec_from_file_location(name, VERSIONS.joinpath(f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def upgrade(connection, migration) -> None:
+    with Operations.context(MigrationContext.configure(connection)):
+        migration.upgrade()
+
+
+@unittest.skipUnless(POSTGRES_URL, 'TEST_POSTGRES_URL is not set')
+class TestSyncMigration(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        admin = create_async_engine(POSTGRES_URL, poolclass=NullPool)
+        async with admin.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+            await conn.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+        await admin.dispose()
+        self.engine = create_async_engine(POSTGRES_URL, poolclass=NullPool,
+                                          connect_args={'server_settings': {'search_path': SCHEMA}})
+
+    async def asyncTearDown(self):
+        async with self.engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA {SCHEMA} CASCADE'))
+        await self.engine.dispose()
+
+    async def test_contacts_without_updated_at_are_synced(self):
+        async with self.engine.begin() as conn:
+            # The schema before 3f9a1c2d7e45
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text('DROP TABLE deleted_contacts'))
+            await conn.execute(text('DROP INDEX ix_contacts_user_id_updated_at_id'))
+            await conn.execute(text('ALTER TABLE contacts ALTER COLUMN updated_at DROP NOT NULL, '
+                                    'ALTER COLUMN updated_at DROP DEFAULT'))
+            await conn.execute(text("INSERT INTO roles (name) VALUES ('user')"))
+            await conn.execute(text(
+                "INSERT INTO users (id, username, email, password, role_id, confirmed, created_at, updated_at) "
+                "VALUES (1, 'user', 'user@example.com', 'password', 1, true, now(), now())"
+            ))
+            await conn.execute(text(
+                "INSERT INTO contacts (first_name, last_name, email, phone, created_at, updated_at, user_id) VALUES "
+                "('a', 'a', 'a@example.com', '1', now() - interval '3 hours', now() - interval '1 hour', 1), "
+                "('b', 'b', 'b@example.com', '2', now() - interval '2 hours', NULL, 1), "
+                "('c', 'c', 'c@example.com', '3', NULL, NULL, 1)"
+            ))
+            await conn.run_sync(upgrade, load_migration('3f9a1c2d7e45_add_deleted_contacts_and_sync_index'))
+
+        user = User(id=1)
+        synced, token = [], None
+        async with async_sessionmaker(self.engine, expire_on_commit=False)() as session:
+            while True:
+                changes = await repo_contacts.get_contact_changes(session, user, token, limit=1)
+                synced += [contact.email for contact in changes['changes']]
+                token = changes['next_token']
+                if not changes['has_more']:
+                    break
+            self.assertEqual(synced, ['b@example.com', 'a@example.com', 'c@example.com'])
+            await session.execute(text(
+                "INSERT INTO contacts (first_name, last_name, email, phone, user_id) "
+                "VALUES ('d', 'd', 'd@example.com', '4', 1)"
+            ))
+            changes = await repo_contacts.get_contact_changes(session, user, token)
+            self.assertEqual([contact.email for contact in changes['changes']], ['d@example.com'])
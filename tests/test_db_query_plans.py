@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+import unittest
+
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from conf.config import Base
+from src.contacts import repository as repo_contacts
+from src.users.models import User
+
+# Plans are only meaningful on Postgres with realistic row counts, e.g.
+# TEST_POSTGRES_URL=postgresql+asyncpg://postgres@localhost:5432/contacts_plans
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+SEED_USERS = 1000
+SEED_CONTACTS = 200_000
+HOT_TABLES = {'contacts', 'deleted_contacts'}
+
+
+async def seed_database():
+    engine = create_async_engine(POSTGRES_URL, poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("INSERT INTO roles (name) VALUES ('guest'), ('user'), ('admin')"))
+        await conn.execute(text(
+            "INSERT INTO users (username, email, password, role_id, confirmed, created_at, updated_at) "
+            "SELECT 'user' || g, 'user' || g || '@example.com', 'password', 2, true, now(), now() "
+            "FROM generate_series(1, :users) g"
+        ), {'users': SEED_USERS})
+        await conn.execute(text(
+            "INSERT INTO contacts (first_name, last_name, email, phone, birthday, description, "
+            "created_at, updated_at, user_id) "
+            "SELECT 'first' || g, 'last' || g, 'contact' || g || '@example.com', (g % 1000000)::text, "
+            "timestamp '1970-01-01' + (g % 15000) * interval '1 day', 'description', "
+            "now(), now() - (g % 100000) * interval '1 second', 1 + g % :users "
+            "FROM generate_series(1, :contacts) g"
+        ), {'users': SEED_USERS, 'contacts': SEED_CONTACTS})
+        await conn.execute(text(
+            "INSERT INTO deleted_contacts (contact_id, user_id, deleted_at) "
+            "SELECT :contacts + g, 1 + g % :users, now() - g * interval '1 second' "
+            "FROM generate_series(1, :contacts / 10) g"
+        ), {'users': SEED_USERS, 'contacts': SEED_CONTACTS})
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level='AUTOCOMMIT')
+        await conn.execute(text('ANALYZE'))
+    await engine.dispose()
+
+
+def find_seq_scans(plan: dict) -> list[str]:
+    scans = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in HOT_TABLES:
+        scans.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        scans.extend(find_seq_scans(child))
+    return scans
+
+
+@unittest.skipUnless(POSTGRES_URL, 'TEST_POSTGRES_URL is not set')
+class TestContactsQueryPlans(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        asyncio.run(seed_database())
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine(POSTGRES_URL, poolclass=NullPool)
+        self.statements = []
+
+        @event.listens_for(self.engine.sync_engine, 'before_cursor_execute')
+        def capture_select(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                self.statements.append((statement, parameters))
+
+        self.session = async_sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self.user = (await self.session.execute(select(User).filter_by(id=SEED_USERS // 2))).scalar_one()
+        self.statements.clear()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def assertNoSeqScan(self):
+        self.assertTrue(self.statements, 'The repository did not run any query')
+        async with self.engine.connect() as conn:
+            for statement, parameters in self.statements:
+                result = await conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+                plan = result.scalar_one()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                scans = find_seq_scans(plan[0]['Plan'])
+                self.assertEqual(scans, [], f'Sequential scan on a hot path:\n{statement}')
+
+    async def test_is_contact_exist(self):
+        await repo_contacts.is_contact_exist('contact500@example.com', '500', self.session, self.user)
+        await self.assertNoSeqScan()
+
+    async def test_get_contact_by_id(self):
+        await repo_contacts.get_contact_by_id(500, self.session, self.user)
+        await self.assertNoSeqScan()
+
+    async def test_get_my_contacts(self):
+        await repo_contacts.get_my_contacts.__wrapped__(self.session, self.user, 10, 20)
+        await self.assertNoSeqScan()
+
+    async def test_get_my_contacts_by_email(self):
+        await repo_contacts.get_my_contacts.__wrapped__(self.session, self.user, 10, 0, email='contact5')
+        await self.assertNoSeqScan()
+
+    async def test_get_my_contacts_by_fullname(self):
+        await repo_contacts.get_my_contacts.__wrapped__(self.session, self.user, 10, 0, fullname='first5')
+        await self.assertNoSeqScan()
+
+    async def test_get_my_contacts_by_birthday(self):
+        await repo_contacts.get_my_contacts.__wrapped__(self.session, self.user, 10, 0, days=7)
+        await self.assertNoSeqScan()
+
+    async def test_get_all_contacts_by_user_id(self):
+        await repo_contacts.get_all_contacts(self.session, self.user.id, 10, 0)
+        await self.assertNoSeqScan()
+
+    async def test_get_contact_changes(self):
+        changes = await repo_contacts.get_contact_changes(self.session, self.user, limit=100)
+        await repo_contacts.get_contact_changes(self.session, self.user, changes['next_token'], limit=100)
+        await self.assertNoSeqScan()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from database.db import DatabaseSessionManager, StatementTimeout, get_db, is_query_canceled
+from src.services.request_cancellation import CancelOnDisconnectMiddleware
+
+# Statement timeouts and cancel requests only exist on Postgres, e.g.
+# TEST_POSTGRES_URL=postgresql+asyncpg://postgres@localhost:5432/contacts_plans
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+SLEEP = 'SELECT pg_sleep(5)'
+
+
+@unittest.skipUnless(POSTGRES_URL, 'TEST_POSTGRES_URL is not set')
+class TestStatementTimeout(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        patcher = patch('database.db.app_config', MagicMock(DB_STATEMENT_TIMEOUT=1.0, DB_POOL_SIZE=2,
+                                                           DB_MAX_OVERFLOW=0, DB_ECHO=False, SLOW_QUERY_MS=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = DatabaseSessionManager(POSTGRES_URL)
+
+    async def asyncTearDown(self):
+        await self.manager.close()
+
+    async def running_sleeps(self) -> int:
+        async with self.manager.engine.connect() as connection:
+            return (await connection.execute(text(
+                "SELECT count(*) FROM pg_stat_activity WHERE state = 'active' AND query = :query"
+            ), {'query': SLEEP})).scalar()
+
+    async def test_connection_default(self):
+        async with self.manager.session() as session:
+            self.assertEqual((await session.execute(text('SHOW statement_timeout'))).scalar(), '1s')
+
+    async def test_route_deadline(self):
+        async with self.manager.session(statement_timeout=0.2) as session:
+            with self.assertRaises(DBAPIError) as error:
+                await session.execute(text(SLEEP))
+            self.assertTrue(is_query_canceled(error.exception))
+        # SET LOCAL: the pooled connection is back to the default
+        async with self.manager.session() as session:
+            self.assertEqual((await session.execute(text('SHOW statement_timeout'))).scalar(), '1s')
+
+    async def test_disconnect_cancels_query(self):
+        app = FastAPI()
+
+        @app.get('/sleep', dependencies=[Depends(StatementTimeout(10))])
+        async def sleep(db=Depends(get_db)):
+            await db.execute(text(SLEEP))
+
+        manager = self.manager
+        with patch('database.db.sessionmanager', manager):
+            receive_calls = []
+
+            async def receive():
+                receive_calls.append(1)
+                if len(receive_calls) == 1:
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.sleep(0.3)
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                pass
+
+            scope = {'type': 'http', 'method': 'GET', 'path': '/sleep', 'raw_path': b'/sleep', 'query_string': b'',
+                     'headers': [], 'scheme': 'http', 'server': ('test', 80), 'root_path': '', 'http_version': '1.1'}
+            await asyncio.wait_for(CancelOnDisconnectMiddleware(app)(scope, receive, send), 3)
+
+        await asyncio.sleep(0.2)
+        self.assertEqual(await self.running_sleeps(), 0)
+        self.assertEqual(manager.engine.pool.checkedout(), 0)
+
+
+class TestQueryCanceledResponse(unittest.IsolatedAsyncioTestCase):
+    async def test_503(self):
+        from main import database_error_handler
+
+        request = MagicMock(scope={'route': MagicMock(path='/api/contacts/all')})
+        canceled = DBAPIError('SELECT', {}, MagicMock(sqlstate='57014'))
+        response = await database_error_handler(request, canceled)
+        self.assertEqual(response.status_code, 503)
+
+        response = await database_error_handler(request, DBAPIError('SELECT', {}, MagicMock(sqlstate='08006')))
+        self.assertEqual(response.status_code, 500)
@@ -56,6 +56,9 @@ async def test_login(client, redis_mock):
     assert 'access_token' in data
     assert 'refresh_token' in data
     assert 'token_type' in data
+    claims = await auth_service.get_token_claims(data['access_token'])
+    assert (claims['sub'], claims['role']) == (user_data['email'], 'user')
+    assert isinstance(claims['uid'], int)
 
 
 def test_login__wrong_email(client, redis_mock):
@@ -1,4 +1,9 @@
+from fastapi_cache import FastAPICache
+from fastapi_limiter import FastAPILimiter, default_identifier, http_default_callback
+
 from conf import messages
+from src.services.redis_fallback import redis_breaker, ResilientCacheBackend, ResilientLimiterRedis
+from tests.fake_redis import FakeRedis
 from tests.seed_contacts import fake_contacts
 
 
@@ -129,3 +134,86 @@ def test_delete_contacts__incorrect_id(client, redis_mock, get_access_token):
 def test_delete_contacts(client, redis_mock, get_access_token):
     response = client.delete('api/contacts/1', headers={'Authorization': f'Bearer {get_access_token}'})
     assert response.status_code == 204
+
+def test_get_contacts__cached_request_checks_out_no_connection(client, redis_mock, get_access_token,
+                                                               count_pool_checkouts):
+    headers = {'Authorization': f'Bearer {get_access_token}'}
+    with count_pool_checkouts() as checkouts:
+        response = client.get('api/contacts?limit=11', headers=headers)
+    assert response.status_code == 200, response.text
+    # The user and the contacts are loaded through the one session shared by the dependencies
+    assert len(checkouts) == 1
+
+    with count_pool_checkouts() as checkouts:
+        cached = client.get('api/contacts?limit=11', headers=headers)
+    assert cached.status_code == 200, cached.text
+    assert cached.json() == response.json()
+    assert checkouts == []
+
+def test_get_contacts_changes(client, redis_mock, get_access_token):
+    response = client.get('api/contacts/changes?limit=10', headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert len(data['changes']) == 10
+    assert data['deleted'] == []
+    assert data['has_more'] is True
+    response = client.get(f'api/contacts/changes?limit=10&since={data['next_token']}',
+                          headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert len(data['changes']) == 9
+    assert data['has_more'] is False
+
+def test_get_contacts_changes__query_count(client, redis_mock, get_access_token, assert_max_queries):
+    with assert_max_queries(3):
+        response = client.get('api/contacts/changes', headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code == 200, response.text
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert 'desc="3 queries"' in response.headers['Server-Timing']
+
+def test_get_contacts_changes__deleted(client, redis_mock, get_access_token):
+    response = client.get('api/contacts/changes?limit=100', headers={'Authorization': f'Bearer {get_access_token}'})
+    token = response.json()['next_token']
+    response = client.delete('api/contacts/2', headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code == 204
+    response = client.get(f'api/contacts/changes?since={token}', headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data['changes'] == []
+    assert [tombstone['id'] for tombstone in data['deleted']] == [2]
+
+def test_get_contacts_changes__invalid_token(client, redis_mock, get_access_token):
+    response = client.get('api/contacts/changes?since=invalid', headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code == 400, response.text
+    data = response.json()
+    assert data['detail'] == messages.INVALID_SYNC_TOKEN
+
+def test_update_contacts__duplicate(client, redis_mock, get_access_token):
+    response = client.put('api/contacts/5', headers={'Authorization': f'Bearer {get_access_token}'}, json={
+        "email": fake_contacts[3]['email'],
+        "phone": fake_contacts[3]['phone'],
+    })
+    assert response.status_code == 409, response.text
+    data = response.json()
+    assert data['detail'] == messages.CONTACT_ALREADY_EXISTS
+
+def test_get_contacts__redis_down(client, get_access_token, monkeypatch):
+    redis = FakeRedis()
+    redis.down = True
+    redis_breaker.reset()
+    monkeypatch.setattr(FastAPICache, '_backend', ResilientCacheBackend(redis))
+    monkeypatch.setattr(FastAPILimiter, 'redis', ResilientLimiterRedis(redis))
+    monkeypatch.setattr(FastAPILimiter, 'prefix', 'fastapi-limiter')
+    monkeypatch.setattr(FastAPILimiter, 'lua_sha', FakeRedis()._script_load(FastAPILimiter.lua_script))
+    monkeypatch.setattr(FastAPILimiter, 'identifier', default_identifier)
+    monkeypatch.setattr(FastAPILimiter, 'http_callback', http_default_callback)
+    headers = {'Authorization': f'Bearer {get_access_token}'}
+    try:
+        responses = [client.get('api/contacts?limit=13', headers=headers) for _ in range(5)]
+        assert [response.status_code for response in responses] == [200] * 5, responses[0].text
+        assert all(response.json() == responses[0].json() for response in responses)
+        # Redis is no longer called once the breaker is open
+        assert redis_breaker.state == 'open'
+        assert redis.calls == redis_breaker.failure_threshold
+    finally:
+        redis_breaker.reset()
@@ -0,0 +1,48 @@
+import asyncio
+import contextlib
+
+from src.services.email_tracking.buffer import email_open_buffer
+from src.services.routes_email_status import PIXEL
+from tests.conftest import TestingSessionLocal
+
+
+@contextlib.asynccontextmanager
+async def session_factory():
+    async with TestingSessionLocal() as session:
+        yield session
+
+
+def test_email_status(client):
+    response = client.get('api/email/pacman?campaign=verify_email')
+    assert response.status_code == 200, response.text
+    assert response.content == PIXEL
+    assert response.headers['content-type'] == 'image/png'
+    assert response.headers['cache-control'] == 'no-cache, no-store, must-revalidate'
+    assert len(email_open_buffer) == 1
+
+
+def test_email_status__username_too_long(client):
+    response = client.get(f'api/email/{"x" * 151}')
+    assert response.status_code == 422, response.text
+
+
+def test_email_open_stats(client, get_access_token, monkeypatch):
+    monkeypatch.setattr(email_open_buffer, 'session', session_factory)
+    client.get('api/email/pacman?campaign=verify_email')
+    client.get('api/email/pacman')
+    asyncio.run(email_open_buffer.flush())
+    assert len(email_open_buffer) == 0
+
+    response = client.get('api/email/stats/', headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code == 200, response.text
+    data = {(row['username'], row['campaign']): row['opens'] for row in response.json()}
+    assert data == {('pacman', 'verify_email'): 2, ('pacman', 'default'): 1}
+
+    response = client.get('api/email/stats/?campaign=default&days=1',
+                          headers={'Authorization': f'Bearer {get_access_token}'})
+    assert [row['opens'] for row in response.json()] == [1]
+
+
+def test_email_open_stats__unauthorized(client):
+    response = client.get('api/email/stats/')
+    assert response.status_code == 401, response.text
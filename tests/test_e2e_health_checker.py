@@ -0,0 +1,26 @@
+from unittest.mock import AsyncMock
+
+from src.services import health_checker
+
+
+def test_liveness(client):
+    response = client.get('api/health_checker/live')
+    assert response.status_code == 200, response.text
+    assert response.json() == {'status': 'alive'}
+
+
+def test_readiness(client, monkeypatch):
+    health_checker.readiness_check.clear()
+    monkeypatch.setitem(health_checker.PROBES, 'postgres', (AsyncMock(), True))
+    monkeypatch.setitem(health_checker.PROBES, 'redis', (AsyncMock(side_effect=ConnectionError), True))
+    monkeypatch.setitem(health_checker.PROBES, 'mail', (AsyncMock(), False))
+    monkeypatch.setitem(health_checker.PROBES, 'storage', (AsyncMock(), False))
+    response = client.get('api/health_checker/ready')
+    assert response.status_code == 503, response.text
+    data = response.json()
+    assert data['status'] == 'not_ready'
+    assert data['checks']['redis']['status'] == 'error'
+    assert data['cached'] is False
+    response = client.get('api/health_checker/ready')
+    assert response.json()['cached'] is True
+    health_checker.readiness_check.clear()
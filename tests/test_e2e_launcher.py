@@ -0,0 +1,120 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import pytest
+
+from conf.config import app_config
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def launcher(tmp_path):
+    port = free_port()
+    log = open(tmp_path / 'launcher.log', 'w+')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'launcher', '--app', 'tests.launcher_app:app', '--port', str(port),
+         '--workers', '2', '--graceful-timeout', '10', '--log-level', 'warning'],
+        cwd=app_config.BASE_DIR, stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f'http://127.0.0.1:{port}/pid'
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            httpx.get(url, timeout=1)
+            break
+        except httpx.TransportError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                log.seek(0)
+                pytest.fail(f'Launcher did not start:\n{log.read()}')
+            time.sleep(0.1)
+    yield process, url
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+    log.close()
+
+
+class Client(threading.Thread):
+    """
+    Sends requests back to back, each on a new connection, and records the results.
+    """
+
+    def __init__(self, url: str, delay: float = 0.0):
+        super().__init__(daemon=True)
+        self.url = url
+        self.delay = delay
+        self.pids = []
+        self.failures = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                response = httpx.get(self.url, params={'delay': self.delay}, timeout=30)
+                if response.status_code == 200:
+                    self.pids.append(response.json()['pid'])
+                else:
+                    self.failures.append(response.status_code)
+            except httpx.HTTPError as error:
+                self.failures.append(repr(error))
+
+
+def test_rolling_restart_drops_no_requests(launcher):
+    process, url = launcher
+    clients = [Client(url, delay=0.05) for _ in range(8)]
+    for client in clients:
+        client.start()
+    time.sleep(1)
+    old_pids = {pid for client in clients for pid in client.pids}
+
+    os.kill(process.pid, signal.SIGHUP)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        recent = {pid for client in clients for pid in client.pids[-5:]}
+        if recent and not recent & old_pids:
+            break
+        time.sleep(0.2)
+    time.sleep(0.5)
+    for client in clients:
+        client.stop_event.set()
+    for client in clients:
+        client.join()
+
+    served = [pid for client in clients for pid in client.pids]
+    assert [failure for client in clients for failure in client.failures] == []
+    assert set(served) - old_pids, 'no request was served by a new worker'
+    assert not {pid for client in clients for pid in client.pids[-5:]} & old_pids
+    assert process.poll() is None
+
+
+def test_sigterm_drains_in_flight_requests(launcher):
+    process, url = launcher
+    results = []
+
+    def slow_request():
+        try:
+            results.append(httpx.get(url, params={'delay': 1.5}, timeout=30).status_code)
+        except httpx.HTTPError as error:
+            results.append(repr(error))
+
+    threads = [threading.Thread(target=slow_request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    os.kill(process.pid, signal.SIGTERM)
+    for thread in threads:
+        thread.join()
+
+    assert results == [200] * 6
+    assert process.wait(timeout=30) == 0
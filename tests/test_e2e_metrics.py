@@ -0,0 +1,15 @@
+def test_metrics(client, redis_mock, get_access_token):
+    response = client.get('api/contacts/1', headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code in (200, 404), response.text
+    response = client.get('metrics')
+    assert response.status_code == 200, response.text
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert 'http_requests_total{method="GET",route="/api/contacts/{contact_id}",status="' in response.text
+    assert '# TYPE http_request_duration_seconds histogram' in response.text
+    assert '# TYPE bcrypt_queue_depth gauge' in response.text
+
+
+def test_metrics__login(client, redis_mock):
+    client.post('api/auth/login', data={'username': 'pacman@test.com', 'password': '000000'})
+    response = client.get('metrics')
+    assert 'bcrypt_duration_seconds_count{operation="verify"} ' in response.text
@@ -0,0 +1,17 @@
+def test_profile_stacks(client, redis_mock, get_access_token):
+    response = client.get('api/profiler/stacks?seconds=0.2&interval_ms=5',
+                          headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code == 200, response.text
+    assert response.headers['content-disposition'] == 'attachment; filename="profile.collapsed"'
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in response.text.splitlines())
+
+
+def test_profile_tasks(client, redis_mock, get_access_token):
+    response = client.get('api/profiler/tasks?seconds=0.1', headers={'Authorization': f'Bearer {get_access_token}'})
+    assert response.status_code == 200, response.text
+    assert isinstance(response.json(), list)
+
+
+def test_profile__unauthorized(client, redis_mock):
+    response = client.get('api/profiler/stacks?seconds=0.1')
+    assert response.status_code == 401, response.text
@@ -0,0 +1,31 @@
+from src.services.auth.jwt_auth import auth_service
+from src.services.static_assets import static_assets
+
+
+def test_index_static_urls(client):
+    response = client.get('/')
+    assert response.status_code == 200, response.text
+    url = static_assets.url('css/bootstrap.min.css')
+    assert f'href="{url}"' in response.text
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/css')
+
+
+def test_index_etag(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    etag = response.headers['etag']
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+
+
+def test_reset_password_page(client, redis_mock):
+    token = auth_service.create_reset_password_token('test@test.com')
+    response = client.get(f'/api/auth/reset_password/{token}')
+    assert response.status_code == 200, response.text
+    assert f'action="/api/auth/reset_password/{token}"' in response.text
+    response = client.get('/api/auth/reset_password/not-a-token')
+    assert response.status_code == 200
+    assert 'Link has expired' in response.text
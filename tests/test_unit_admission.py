@@ -0,0 +1,87 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+from fastapi import APIRouter, FastAPI
+
+from database.instrumentation import TimedQueuePool
+from src.services.admission import AdmissionMiddleware, Priority, RoutePriorities
+from src.services.loop_lag import LoopLagMonitor
+
+
+class TestAdmissionMiddleware(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.lag, self.pool_wait = 0.0, 0.0
+        priorities = RoutePriorities()
+        app = FastAPI()
+        for prefix, priority in (('/admin', Priority.LOW), ('/contacts', None), ('/auth', Priority.HIGH),
+                                 ('/health', Priority.CRITICAL)):
+            router = APIRouter(prefix=prefix)
+
+            @router.get('/{item_id}')
+            async def endpoint(item_id: int):
+                await asyncio.sleep(0.05)
+                return {'id': item_id}
+
+            if priority is not None:
+                priorities.declare(router, priority)
+            app.include_router(router)
+        self.middleware = AdmissionMiddleware(app, app.routes, lambda: self.lag, lambda: self.pool_wait, priorities)
+        patcher = patch('src.services.admission.app_config', MagicMock(
+            ADMISSION_MAX_LOOP_LAG=0.5, ADMISSION_MAX_POOL_WAIT=1.0, ADMISSION_MAX_IN_FLIGHT=4, ADMISSION_RETRY_AFTER=2))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.middleware), base_url='http://test')
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def statuses(self) -> dict[str, int]:
+        return {path: (await self.client.get(f'{path}/1')).status_code
+                for path in ('/admin', '/contacts', '/auth', '/health')}
+
+    async def test_admits_everything_under_the_limits(self):
+        self.lag, self.pool_wait = 0.4, 0.9
+        self.assertEqual(set((await self.statuses()).values()), {200})
+
+    async def test_sheds_by_priority(self):
+        self.pool_wait = 1.0
+        self.assertEqual(await self.statuses(), {'/admin': 503, '/contacts': 200, '/auth': 200, '/health': 200})
+        self.lag = 1.0
+        self.assertEqual(await self.statuses(), {'/admin': 503, '/contacts': 503, '/auth': 200, '/health': 200})
+        self.pool_wait = 10.0
+        self.assertEqual(await self.statuses(), {'/admin': 503, '/contacts': 503, '/auth': 503, '/health': 200})
+
+    async def test_rejection(self):
+        self.lag = 0.5
+        response = await self.client.get('/admin/1')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['retry-after'], '2')
+        self.assertIn('detail', response.json())
+
+    async def test_in_flight(self):
+        responses = await asyncio.gather(*(self.client.get('/admin/1') for _ in range(6)))
+        self.assertEqual(sorted(response.status_code for response in responses), [200] * 4 + [503] * 2)
+        self.assertEqual(self.middleware.in_flight, 0)
+
+
+class TestLoadSignals(unittest.IsolatedAsyncioTestCase):
+    async def test_loop_lag(self):
+        monitor = LoopLagMonitor(interval=0.01, window=0.1)
+        monitor.start()
+        await asyncio.sleep(0.03)
+        time.sleep(0.1)  # a blocking call
+        await asyncio.sleep(0.05)
+        self.assertGreaterEqual(monitor.lag, 0.05)
+        # Out of the window
+        await asyncio.sleep(0.15)
+        self.assertLess(monitor.lag, 0.05)
+        await monitor.stop()
+
+    def test_pool_wait(self):
+        pool = TimedQueuePool(MagicMock(), pool_size=1, max_overflow=0)
+        self.assertEqual(pool.current_wait(), 0.0)
+        pool._checkouts[object()] = time.perf_counter() - 2
+        self.assertGreaterEqual(pool.current_wait(), 2)
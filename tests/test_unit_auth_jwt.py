@@ -0,0 +1,126 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch, AsyncMock
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services.auth.jwt_auth import auth_service, jwt, verified_tokens, VerifiedTokenCache, token_versions
+from src.users.cache import user_cache
+from src.users.models import User, Role
+from src.users.roles_checker import RoleChecker
+from src.users.schemas import RoleEnum
+from tests.fake_redis import FakeRedis
+
+
+class TestVerifiedTokenCache(unittest.TestCase):
+    def test_get_put(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        payload = {'sub': 'jason@example.com', 'exp': time.time() + 60}
+        self.assertIsNone(cache.get('token'))
+        cache.put('token', payload)
+        self.assertEqual(cache.get('token'), payload)
+
+    def test_expired(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        cache.put('token', {'sub': 'jason@example.com', 'exp': time.time() - 1})
+        self.assertIsNone(cache.get('token'))
+
+    def test_lru_eviction(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        exp = time.time() + 60
+        cache.put('first', {'exp': exp})
+        cache.put('second', {'exp': exp})
+        cache.get('first')
+        cache.put('third', {'exp': exp})
+        self.assertIsNotNone(cache.get('first'))
+        self.assertIsNone(cache.get('second'))
+        self.assertIsNotNone(cache.get('third'))
+
+    def test_disabled(self):
+        cache = VerifiedTokenCache(maxsize=0)
+        cache.put('token', {'exp': time.time() + 60})
+        self.assertIsNone(cache.get('token'))
+
+
+class TestGetCurrentUser(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        verified_tokens.clear()
+        user_cache.clear()
+        self.session = MagicMock(spec=AsyncSession)
+        self.user = User(id=1, email='jason@example.com')
+
+    @patch.object(user_cache, 'ttl', 0)
+    @patch('src.services.auth.jwt_auth.user_repository.get_user_by_email', new_callable=AsyncMock)
+    async def test_cached_token_skips_decode(self, mock_get_user_by_email):
+        token = await auth_service.create_access_token(data={'sub': self.user.email})
+        mock_get_user_by_email.return_value = self.user
+        with patch.object(jwt, 'decode', wraps=jwt.decode) as mock_decode:
+            for _ in range(3):
+                result = await auth_service.get_current_user(token, self.session)
+                self.assertEqual(result, self.user)
+        mock_decode.assert_called_once()
+
+    @patch('src.services.auth.jwt_auth.user_repository.get_user_by_email', new_callable=AsyncMock)
+    async def test_cached_user_skips_query(self, mock_get_user_by_email):
+        token = await auth_service.create_access_token(data={'sub': self.user.email})
+        self.user.role = Role(id=3, name='admin')
+        mock_get_user_by_email.return_value = self.user
+        first = await auth_service.get_current_user(token, self.session)
+        second = await auth_service.get_current_user(token, self.session)
+        mock_get_user_by_email.assert_awaited_once()
+        self.assertIs(first, self.user)
+        self.assertIsNot(second, self.user)
+        self.assertEqual((second.id, second.email, second.role.name), (1, 'jason@example.com', 'admin'))
+
+    async def test_invalid_token(self):
+        with self.assertRaises(HTTPException) as context:
+            await auth_service.get_current_user('invalid_token', self.session)
+        self.assertEqual(context.exception.status_code, 401)
+
+
+class TestTokenClaims(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        verified_tokens.clear()
+        self.user = User(id=1, email='jason@example.com', role=Role(id=3, name='admin'))
+
+    async def test_user_claims(self):
+        token = await auth_service.create_access_token(data=auth_service.user_claims(self.user))
+        claims = await auth_service.get_token_claims(token)
+        self.assertEqual((claims['sub'], claims['uid'], claims['role']), ('jason@example.com', 1, 'admin'))
+
+    @patch('conf.config.app_config.TOKEN_REVOCATION_CHECK', True)
+    @patch('src.services.auth.jwt_auth.redis_clients')
+    async def test_revoked_token(self, mock_redis_clients):
+        mock_redis_clients.get.return_value = FakeRedis()
+        old_token = await auth_service.create_access_token(data=auth_service.user_claims(self.user))
+        await auth_service.get_token_claims(old_token)
+
+        await token_versions.revoke(self.user.id)
+        new_token = await auth_service.create_access_token(data=auth_service.user_claims(self.user))
+        with self.assertRaises(HTTPException) as context:
+            await auth_service.get_token_claims(old_token)
+        self.assertEqual(context.exception.status_code, 401)
+        self.assertEqual((await auth_service.get_token_claims(new_token))['ver'], 1)
+
+
+class TestRoleChecker(unittest.IsolatedAsyncioTestCase):
+    def test_allowed_roles(self):
+        checker = RoleChecker([RoleEnum.ADMIN, RoleEnum.USER])
+        self.assertEqual(checker.allowed_roles, frozenset({'admin', 'user'}))
+
+    @patch('src.services.auth.jwt_auth.user_repository.get_user_by_email', new_callable=AsyncMock)
+    async def test_authorized_from_claims(self, mock_get_user_by_email):
+        checker = RoleChecker([RoleEnum.ADMIN])
+        await checker(MagicMock(), {'sub': 'jason@example.com', 'uid': 1, 'role': 'admin'})
+        mock_get_user_by_email.assert_not_awaited()
+
+    async def test_forbidden_role(self):
+        with self.assertRaises(HTTPException) as context:
+            await RoleChecker([RoleEnum.ADMIN])(MagicMock(), {'sub': 'jason@example.com', 'uid': 2, 'role': 'user'})
+        self.assertEqual(context.exception.status_code, 403)
+
+    async def test_missing_role_claim(self):
+        with self.assertRaises(HTTPException) as context:
+            await RoleChecker([RoleEnum.ADMIN])(MagicMock(), {'sub': 'jason@example.com'})
+        self.assertEqual(context.exception.status_code, 401)
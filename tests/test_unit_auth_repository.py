@@ -36,18 +36,17 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         ...
 
     @patch('src.services.auth.repository.auth_service')
-    @patch('src.services.auth.repository.conf')
-    @patch('src.services.auth.repository.FastMail')  # Не используем new_callable=AsyncMock здесь
-    async def test_send_verify_email(self, mock_fast_mail, mock_conf, mock_auth_service):
+    @patch('src.services.auth.repository.get_mailer')  # Не используем new_callable=AsyncMock здесь
+    async def test_send_verify_email(self, mock_get_mailer, mock_auth_service):
         mock_auth_service.create_email_token.return_value = 'some_token'
 
         fm_instance = MagicMock()
         fm_instance.send_message = AsyncMock()
-        mock_fast_mail.return_value = fm_instance
+        mock_get_mailer.return_value = fm_instance
         mock_host = 'https://testhost.com'
         await send_verify_email(self.user.email, self.user.username, mock_host)
         mock_auth_service.create_email_token.assert_called_once_with({'sub': self.user.email})
-        mock_fast_mail.assert_called_once_with(mock_conf)
+        mock_get_mailer.assert_called_once_with()
         fm_instance.send_message.assert_awaited_once()
         sent_args, sent_kwargs = fm_instance.send_message.await_args
         message_arg = sent_args[0]
@@ -63,10 +62,9 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(message_arg.subtype, MessageType.html)
 
     @patch('src.services.auth.repository.auth_service')
-    @patch('src.services.auth.repository.conf')
-    @patch('src.services.auth.repository.FastMail')
+    @patch('src.services.auth.repository.get_mailer')
     @patch('src.services.auth.repository.app_config')
-    async def test_send_reset_password_email(self, mock_app_config, mock_fast_mail, mock_conf, mock_auth_service):
+    async def test_send_reset_password_email(self, mock_app_config, mock_get_mailer, mock_auth_service):
         email = self.user.email
         username = self.user.username
         temp_code = '123456'
@@ -79,12 +77,12 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
 
         fm_instance = MagicMock()
         fm_instance.send_message = AsyncMock()
-        mock_fast_mail.return_value = fm_instance
+        mock_get_mailer.return_value = fm_instance
 
         await send_reset_password_email(email, username, temp_code, host)
 
         mock_auth_service.create_reset_password_token.assert_called_once_with(email)
-        mock_fast_mail.assert_called_once_with(mock_conf)
+        mock_get_mailer.assert_called_once_with()
         fm_instance.send_message.assert_awaited_once()
         sent_args, sent_kwargs = fm_instance.send_message.await_args
         message_arg = sent_args[0]
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class TestCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('test', failure_threshold=2, backoff=1.0, max_backoff=3.0, errors=(OSError,))
+        self.failing = AsyncMock(side_effect=OSError('down'))
+
+    async def fail(self, times: int = 1):
+        for _ in range(times):
+            with self.assertRaises(OSError):
+                await self.breaker.call(self.failing)
+
+    async def test_opens_after_threshold(self):
+        await self.fail()
+        self.assertEqual(self.breaker.state, 'closed')
+        await self.fail()
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            await self.breaker.call(self.failing)
+        self.assertEqual(self.failing.await_count, 2)
+
+    async def test_success_resets_failures(self):
+        await self.fail()
+        await self.breaker.call(AsyncMock(return_value='ok'))
+        await self.fail()
+        self.assertEqual(self.breaker.state, 'closed')
+
+    async def test_half_open_probe_with_backoff(self):
+        with patch('src.services.circuit_breaker.time.monotonic', return_value=100.0) as monotonic:
+            await self.fail(2)
+            monotonic.return_value = 101.0
+            self.assertEqual(self.breaker.state, 'half_open')
+            # A failed probe doubles the backoff
+            await self.fail()
+            self.assertEqual(self.breaker.retry_at, 103.0)
+            monotonic.return_value = 103.0
+            await self.fail()
+            self.assertEqual(self.breaker.retry_at, 106.0)
+
+            monotonic.return_value = 106.0
+            self.assertEqual(await self.breaker.call(AsyncMock(return_value='ok')), 'ok')
+            self.assertEqual(self.breaker.state, 'closed')
+            self.assertEqual(self.breaker._current_backoff, 1.0)
+
+    async def test_single_probe(self):
+        probe = asyncio.Event()
+
+        async def slow():
+            await probe.wait()
+            return 'ok'
+
+        with patch('src.services.circuit_breaker.time.monotonic', return_value=100.0) as monotonic:
+            await self.fail(2)
+            monotonic.return_value = 101.0
+            task = asyncio.create_task(self.breaker.call(slow))
+            await asyncio.sleep(0)
+            with self.assertRaises(CircuitOpenError):
+                await self.breaker.call(slow)
+            probe.set()
+            self.assertEqual(await task, 'ok')
+
+    async def test_timeout_is_a_failure(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        for _ in range(2):
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.breaker.call(hang, timeout=0.01)
+        self.assertEqual(self.breaker.state, 'open')
+
+    async def test_other_errors_pass_through(self):
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                await self.breaker.call(AsyncMock(side_effect=ValueError('bad reply')))
+        self.assertEqual(self.breaker.state, 'closed')
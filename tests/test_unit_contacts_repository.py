@@ -1,8 +1,10 @@
 import unittest
+from datetime import datetime
 from unittest.mock import MagicMock, patch, AsyncMock
 
 from fastapi_cache.backends.inmemory import InMemoryBackend
 from fastapi_cache import FastAPICache
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 from faker import Faker
 
@@ -17,7 +19,9 @@ from src.contacts.repository import (
     create_contact,
     update_contact,
     apply_contact_filters,
-    is_contact_exist
+    is_contact_exist,
+    encode_sync_token,
+    decode_sync_token,
 )
 
 faker = Faker()
@@ -112,19 +116,27 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     @patch('src.contacts.repository.clear_cache', new_callable=AsyncMock)
     async def test_create_contact(self, mock_clear_cache):
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = self.contact
+        self.session.execute.return_value = mock_result
         result = await create_contact(body=self.body_create, db=self.session, user=self.user)
+        executed_query = str(self.session.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        self.assertIn('ON CONFLICT (user_id, email, phone) DO NOTHING', executed_query)
+        self.assertIn('RETURNING', executed_query)
+        self.session.execute.assert_awaited_once()
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_not_called()
         mock_clear_cache.assert_awaited_once_with(self.user.id)
-        self.session.add.assert_called_with(result)
-        self.session.commit.assert_called_once()
-        self.session.refresh.assert_called_once_with(result)
-        self.assertIsInstance(result, Contact)
-        self.assertEqual(result.first_name, self.body_create.first_name)
-        self.assertEqual(result.last_name, self.body_create.last_name)
-        self.assertEqual(result.email, self.body_create.email)
-        self.assertEqual(result.phone, self.body_create.phone)
-        self.assertEqual(result.birthday, self.body_create.birthday)
-        self.assertEqual(result.description, self.body_create.description)
+        self.assertEqual(result, self.contact)
 
+    @patch('src.contacts.repository.clear_cache', new_callable=AsyncMock)
+    async def test_create_contact_if_exist(self, mock_clear_cache):
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = None
+        self.session.execute.return_value = mock_result
+        result = await create_contact(body=self.body_create, db=self.session, user=self.user)
+        mock_clear_cache.assert_not_awaited()
+        self.assertIsNone(result)
 
     @patch('src.contacts.repository.clear_cache', new_callable=AsyncMock)
     async def test_update_contact(self, mock_clear_cache):
@@ -132,12 +144,13 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         mock_contact.scalar_one_or_none.return_value = self.contact
         self.session.execute.return_value = mock_contact
         result = await update_contact(contact_id=self.contact.id, body=self.body_update, db=self.session, user=self.user)
+        executed_query = str(self.session.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        self.assertTrue(executed_query.startswith('UPDATE contacts SET'))
+        self.assertIn('RETURNING', executed_query)
+        self.session.execute.assert_awaited_once()
+        self.session.commit.assert_awaited_once()
         mock_clear_cache.assert_awaited_once_with(self.user.id)
-        self.session.commit.assert_called_once()
-        self.session.refresh.assert_called_once_with(result)
-        self.assertIsInstance(result, Contact)
-        self.assertEqual(result.phone, self.body_update.phone)
-        self.assertEqual(result.description, self.body_update.description)
+        self.assertEqual(result, self.contact)
 
     @patch('src.contacts.repository.clear_cache', new_callable=AsyncMock)
     async def test_delete_contact(self, mock_clear_cache):
@@ -145,8 +158,34 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         mock_contact.scalar_one_or_none.return_value = self.contact
         self.session.execute.return_value = mock_contact
         result = await delete_contact(contact_id=self.contact.id, db=self.session, user=self.user)
+        executed_query = str(self.session.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        self.assertTrue(executed_query.startswith('DELETE FROM contacts'))
+        self.assertIn('RETURNING', executed_query)
+        self.session.execute.assert_awaited_once()
         mock_clear_cache.assert_awaited_once_with(self.user.id)
-        self.session.delete.assert_called_once_with(self.contact)
+        tombstone = self.session.add.call_args[0][0]
+        self.assertEqual(tombstone.contact_id, self.contact.id)
+        self.assertEqual(tombstone.user_id, self.user.id)
         self.session.commit.assert_called_once()
         self.assertIsInstance(result, Contact)
 
+    @patch('src.contacts.repository.clear_cache', new_callable=AsyncMock)
+    async def test_delete_contact_not_found(self, mock_clear_cache):
+        mock_contact = MagicMock()
+        mock_contact.scalar_one_or_none.return_value = None
+        self.session.execute.return_value = mock_contact
+        result = await delete_contact(contact_id=self.contact.id, db=self.session, user=self.user)
+        self.session.add.assert_not_called()
+        self.session.commit.assert_not_called()
+        mock_clear_cache.assert_not_awaited()
+        self.assertIsNone(result)
+
+    async def test_sync_token(self):
+        contacts_cursor = (datetime(2024, 12, 6, 0, 20, 55, 976382), 12)
+        token = encode_sync_token(contacts_cursor, None)
+        self.assertEqual(decode_sync_token(token), (contacts_cursor, None))
+
+    async def test_sync_token_invalid(self):
+        with self.assertRaises(ValueError):
+            decode_sync_token('invalid')
+
@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+
+from database.instrumentation import QueryStats, query_stats, normalize_statement, instrument_engine
+
+
+class TestNormalizeStatement(unittest.TestCase):
+    def test_bind_parameters(self):
+        statement = 'SELECT users.id FROM users\n WHERE users.email = $1::VARCHAR AND users.id IN ($2::INTEGER, $3::INTEGER)'
+        self.assertEqual(normalize_statement(statement),
+                         'SELECT users.id FROM users WHERE users.email = ? AND users.id IN (?)')
+
+    def test_literals(self):
+        statement = "SELECT * FROM contacts_1 WHERE first_name = 'O''Neil' AND user_id = 42 LIMIT 10"
+        self.assertEqual(normalize_statement(statement),
+                         'SELECT * FROM contacts_1 WHERE first_name = ? AND user_id = ? LIMIT ?')
+
+
+class TestInstrumentEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+
+    def test_query_stats(self):
+        instrument_engine(self.engine)
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+                conn.execute(text('SELECT 2'))
+        finally:
+            query_stats.reset(token)
+        self.assertEqual(stats.count, 2)
+        self.assertGreater(stats.duration, 0)
+        self.assertIn('desc="2 queries"', stats.server_timing(0.01))
+
+    def test_slow_query_log(self):
+        instrument_engine(self.engine, slow_query_ms=1)
+        with patch('database.instrumentation.time.perf_counter', side_effect=[0.0, 0.5]), \
+                self.assertLogs('uvicorn.error', level='WARNING') as logs:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 'secret' WHERE 1 = 1"))
+        self.assertIn('Slow query 500.0 ms: SELECT ? WHERE ? = ?', logs.output[0])
+
+    def test_failed_query(self):
+        instrument_engine(self.engine)
+        with self.engine.connect() as conn:
+            with self.assertRaises(Exception):
+                conn.execute(text('SELECT * FROM missing_table'))
+            self.assertEqual(conn.info['query_started'], [])
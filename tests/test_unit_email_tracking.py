@@ -0,0 +1,126 @@
+import asyncio
+import contextlib
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+from sqlalchemy.exc import DataError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services.email_tracking.buffer import EmailOpenBuffer
+from src.services.metrics import email_opens_dropped
+
+
+def dropped() -> float:
+    return email_opens_dropped._values.get(email_opens_dropped._key({}), 0)
+
+
+class TestEmailOpenBuffer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.db = MagicMock(spec=AsyncSession)
+        self.buffer = EmailOpenBuffer(capacity=3, batch_size=2)
+
+        @contextlib.asynccontextmanager
+        async def session():
+            yield self.db
+
+        self.buffer.session = session
+
+    @patch('src.services.email_tracking.buffer.save_open_events', new_callable=AsyncMock)
+    async def test_ring_buffer_drops_oldest(self, mock_save):
+        self.buffer.batch_size = 10
+        for username in ['first', 'second', 'third', 'fourth']:
+            self.buffer.record(username, 'default')
+        self.assertEqual(len(self.buffer), 3)
+        await self.buffer.flush()
+        events = mock_save.await_args.args[0]
+        self.assertEqual([event[0] for event in events], ['second', 'third', 'fourth'])
+
+    @patch('src.services.email_tracking.buffer.save_open_events', new_callable=AsyncMock)
+    async def test_flush_in_batches(self, mock_save):
+        self.buffer.batch_size = 10
+        self.buffer.record('first', 'default')
+        self.buffer.record('second', 'default')
+        self.buffer.record('third', 'default')
+        self.buffer.batch_size = 2
+        await self.buffer.flush()
+        self.assertEqual([len(call.args[0]) for call in mock_save.await_args_list], [2, 1])
+        self.assertEqual(len(self.buffer), 0)
+
+    @patch('src.services.email_tracking.buffer.save_open_events', new_callable=AsyncMock)
+    async def test_failed_flush_requeues(self, mock_save):
+        mock_save.side_effect = ConnectionError
+        self.buffer.batch_size = 10
+        self.buffer.record('first', 'default')
+        self.buffer.record('second', 'default')
+        await self.buffer.flush()
+        self.assertEqual(len(self.buffer), 2)
+        mock_save.side_effect = None
+        await self.buffer.flush()
+        self.assertEqual([event[0] for event in mock_save.await_args.args[0]], ['first', 'second'])
+
+    @patch('src.services.email_tracking.buffer.save_open_events', new_callable=AsyncMock)
+    async def test_rejected_batch_is_dropped(self, mock_save):
+        mock_save.side_effect = [DataError('INSERT', {}, Exception('value too long')), None]
+        self.buffer.batch_size = 10
+        self.buffer.record('x' * 151, 'default')
+        self.buffer.batch_size = 1
+        self.buffer.record('second', 'default')
+        before = dropped()
+        await self.buffer.flush()
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(dropped() - before, 1)
+        self.assertEqual([event[0] for event in mock_save.await_args.args[0]], ['second'])
+
+    @patch('src.services.email_tracking.buffer.save_open_events', new_callable=AsyncMock)
+    async def test_requeue_counts_the_overflow(self, mock_save):
+        started = asyncio.Event()
+
+        async def save(batch, db):
+            started.set()
+            await asyncio.sleep(0)
+            raise ConnectionError
+
+        mock_save.side_effect = save
+        self.buffer.batch_size = 10
+        self.buffer.record('first', 'default')
+        self.buffer.record('second', 'default')
+        self.buffer.batch_size = 2
+        flush = asyncio.create_task(self.buffer.flush())
+        await started.wait()
+        for username in ['third', 'fourth']:
+            self.buffer.record(username, 'default')
+        before = dropped()
+        await flush
+        self.assertEqual(dropped() - before, 1)
+        self.assertEqual(len(self.buffer), 3)
+
+    @patch('src.services.email_tracking.buffer.save_open_events', new_callable=AsyncMock)
+    async def test_one_flush_at_a_time(self, mock_save):
+        async def save(batch, db):
+            await asyncio.sleep(0.01)
+
+        mock_save.side_effect = save
+        self.buffer.batch_size = 10
+        self.buffer.record('first', 'default')
+        self.buffer.record('second', 'default')
+        self.buffer.batch_size = 1
+        await asyncio.gather(self.buffer.flush(), self.buffer.flush())
+        self.assertEqual([call.args[0][0][0] for call in mock_save.await_args_list], ['first', 'second'])
+
+    @patch('src.services.email_tracking.buffer.save_open_events', new_callable=AsyncMock)
+    async def test_full_batch_triggers_flush(self, mock_save):
+        self.buffer.record('first', 'default')
+        mock_save.assert_not_awaited()
+        self.buffer.record('second', 'default')
+        await self.buffer._flushing
+        mock_save.assert_awaited_once()
+
+    @patch('src.services.email_tracking.buffer.save_open_events', new_callable=AsyncMock)
+    async def test_close_waits_for_batch_flush(self, mock_save):
+        self.buffer.record('first', 'default')
+        self.buffer.record('second', 'default')
+        self.buffer.record('third', 'default')
+        await self.buffer.close()
+        self.assertTrue(self.buffer._flushing.done())
+        self.assertEqual(sum(len(call.args[0]) for call in mock_save.await_args_list), 3)
+        self.assertEqual(len(self.buffer), 0)
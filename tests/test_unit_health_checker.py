@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from unittest.mock import patch, AsyncMock
+
+from src.services import health_checker
+from src.services.health_checker import ReadinessCheck
+
+
+def pool_status(usage: float) -> dict:
+    return {'capacity': 15, 'checked_out': int(usage * 15), 'usage': usage}
+
+
+class TestReadinessCheck(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.postgres = AsyncMock()
+        self.redis = AsyncMock()
+        self.mail = AsyncMock()
+        self.storage = AsyncMock()
+        probes = {
+            'postgres': (self.postgres, True),
+            'redis': (self.redis, True),
+            'mail': (self.mail, False),
+            'storage': (self.storage, False),
+        }
+        patcher = patch.dict(health_checker.PROBES, probes)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pool_patcher = patch.object(health_checker.sessionmanager, 'pool_status', return_value=pool_status(0.2))
+        self.pool_status = pool_patcher.start()
+        self.addCleanup(pool_patcher.stop)
+
+    async def test_ready(self):
+        report, cached = await ReadinessCheck(ttl=5).check()
+        self.assertEqual(report['status'], 'ready')
+        self.assertFalse(cached)
+        self.assertEqual(set(report['checks']), {'postgres', 'redis', 'mail', 'storage'})
+        self.assertIn('latency_ms', report['checks']['postgres'])
+        self.assertFalse(report['pool']['saturated'])
+
+    async def test_cached(self):
+        check = ReadinessCheck(ttl=5)
+        await check.check()
+        report, cached = await check.check()
+        self.assertTrue(cached)
+        self.postgres.assert_awaited_once()
+
+    async def test_concurrent_callers_share_probe(self):
+        check = ReadinessCheck(ttl=5)
+        await asyncio.gather(*(check.check() for _ in range(5)))
+        self.postgres.assert_awaited_once()
+
+    async def test_critical_failure(self):
+        self.redis.side_effect = ConnectionError('refused')
+        report, _ = await ReadinessCheck(ttl=0).check()
+        self.assertEqual(report['status'], 'not_ready')
+        self.assertEqual(report['checks']['redis'], {'status': 'error', 'error': 'ConnectionError',
+                                                     'latency_ms': report['checks']['redis']['latency_ms']})
+
+    async def test_non_critical_failure(self):
+        self.mail.side_effect = OSError('unreachable')
+        report, _ = await ReadinessCheck(ttl=0).check()
+        self.assertEqual(report['status'], 'ready')
+        self.assertEqual(report['checks']['mail']['status'], 'error')
+
+    async def test_timeout(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        health_checker.PROBES['postgres'] = (hang, True)
+        with patch.object(health_checker.app_config, 'HEALTH_PROBE_TIMEOUT', 0.05):
+            report, _ = await ReadinessCheck(ttl=0).check()
+        self.assertEqual(report['status'], 'not_ready')
+        self.assertEqual(report['checks']['postgres']['status'], 'timeout')
+
+    async def test_saturated_pool(self):
+        self.pool_status.return_value = pool_status(1.0)
+        report, _ = await ReadinessCheck(ttl=0).check()
+        self.assertEqual(report['status'], 'not_ready')
+        self.assertTrue(report['pool']['saturated'])
@@ -0,0 +1,62 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from src.services.loop_lag import LoopLagMonitor
+from src.services.metrics import event_loop_blocks, event_loop_lag
+from src.services.request_context import current_scope, route_name
+
+
+def blocking_handler():
+    time.sleep(0.3)
+
+
+class TestBlockingCallDetector(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.monitor = LoopLagMonitor(interval=0.01, block_threshold=0.1)
+        self.monitor.start()
+        await asyncio.sleep(0.02)
+
+    async def asyncTearDown(self):
+        await self.monitor.stop()
+
+    async def test_logs_stack_and_route(self):
+        route = '/api/test/{blocking}'
+        blocks = event_loop_blocks._values.get(event_loop_blocks._key({'route': route}), 0)
+
+        async def request():
+            current_scope.set({'type': 'http', 'path': '/api/test/1', 'route': MagicMock(path=route)})
+            blocking_handler()
+
+        with self.assertLogs('uvicorn.error', level='WARNING') as logs:
+            await asyncio.create_task(request())
+            await asyncio.sleep(0.05)
+        self.assertEqual(len(logs.records), 1)
+        message = logs.records[0].getMessage()
+        self.assertIn(f'in {route}', message)
+        self.assertIn('blocking_handler', message)
+        self.assertEqual(event_loop_blocks._values[event_loop_blocks._key({'route': route})], blocks + 1)
+        self.assertGreaterEqual(self.monitor.lag, 0.25)
+
+    async def test_quiet_when_not_blocked(self):
+        samples = event_loop_lag._values.get(event_loop_lag._key({}), [0])[-1]
+        with self.assertNoLogs('uvicorn.error', level='WARNING'):
+            for _ in range(5):
+                time.sleep(0.02)
+                await asyncio.sleep(0.02)
+        self.assertGreater(event_loop_lag._values[event_loop_lag._key({})][-1], samples)
+
+    async def test_stop_joins_watchdog(self):
+        watchdog = self.monitor._watchdog
+        await self.monitor.stop()
+        self.assertFalse(watchdog.is_alive())
+
+
+class TestRouteName(unittest.TestCase):
+    def test_label(self):
+        self.assertEqual(route_name({'type': 'http', 'path': '/api/test/1', 'route': MagicMock(path='/api/test/{id}')}),
+                         '/api/test/{id}')
+        # Before routing or a 404: one series, not one per URL
+        self.assertEqual(route_name({'type': 'http', 'path': '/api/test/1'}), 'unmatched')
+        self.assertEqual(route_name(None), 'unknown')
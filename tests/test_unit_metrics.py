@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.services.metrics import Registry, Counter, Gauge, Histogram
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.requests = Counter('requests_total', 'Requests', ('route',), registry=self.registry)
+        self.in_flight = Gauge('in_flight', 'In flight requests', registry=self.registry)
+        self.latency = Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0), registry=self.registry)
+
+    def test_render(self):
+        self.requests.inc(route='/api/contacts/{contact_id}')
+        self.requests.inc(2, route='/api/contacts/{contact_id}')
+        self.in_flight.set_function(lambda: 7)
+        self.latency.observe(0.05)
+        self.latency.observe(0.5)
+        self.latency.observe(5)
+        text = self.registry.render()
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertIn('requests_total{route="/api/contacts/{contact_id}"} 3.0', text)
+        self.assertIn('in_flight 7.0', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1.0', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 2.0', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3.0', text)
+        self.assertIn('latency_seconds_sum 5.55', text)
+        self.assertIn('latency_seconds_count 3.0', text)
+
+    def write_snapshot(self, directory: str, pid: int, started: int) -> None:
+        with open(os.path.join(directory, f'metrics_{pid}_{started}.json'), 'w') as file:
+            json.dump(self.registry.snapshot(), file)
+
+    def test_multiprocess_merge(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.registry.directory = Registry(directory).directory
+            self.requests.inc(route='/')
+            self.in_flight.set(2)
+            self.latency.observe(0.05)
+            # A worker that has exited: its counters are kept, its gauges are dropped
+            self.write_snapshot(directory, 2 ** 22 + 1, 1)
+            text = self.registry.render()
+            self.assertEqual(sorted(path.name for path in Path(directory).glob('*.json')),
+                             ['accumulated.json', self.registry.path.name])
+            # Folded once: the next scrape has the same totals
+            self.assertEqual(self.registry.render(), text)
+        self.assertIn('requests_total{route="/"} 2.0', text)
+        self.assertIn('in_flight 2.0', text)
+        self.assertIn('latency_seconds_count 2.0', text)
+
+    def test_reused_pid(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.registry.directory = Registry(directory).directory
+            self.requests.inc(route='/')
+            self.in_flight.set(2)
+            pid = 2 ** 22 + 1
+            # Two workers had the same pid, the older one has exited: its snapshot is not overwritten
+            self.write_snapshot(directory, pid, 1)
+            self.write_snapshot(directory, pid, time.time_ns())
+            with patch('src.services.metrics._pid_alive', return_value=True):
+                text = self.registry.render()
+        self.assertIn('requests_total{route="/"} 3.0', text)
+        self.assertIn('in_flight 4.0', text)
+
+
+class TestMetricsToken(unittest.TestCase):
+    def setUp(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from src.services.metrics import router
+
+        app = FastAPI()
+        app.include_router(router)
+        self.client = TestClient(app)
+
+    def test_open_without_token(self):
+        with patch('src.services.metrics.app_config.METRICS_TOKEN', None):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_token(self):
+        with patch('src.services.metrics.app_config.METRICS_TOKEN', 'scraper-secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'})
+            self.assertEqual(response.status_code, 401)
+            response = self.client.get('/metrics', headers={'Authorization': 'Bearer scraper-secret'})
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,120 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import cloudinary.uploader
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
+from fastapi_mail.errors import ConnectionErrors
+
+from src.services.circuit_breaker import CircuitOpenError
+from src.services.metrics import outbound_call_duration, outbound_in_flight
+from src.services.outbound import OutboundService
+from tests.stub_servers import HTTPStub, SMTPStub
+
+
+def calls(service: str, result: str) -> int:
+    values = outbound_call_duration._values.get(outbound_call_duration._key({'service': service, 'result': result}))
+    return values[-1] if values else 0
+
+
+class TestOutboundService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.name = f'test_{self._testMethodName}'
+        self.service = OutboundService(self.name, timeout=0.2, concurrency=1, errors=lambda: (ValueError,))
+        self.service.breaker.failure_threshold = 2
+        self.service.breaker.backoff = self.service.breaker._current_backoff = 0.05
+
+    async def test_deadline(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.service.call(lambda: asyncio.sleep(1))
+        self.assertEqual(calls(self.name, 'timeout'), 1)
+        self.assertEqual(await self.service.call(AsyncMock(return_value='ok'), timeout=0.5), 'ok')
+        self.assertEqual(calls(self.name, 'ok'), 1)
+
+    async def test_busy(self):
+        # The deadline covers the wait for a free slot, the call does not start
+        slow = asyncio.create_task(self.service.call(lambda: asyncio.sleep(0.3), timeout=1))
+        await asyncio.sleep(0.05)
+        self.assertEqual(outbound_in_flight._values[outbound_in_flight._key({'service': self.name})], 1)
+        waiting = AsyncMock()
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.service.call(waiting, timeout=0.05)
+        waiting.assert_not_called()
+        self.assertEqual(calls(self.name, 'busy'), 1)
+        await slow
+        self.assertEqual(outbound_in_flight._values[outbound_in_flight._key({'service': self.name})], 0)
+
+    async def test_breaker(self):
+        failing = AsyncMock(side_effect=ValueError('down'))
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                await self.service.call(failing)
+        with self.assertRaises(CircuitOpenError):
+            await self.service.call(failing)
+        self.assertEqual(failing.await_count, 2)
+        self.assertEqual(calls(self.name, 'open'), 1)
+
+        # Half-open: the probe goes through and closes the breaker
+        await asyncio.sleep(0.06)
+        self.assertEqual(await self.service.call(AsyncMock(return_value='ok')), 'ok')
+        self.assertEqual(self.service.breaker.state, 'closed')
+
+    async def test_other_errors_do_not_open(self):
+        for _ in range(3):
+            with self.assertRaises(KeyError):
+                await self.service.call(AsyncMock(side_effect=KeyError('bad request')))
+        self.assertEqual(self.service.breaker.state, 'closed')
+
+
+class TestOutboundStubs(unittest.IsolatedAsyncioTestCase):
+    async def test_slow_smtp_server(self):
+        async with SMTPStub() as smtp:
+            fm = FastMail(ConnectionConfig(
+                MAIL_USERNAME='stub', MAIL_PASSWORD='stub', MAIL_FROM='app@example.com', MAIL_PORT=smtp.port,
+                MAIL_SERVER='127.0.0.1', MAIL_STARTTLS=False, MAIL_SSL_TLS=False, USE_CREDENTIALS=False,
+                VALIDATE_CERTS=False, TIMEOUT=5,
+            ))
+            message = MessageSchema(subject='Hi', recipients=['user@example.com'], body='Hi', subtype=MessageType.plain)
+            service = OutboundService('test_smtp', timeout=0.3, concurrency=2,
+                                      errors=lambda: (ConnectionErrors,))
+
+            await service.call(lambda: fm.send_message(message))
+            self.assertEqual(len(smtp.messages), 1)
+
+            smtp.latency = 1.0
+            with self.assertRaises(asyncio.TimeoutError):
+                await service.call(lambda: fm.send_message(message))
+            self.assertEqual(len(smtp.messages), 1)
+
+    async def test_slow_storage(self):
+        async with HTTPStub({'public_id': 'first_app/avatar', 'version': 1}) as storage:
+            service = OutboundService('test_storage', timeout=0.3, concurrency=2)
+
+            def upload():
+                return asyncio.to_thread(cloudinary.uploader.upload, b'image', upload_prefix=storage.url,
+                                         cloud_name='stub', api_key='1', api_secret='stub', timeout=5)
+
+            self.assertEqual((await service.call(upload))['public_id'], 'first_app/avatar')
+
+            storage.latency = 1.0
+            with self.assertRaises(asyncio.TimeoutError):
+                await service.call(upload)
+            self.assertEqual(storage.requests, 2)
+
+
+class TestAvatarUpload(unittest.IsolatedAsyncioTestCase):
+    @patch('src.users.routes.storage_service')
+    async def test_storage_unavailable(self, storage_service):
+        from fastapi import HTTPException, UploadFile
+
+        from src.users.routes import get_current_user as update_avatar
+
+        from cloudinary.exceptions import GeneralError, RateLimited
+
+        for side_effect in (CircuitOpenError('cloudinary'), asyncio.TimeoutError(), GeneralError('Server error'),
+                            RateLimited('Rate limit exceeded')):
+            with self.subTest(error=type(side_effect).__name__):
+                storage_service.call = AsyncMock(side_effect=side_effect)
+                with self.assertRaises(HTTPException) as error:
+                    await update_avatar(UploadFile(file=None, filename='avatar.png'), AsyncMock(), AsyncMock())
+                self.assertEqual(error.exception.status_code, 503)
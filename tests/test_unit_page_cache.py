@@ -0,0 +1,52 @@
+import pytest
+from fastapi.templating import Jinja2Templates
+from jinja2 import DictLoader, Environment
+from starlette.requests import Request
+
+from src.services.page_cache import StaticPage, FragmentTemplate
+
+
+@pytest.fixture
+def templates():
+    env = Environment(autoescape=True, loader=DictLoader({
+        'static.html': '<h1>{{ page_title }}</h1>',
+        'form.html': '<title>{{ page_title }}</title><form action="/reset/{{ token }}">{{ token }}</form>',
+        'branch.html': '{% if token %}<p>{{ token }}</p>{% endif %}',
+    }))
+    return Jinja2Templates(env=env)
+
+
+def make_request(headers: dict = None) -> Request:
+    raw = [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': raw})
+
+
+def test_static_page(templates):
+    page = StaticPage(templates, 'static.html', {'page_title': 'Home'})
+    response = page.response(make_request())
+    assert response.status_code == 200
+    assert response.body == b'<h1>Home</h1>'
+    assert response.headers['etag'] == page.etag
+    assert response.headers['content-type'].startswith('text/html')
+
+
+def test_static_page__not_modified(templates):
+    page = StaticPage(templates, 'static.html', {'page_title': 'Home'})
+    response = page.response(make_request({'If-None-Match': f'"other", {page.etag}'}))
+    assert response.status_code == 304
+    assert response.body == b''
+    assert response.headers['etag'] == page.etag
+    assert page.response(make_request({'If-None-Match': '"other"'})).status_code == 200
+
+
+def test_fragment_template(templates):
+    template = FragmentTemplate(templates, 'form.html', {'page_title': 'Reset'}, variables=('token',))
+    assert template.fragments == ['<title>Reset</title><form action="/reset/', '">', '</form>']
+    value = 'abc"<script>'
+    assert template.render(token=value) == templates.get_template('form.html').render(page_title='Reset', token=value)
+    assert '<script>' not in template.render(token=value)
+
+
+def test_fragment_template__not_plain_output(templates):
+    with pytest.raises(ValueError):
+        FragmentTemplate(templates, 'branch.html', {}, variables=('token',))
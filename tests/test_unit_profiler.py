@@ -0,0 +1,49 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from src.services import profiler
+
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestStackSampler(unittest.TestCase):
+    def test_collapsed(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,), name='busy-worker')
+        worker.start()
+        sampler = profiler.StackSampler(0.001)
+        sampler.start()
+        time.sleep(0.1)
+        sampler.stop()
+        sampler.join()
+        stop.set()
+        worker.join()
+        lines = sampler.collapsed().splitlines()
+        self.assertTrue(lines)
+        busy = [line for line in lines if line.startswith('busy-worker;')]
+        self.assertTrue(busy)
+        stack, count = busy[0].rsplit(' ', 1)
+        self.assertIn('busy_loop (tests/test_unit_profiler.py:', stack)
+        self.assertGreater(int(count), 0)
+
+
+class TestProfile(unittest.IsolatedAsyncioTestCase):
+    async def test_task_dump(self):
+        async def slow_await():
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(slow_await(), name='slow-task')
+        collapsed, tasks = await profiler.profile(0.1, 0.01)
+        task.cancel()
+        self.assertFalse(profiler.is_running())
+        self.assertIsInstance(collapsed, str)
+        slow = next(item for item in tasks if item['name'] == 'slow-task')
+        self.assertTrue(slow['awaiting_at'].startswith('sleep ('))
+        self.assertGreaterEqual(slow['awaiting_for'], 0.05)
+        self.assertIn('slow_await (tests/test_unit_profiler.py:', slow['stack'][0])
+        self.assertIn('Future', slow['waiting_on'])
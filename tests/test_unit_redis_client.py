@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError
+
+from conf.config import Settings
+from src.services.metrics import redis_pool_wait, redis_pool_in_use
+from src.services.redis_client import RedisClients, TimedConnectionPool, create_redis, delete_matching
+
+
+class TestRedisClients(unittest.IsolatedAsyncioTestCase):
+    async def test_shared_pool(self):
+        clients = RedisClients()
+        self.assertIs(clients.get('cache'), clients.get('limiter'))
+        self.assertEqual(set(clients.pool_status()), {'shared'})
+        await clients.aclose()
+
+    async def test_separate_pools(self):
+        clients = RedisClients('limiter')
+        self.assertIsNot(clients.get('cache'), clients.get('limiter'))
+        self.assertIs(clients.get('cache'), clients.get('tokens'))
+        self.assertEqual(set(clients.pool_status()), {'shared', 'limiter'})
+        await clients.aclose()
+        self.assertEqual(clients.pool_status(), {})
+
+    def test_unknown_workload(self):
+        with self.assertRaises(ValueError):
+            RedisClients('cache,sessions')
+        with self.assertRaises(ValueError):
+            RedisClients().get('sessions')
+
+    @patch.multiple('conf.config.app_config', REDIS_MAX_CONNECTIONS=7, REDIS_POOL_TIMEOUT=0.5,
+                    REDIS_SOCKET_TIMEOUT=1.5, REDIS_HEALTH_CHECK_INTERVAL=15)
+    async def test_create_redis(self):
+        client = create_redis('cache', 'redis://localhost:6379/2')
+        pool = client.connection_pool
+        self.assertIsInstance(pool, TimedConnectionPool)
+        self.assertEqual((pool.name, pool.max_connections, pool.timeout), ('cache', 7, 0.5))
+        self.assertEqual(pool.connection_kwargs['socket_timeout'], 1.5)
+        self.assertEqual(pool.connection_kwargs['health_check_interval'], 15)
+        self.assertEqual(pool.connection_kwargs['db'], 2)
+        await client.aclose()
+
+
+class TestTimedConnectionPool(unittest.IsolatedAsyncioTestCase):
+    @patch.object(BlockingConnectionPool, 'ensure_connection', new_callable=AsyncMock)
+    async def test_wait_and_in_use(self, _):
+        pool = TimedConnectionPool('test_wait', max_connections=1, timeout=0.05)
+        key = redis_pool_in_use._key({'pool': 'test_wait'})
+        connection = await pool.get_connection('GET')
+        self.assertEqual(redis_pool_in_use._values[key], 1)
+        self.assertEqual(pool.status(), {'capacity': 1, 'in_use': 1, 'usage': 1.0})
+
+        with self.assertRaises(ConnectionError):
+            await pool.get_connection('GET')
+        waits = redis_pool_wait._values[redis_pool_wait._key({'pool': 'test_wait'})]
+        self.assertEqual(waits[-1], 2)
+        self.assertGreaterEqual(waits[-2], 0.05)
+
+        await pool.release(connection)
+        self.assertEqual(redis_pool_in_use._values[key], 0)
+        await pool.disconnect()
+
+
+class TestDeleteMatching(unittest.IsolatedAsyncioTestCase):
+    async def test_batches_pipelined(self):
+        async def scan_iter(match, count):
+            for index in range(5):
+                yield f'fastapi_cache:get_my_contacts:user=1:{index}'
+
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(side_effect=[[1, 1], [1, 1], [1]])
+        redis = MagicMock(scan_iter=scan_iter)
+        redis.pipeline.return_value.__aenter__.return_value = pipe
+
+        deleted = await delete_matching(redis, 'fastapi_cache:get_my_contacts:user=1:*', batch_size=2)
+        self.assertEqual(deleted, 5)
+        self.assertEqual(pipe.unlink.call_count, 5)
+        self.assertEqual(pipe.execute.await_count, 3)
+        redis.pipeline.assert_called_with(transaction=False)
+
+
+class TestRedisUrl(unittest.TestCase):
+    def test_built_from_parts(self):
+        settings = Settings(REDIS_URL='redis://:${REDIS_PASSWORD}@${REDIS_DOMAIN}:6379/0', REDIS_DOMAIN='cache',
+                            REDIS_PORT='6380', REDIS_PASSWORD='secret', REDIS_DB=1)
+        self.assertEqual(settings.REDIS_URL, 'redis://:secret@cache:6380/1')
+
+    def test_explicit(self):
+        self.assertEqual(Settings(REDIS_URL='redis://localhost:6379/3').REDIS_URL, 'redis://localhost:6379/3')
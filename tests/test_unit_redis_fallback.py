@@ -0,0 +1,146 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi_limiter import FastAPILimiter
+
+from src.services.auth.jwt_auth import TokenVersions
+from src.services.redis_fallback import (
+    redis_breaker,
+    LocalCacheBackend,
+    LocalRateLimiter,
+    ResilientCacheBackend,
+    ResilientLimiterRedis,
+)
+from tests.fake_redis import FakeRedis
+
+
+class RedisFallbackTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        redis_breaker.reset()
+        self.redis = FakeRedis()
+
+    def tearDown(self):
+        redis_breaker.reset()
+
+
+class TestResilientCacheBackend(RedisFallbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backend = ResilientCacheBackend(self.redis, LocalCacheBackend(maxsize=10))
+
+    async def test_redis_up(self):
+        await self.backend.set('fastapi_cache:get_my_contacts:user=1:a', b'cached', 60)
+        self.assertIn('fastapi_cache:get_my_contacts:user=1:a', self.redis.data)
+        ttl, value = await self.backend.get_with_ttl('fastapi_cache:get_my_contacts:user=1:a')
+        self.assertEqual(value, b'cached')
+        self.assertEqual(await self.backend.local.get('fastapi_cache:get_my_contacts:user=1:a'), None)
+
+    async def test_redis_down_uses_local_cache(self):
+        self.redis.down = True
+        await self.backend.set('key', b'cached', 60)
+        self.assertEqual(await self.backend.get_with_ttl('key'), (60, b'cached'))
+        self.assertEqual(await self.backend.get('key'), b'cached')
+
+    async def test_breaker_opens(self):
+        self.redis.down = True
+        for _ in range(redis_breaker.failure_threshold):
+            await self.backend.get('key')
+        calls = self.redis.calls
+        await self.backend.get('key')
+        self.assertEqual(redis_breaker.state, 'open')
+        self.assertEqual(self.redis.calls, calls)
+
+    @patch('conf.config.app_config.REDIS_OPERATION_TIMEOUT', 0.01)
+    async def test_slow_redis(self):
+        await self.backend.local.set('key', b'local', 60)
+        self.redis.latency = 1.0
+        self.assertEqual(await self.backend.get('key'), b'local')
+        self.assertEqual(redis_breaker.failures, 1)
+
+    async def test_invalidation_queued_until_redis_recovers(self):
+        namespace = 'fastapi_cache:get_my_contacts:user=1'
+        await self.backend.set(f'{namespace}:a', b'stale', 60)
+        self.redis.down = True
+        await self.backend.clear(namespace=namespace)
+        self.assertEqual(self.backend.pending_namespaces, {f'{namespace}:'})
+
+        # Redis is back but still has the stale entry: the namespace is served locally until the replay
+        self.redis.down = False
+        self.assertIsNone(await self.backend.get(f'{namespace}:a'))
+        await self.backend.set(f'{namespace}:a', b'fresh', 60)
+        self.assertEqual(await self.backend.get(f'{namespace}:a'), b'fresh')
+
+        await self.backend.get('other')
+        await self.backend._flush_task
+        self.assertEqual(self.backend.pending_namespaces, set())
+        self.assertNotIn(f'{namespace}:a', self.redis.data)
+        self.assertIsNone(await self.backend.get(f'{namespace}:a'))
+
+
+class TestLocalCacheBackend(unittest.IsolatedAsyncioTestCase):
+    async def test_lru_eviction(self):
+        local = LocalCacheBackend(maxsize=2)
+        await local.set('first', b'1', 60)
+        await local.set('second', b'2', 60)
+        await local.get('first')
+        await local.set('third', b'3', 60)
+        self.assertEqual(await local.get('first'), b'1')
+        self.assertIsNone(await local.get('second'))
+
+    async def test_expired(self):
+        local = LocalCacheBackend(maxsize=2)
+        await local.set('key', b'1', 60)
+        with patch('src.services.redis_fallback.time.monotonic', return_value=10 ** 9):
+            self.assertEqual(await local.get_with_ttl('key'), (0, None))
+
+
+class TestResilientLimiterRedis(RedisFallbackTestCase):
+    async def test_redis_up(self):
+        limiter = ResilientLimiterRedis(self.redis)
+        sha = await limiter.script_load(FastAPILimiter.lua_script)
+        self.assertEqual([await limiter.evalsha(sha, 1, 'key', '1', '1000') for _ in range(2)][0], 0)
+        self.assertIn('key', self.redis.data)
+
+    async def test_redis_down_uses_local_buckets(self):
+        self.redis.down = True
+        limiter = ResilientLimiterRedis(self.redis)
+        sha = await limiter.script_load(FastAPILimiter.lua_script)
+        results = [await limiter.evalsha(sha, 1, 'key', '2', '1000') for _ in range(3)]
+        self.assertEqual(results[:2], [0, 0])
+        self.assertTrue(0 < results[2] <= 1000)
+        self.assertEqual(await limiter.evalsha(sha, 1, 'other', '2', '1000'), 0)
+
+    def test_local_window_resets(self):
+        limiter = LocalRateLimiter()
+        with patch('src.services.redis_fallback.time.monotonic', return_value=100.0) as monotonic:
+            self.assertEqual(limiter.hit('key', 1, 1000), 0)
+            self.assertEqual(limiter.hit('key', 1, 1000), 1000)
+            monotonic.return_value = 101.0
+            self.assertEqual(limiter.hit('key', 1, 1000), 0)
+
+
+@patch('conf.config.app_config.TOKEN_REVOCATION_CHECK', True)
+class TestTokenVersionsFallback(RedisFallbackTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = patch('src.services.auth.jwt_auth.redis_clients')
+        patcher.start().get.return_value = self.redis
+        self.addCleanup(patcher.stop)
+        self.versions = TokenVersions()
+
+    async def test_revoked_while_redis_down(self):
+        self.redis.down = True
+        token = {'uid': 1, 'ver': 0, 'iat': 1000}
+        self.assertFalse(await self.versions.is_revoked(token))
+        with patch('src.services.auth.jwt_auth.time.time', return_value=2000):
+            await self.versions.revoke(1)
+        self.assertTrue(await self.versions.is_revoked(token))
+        # Issued in the second of the revocation, e.g. by a login right after a password reset
+        self.assertFalse(await self.versions.is_revoked({'uid': 1, 'ver': 0, 'iat': 2000}))
+        self.assertFalse(await self.versions.is_revoked({'uid': 1, 'ver': 0, 'iat': 2001}))
+
+        # Written to Redis once it answers again
+        redis_breaker.reset()
+        self.redis.down = False
+        self.assertTrue(await self.versions.is_revoked(token))
+        self.assertEqual(self.redis.data['token_version:1'][0], b'1')
@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+
+from fastapi import BackgroundTasks, FastAPI
+
+from src.services.metrics import http_requests_cancelled
+from src.services.request_cancellation import CancelOnDisconnectMiddleware
+
+
+def cancelled_count(route: str) -> float:
+    return http_requests_cancelled._values.get(http_requests_cancelled._key({'route': route}), 0)
+
+
+class TestCancelOnDisconnect(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.events = []
+        app = FastAPI()
+
+        @app.get('/slow')
+        async def slow():
+            try:
+                # A stand-in for a long query, e.g. SELECT pg_sleep(...)
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                self.events.append('cancelled')
+                raise
+            self.events.append('finished')
+            return {}
+
+        @app.post('/slow')
+        async def slow_write():
+            await asyncio.sleep(0.1)
+            self.events.append('written')
+            return {}
+
+        @app.get('/background')
+        async def background(tasks: BackgroundTasks):
+            async def work():
+                await asyncio.sleep(0.1)
+                self.events.append('background done')
+            tasks.add_task(work)
+            return {}
+
+        self.app = CancelOnDisconnectMiddleware(app)
+
+    async def request(self, method: str, path: str, disconnect_after: float) -> list[dict]:
+        sent = []
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.sleep(disconnect_after)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': method, 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+                 'headers': [], 'scheme': 'http', 'server': ('test', 80), 'root_path': '', 'http_version': '1.1'}
+        await asyncio.wait_for(self.app(scope, receive, send), 2)
+        return sent
+
+    async def test_cancels_read_on_disconnect(self):
+        before = cancelled_count('/slow')
+        sent = await self.request('GET', '/slow', disconnect_after=0.05)
+        self.assertEqual(self.events, ['cancelled'])
+        self.assertEqual(sent, [])
+        self.assertEqual(cancelled_count('/slow'), before + 1)
+
+    async def test_write_runs_to_the_end(self):
+        sent = await self.request('POST', '/slow', disconnect_after=0.01)
+        self.assertEqual(self.events, ['written'])
+        self.assertEqual(sent[0]['status'], 200)
+
+    async def test_background_tasks_survive_response(self):
+        # The server reports a disconnect as soon as the response is sent
+        sent = await self.request('GET', '/background', disconnect_after=0)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(self.events, ['background done'])
+
+    async def test_server_cancellation_propagates(self):
+        task = asyncio.create_task(self.request('GET', '/slow', disconnect_after=10))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.events, ['cancelled'])
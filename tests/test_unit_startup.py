@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+import main
+from conf.config import app_config
+
+DEFERRED_MODULES = ['cloudinary', 'fastapi_mail', 'libgravatar', 'asyncpg', 'sqlalchemy.testing']
+
+
+def import_main(code: str, **env) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, '-c', f'import main, json, sys\n{code}'], cwd=app_config.BASE_DIR,
+                          env=dict(os.environ, **env), capture_output=True, text=True, timeout=60)
+
+
+def test_import_defers_heavy_clients():
+    result = import_main(
+        f'print(json.dumps({{"loaded": [m for m in {DEFERRED_MODULES!r} if m in sys.modules], '
+        f'"engine": main.sessionmanager._engine is not None}}))'
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout) == {'loaded': [], 'engine': False}
+
+
+def test_enabled_routers():
+    result = import_main(
+        'print(json.dumps({"paths": [route.path for route in main.app.routes], '
+        '"pages": "src.services.routes_pages" in sys.modules}))',
+        ENABLED_ROUTERS='api,health',
+    )
+    assert result.returncode == 0, result.stderr
+    data = json.loads(result.stdout)
+    assert '/api/auth/login' in data['paths']
+    assert '/api/health_checker/live' in data['paths']
+    assert '/' not in data['paths']
+    assert '/static' not in data['paths']
+    assert '/metrics' not in data['paths']
+    assert data['pages'] is False
+
+
+def test_enabled_routers__unknown_group():
+    result = import_main('', ENABLED_ROUTERS='api,admin_panel')
+    assert result.returncode != 0
+    assert 'admin_panel' in result.stderr
+
+
+@pytest.mark.asyncio
+async def test_lifespan_shutdown_order(monkeypatch):
+    calls = []
+    redis_clients = Mock(aclose=AsyncMock(side_effect=lambda: calls.append('redis')))
+    monkeypatch.setattr(main, 'redis_clients', redis_clients)
+    monkeypatch.setattr(main.FastAPICache, 'init', Mock())
+    monkeypatch.setattr(main.FastAPILimiter, 'init', AsyncMock())
+    monkeypatch.setattr(main, 'sessionmanager', Mock(close=AsyncMock(side_effect=lambda: calls.append('database'))))
+    monkeypatch.setattr(main.email_open_buffer, 'close', AsyncMock(side_effect=lambda: calls.append('email')))
+
+    async with main.lifespan(main.app):
+        assert calls == []
+    assert calls == ['email', 'database', 'redis']
@@ -0,0 +1,81 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from src.services.static_assets import build, accepted_encodings, StaticAssets, PrecompressedStaticFiles
+
+CSS = '@font-face { src: url("../fonts/icons.woff2?v=1") format("woff2"), url(data:font/woff;base64,AA==); }' * 20
+JS = 'console.log("static assets");\n' * 50
+
+
+class TestStaticAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = Path(self.tmp.name) / 'static'
+        self.output = Path(self.tmp.name) / 'build'
+        (self.source / 'css').mkdir(parents=True)
+        (self.source / 'fonts').mkdir()
+        (self.source / 'js').mkdir()
+        (self.source / 'css' / 'icons.css').write_text(CSS)
+        (self.source / 'fonts' / 'icons.woff2').write_bytes(b'\x00woff2')
+        (self.source / 'js' / 'app.js').write_text(JS)
+        self.manifest = build(self.source, self.output)
+
+    def test_build(self):
+        self.assertEqual(set(self.manifest), {'css/icons.css', 'fonts/icons.woff2', 'js/app.js'})
+        self.assertRegex(self.manifest['js/app.js'], r'^js/app\.[0-9a-f]{12}\.js$')
+        self.assertEqual(json.loads((self.output / 'manifest.json').read_text()), self.manifest)
+        hashed_js = self.output / self.manifest['js/app.js']
+        self.assertEqual(gzip.decompress(hashed_js.with_name(hashed_js.name + '.gz').read_bytes()).decode(), JS)
+        # Already compressed formats get no variant
+        self.assertFalse((self.output / 'fonts' / 'icons.woff2.gz').exists())
+
+    def test_css_references_hashed_files(self):
+        css = (self.output / self.manifest['css/icons.css']).read_text()
+        font = self.manifest['fonts/icons.woff2'].split('/')[-1]
+        self.assertIn(f'url("../fonts/{font}")', css)
+        self.assertIn('url(data:font/woff;base64,AA==)', css)
+
+    def test_url(self):
+        assets = StaticAssets(self.source, self.output)
+        self.assertEqual(assets.url('js/app.js'), '/static/' + self.manifest['js/app.js'])
+        self.assertEqual(assets.url('missing.js'), '/static/missing.js')
+        self.assertIsInstance(assets.files(), PrecompressedStaticFiles)
+        self.assertEqual(StaticAssets(self.source, self.output / 'missing').url('js/app.js'), '/static/js/app.js')
+
+    def test_serving(self):
+        app = Starlette(routes=[Mount('/static', StaticAssets(self.source, self.output).files())])
+        client = TestClient(app)
+        hashed = '/static/' + self.manifest['js/app.js']
+
+        response = client.get(hashed, headers={'Accept-Encoding': 'br, gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['content-encoding'], 'gzip')
+        self.assertEqual(response.headers['cache-control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.headers['vary'], 'Accept-Encoding')
+        self.assertTrue(response.headers['content-type'].startswith('text/javascript'))
+        self.assertEqual(response.text, JS)
+
+        response = client.get(hashed, headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('content-encoding', response.headers)
+        self.assertEqual(response.text, JS)
+
+        response = client.get('/static/js/app.js', headers={'Accept-Encoding': 'identity'})
+        self.assertEqual(response.headers['cache-control'], 'no-cache')
+
+        etag = client.get(hashed, headers={'Accept-Encoding': 'gzip'}).headers['etag']
+        response = client.get(hashed, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+
+class TestAcceptedEncodings(unittest.TestCase):
+    def test_quality(self):
+        self.assertEqual(accepted_encodings('gzip, deflate, br;q=0.5, zstd;q=0'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(accepted_encodings(''), set())
@@ -0,0 +1,158 @@
+import io
+import json
+import logging
+import threading
+import unittest
+from queue import Queue
+from unittest.mock import MagicMock
+
+import httpx
+from fastapi import FastAPI
+
+from src.services.metrics import log_records_dropped
+from src.services.request_context import RequestContextMiddleware, current_scope, request_id
+from src.services.structured_logging import (ContextQueueHandler, DrainingQueueListener, JsonFormatter, LogPipeline,
+                                             SamplingFilter, TextFormatter)
+
+
+class BlockingStream(io.StringIO):
+    """A stream whose writes wait for ``released``, like a full pipe."""
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def write(self, text):
+        self.released.wait(5)
+        return super().write(text)
+
+
+class TestStructuredLogging(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('test.structured_logging')
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, 'handlers', [])
+
+    def run_pipeline(self, handler: ContextQueueHandler, stream: io.StringIO, formatter=JsonFormatter()):
+        output = logging.StreamHandler(stream)
+        output.setFormatter(formatter)
+        listener = DrainingQueueListener(handler.queue, output)
+        listener.start()
+        # Unless the test stopped it to read the stream
+        self.addCleanup(lambda: listener._thread and listener.stop())
+        self.logger.handlers = [handler]
+        return listener
+
+    def test_json_with_request_context(self):
+        stream = io.StringIO()
+        listener = self.run_pipeline(ContextQueueHandler(Queue()), stream)
+        id_token = request_id.set('abc123')
+        scope_token = current_scope.set({'type': 'http', 'path': '/api/contacts/1',
+                                         'route': MagicMock(path='/api/contacts/{contact_id}')})
+        try:
+            self.logger.info('Read %s', 'contact', extra={'status_code': 200})
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                self.logger.exception('Failed')
+        finally:
+            request_id.reset(id_token)
+            current_scope.reset(scope_token)
+        listener.stop()
+        first, second = map(json.loads, stream.getvalue().splitlines())
+        self.assertEqual(first['message'], 'Read contact')
+        self.assertEqual(first['level'], 'INFO')
+        self.assertEqual(first['logger'], 'test.structured_logging')
+        self.assertEqual(first['request_id'], 'abc123')
+        self.assertEqual(first['route'], '/api/contacts/{contact_id}')
+        self.assertEqual(first['status_code'], 200)
+        self.assertIn('ZeroDivisionError', second['exception'])
+
+    def test_text_format(self):
+        stream = io.StringIO()
+        listener = self.run_pipeline(ContextQueueHandler(Queue()), stream, TextFormatter())
+        self.logger.warning('Slow')
+        listener.stop()
+        self.assertRegex(stream.getvalue(), r'WARNING +test\.structured_logging \[-\] Slow')
+
+    def test_does_not_block_on_a_slow_stream(self):
+        stream = BlockingStream()
+        handler = ContextQueueHandler(Queue(2))
+        listener = self.run_pipeline(handler, stream)
+        dropped = log_records_dropped._values.get(log_records_dropped._key({}), 0)
+        # The listener holds the first record, two wait in the queue, the others are dropped
+        for number in range(10):
+            self.logger.info('Record %d', number)
+        self.assertGreaterEqual(log_records_dropped._values[log_records_dropped._key({})] - dropped, 6)
+        stream.released.set()
+        listener.stop()
+        self.assertIn('Record 0', stream.getvalue())
+
+    def test_sampling(self):
+        sampling = SamplingFilter.from_setting('test.sampled=0, test.sampled.half=0.5')
+        self.assertEqual(sampling.rate('test.sampled.requests'), 0)
+        self.assertEqual(sampling.rate('test.sampled.half.x'), 0.5)
+        self.assertEqual(sampling.rate('test.other'), 1.0)
+
+        def record(name, level=logging.INFO):
+            return logging.LogRecord(name, level, __file__, 0, 'message', None, None)
+
+        self.assertFalse(sampling.filter(record('test.sampled')))
+        self.assertTrue(sampling.filter(record('test.sampled', logging.WARNING)))
+        self.assertTrue(sampling.filter(record('test.other')))
+        kept = sum(sampling.filter(record('test.sampled.half')) for _ in range(2000))
+        self.assertTrue(800 < kept < 1200, kept)
+
+    def test_pipeline_restores_the_loggers(self):
+        logger = logging.getLogger('uvicorn.error')
+        handlers, propagate = logger.handlers[:], logger.propagate
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.INFO)
+        uvicorn_handlers = logging.getLogger('uvicorn').handlers[:]
+        stream = io.StringIO()
+        pipeline = LogPipeline('json', 'uvicorn.error.requests=0')
+        pipeline.start(stream)
+        try:
+            logging.getLogger('uvicorn.error.requests').info('GET /')
+            logger.info('Started')
+        finally:
+            pipeline.stop()
+        self.assertEqual(logging.getLogger('uvicorn').handlers, uvicorn_handlers)
+        self.assertEqual((logger.handlers, logger.propagate), (handlers, propagate))
+        messages = [json.loads(line)['message'] for line in stream.getvalue().splitlines()]
+        self.assertEqual(messages, ['Started'])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            LogPipeline('xml')
+
+
+class TestRequestId(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        app = FastAPI()
+
+        @app.get('/id')
+        async def endpoint():
+            return {'request_id': request_id.get()}
+
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=RequestContextMiddleware(app)),
+                                        base_url='http://test')
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_generated(self):
+        first, second = await self.client.get('/id'), await self.client.get('/id')
+        self.assertEqual(first.headers['x-request-id'], first.json()['request_id'])
+        self.assertRegex(first.headers['x-request-id'], r'^[0-9a-f]{32}$')
+        self.assertNotEqual(first.headers['x-request-id'], second.headers['x-request-id'])
+
+    async def test_from_the_client(self):
+        response = await self.client.get('/id', headers={'X-Request-ID': 'proxy-42.a_b'})
+        self.assertEqual(response.json()['request_id'], 'proxy-42.a_b')
+        self.assertEqual(response.headers['x-request-id'], 'proxy-42.a_b')
+        # Not copied into the logs as is
+        for received in ('id" "level": "ERROR', 'x' * 65):
+            response = await self.client.get('/id', headers={'X-Request-ID': received})
+            self.assertRegex(response.json()['request_id'], r'^[0-9a-f]{32}$')
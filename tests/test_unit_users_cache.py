@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import inspect, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from conf.config import Base
+from src.users import repository  # noqa: F401 - registers the invalidation events
+from src.users.cache import UserCache, user_cache
+from src.users.models import User, Role
+
+
+class TestUserCache(unittest.TestCase):
+    def setUp(self):
+        self.user = User(id=1, username='jason', email='jason@example.com', password='hash', role_id=3,
+                         confirmed=True)
+        self.user.role = Role(id=3, name='admin')
+
+    def test_hit_returns_detached_copy(self):
+        cache = UserCache(ttl=60)
+        self.assertIsNone(cache.get(self.user.email))
+        cache.put(self.user)
+        first, second = cache.get(self.user.email), cache.get(self.user.email)
+        self.assertIsNot(first, second)
+        self.assertEqual((first.id, first.username, first.confirmed, first.role.name), (1, 'jason', True, 'admin'))
+        state = inspect(first)
+        self.assertTrue(state.detached)
+        self.assertFalse(state.modified)
+
+    def test_expired(self):
+        cache = UserCache(ttl=60)
+        cache.put(self.user)
+        with patch('src.users.cache.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(cache.get(self.user.email))
+
+    def test_invalidate(self):
+        cache = UserCache(ttl=60)
+        cache.put(self.user)
+        cache.invalidate(self.user.email)
+        self.assertIsNone(cache.get(self.user.email))
+
+    def test_lru_eviction(self):
+        cache = UserCache(ttl=60, maxsize=1)
+        cache.put(self.user)
+        other = User(id=2, username='mary', email='mary@example.com', password='hash', role_id=2)
+        cache.put(other)
+        self.assertIsNone(cache.get(self.user.email))
+        self.assertEqual(cache.get(other.email).id, 2)
+        self.assertIsNone(cache.get(other.email).role)
+
+    def test_disabled(self):
+        cache = UserCache(ttl=0)
+        cache.put(self.user)
+        self.assertIsNone(cache.get(self.user.email))
+
+
+class TestInvalidationOnCommit(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine('sqlite+aiosqlite://')
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        async with self.sessions() as session:
+            session.add(Role(id=3, name='admin'))
+            session.add_all([User(id=1, username='jason', email='jason@example.com', password='hash', role_id=3),
+                             User(id=2, username='mary', email='mary@example.com', password='hash', role_id=3)])
+            await session.commit()
+        patcher = patch.object(user_cache, 'ttl', 60)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def cache_users(self):
+        async with self.sessions() as session:
+            for user in (await session.execute(select(User))).scalars():
+                user_cache.put(user)
+
+    async def test_update_evicts_after_commit(self):
+        await self.cache_users()
+        async with self.sessions() as session:
+            user = await session.get(User, 1)
+            user.email = 'jason@example.org'
+            await session.flush()
+            # Not before the commit, a concurrent request could cache the previous row again
+            self.assertIsNotNone(user_cache.get('jason@example.com'))
+            await session.commit()
+        self.assertIsNone(user_cache.get('jason@example.com'))
+        self.assertIsNotNone(user_cache.get('mary@example.com'))
+
+    async def test_rollback_keeps_the_cache(self):
+        await self.cache_users()
+        async with self.sessions() as session:
+            user = await session.get(User, 1)
+            user.confirmed = True
+            await session.flush()
+            await session.rollback()
+            await session.commit()
+        self.assertIsNotNone(user_cache.get('jason@example.com'))
+
+    async def test_bulk_update_clears(self):
+        await self.cache_users()
+        async with self.sessions() as session:
+            await session.execute(update(User).where(User.id == 2).values(confirmed=True))
+            await session.commit()
+        self.assertIsNone(user_cache.get('jason@example.com'))
+        self.assertIsNone(user_cache.get('mary@example.com'))
+
+    async def test_delete_evicts(self):
+        await self.cache_users()
+        async with self.sessions() as session:
+            await session.delete(await session.get(User, 2))
+            await session.commit()
+        self.assertIsNone(user_cache.get('mary@example.com'))
+        self.assertIsNotNone(user_cache.get('jason@example.com'))
@@ -1,9 +1,10 @@
+import asyncio
 import unittest
 from unittest.mock import MagicMock, patch, AsyncMock
 
 from fastapi_cache.backends.inmemory import InMemoryBackend
 from fastapi_cache import FastAPICache
-from sqlalchemy import select
+from sqlalchemy import select, event
 from sqlalchemy.ext.asyncio import AsyncSession
 from faker import Faker
 
@@ -17,7 +18,10 @@ from src.users.repository import (
     verify_email,
     update_user_password,
     update_avatar_url,
+    users_by_email,
+    UserLoader,
 )
+from tests.conftest import TestingSessionLocal, engine, test_user
 
 faker = Faker()
 
@@ -124,3 +128,61 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         self.session.commit.assert_awaited_once()
         self.session.refresh.assert_awaited_once_with(self.user)
         self.assertNotEqual(old_avatar_url, self.user.avatar)
+
+
+class TestUserLoader(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.statements = []
+        event.listen(engine.sync_engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def tearDown(self):
+        event.remove(engine.sync_engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    async def test_concurrent_lookups_share_one_query(self):
+        sessions = [TestingSessionLocal() for _ in range(6)]
+        emails = [test_user['email']] * 5 + ['nobody@example.com']
+        try:
+            users = await asyncio.gather(*(get_user_by_email(email, session) for email, session in zip(emails, sessions)))
+            self.assertEqual(len(self.statements), 1)
+            self.assertIn(' IN ', self.statements[0])
+            self.assertIsNone(users[-1])
+            self.assertEqual({user.email for user in users[:-1]}, {test_user['email']})
+            self.assertEqual(len({id(user) for user in users[:-1]}), 5)
+            for user, session in zip(users[:-1], sessions):
+                self.assertIn(user, session)
+                self.assertEqual(user.role.name, 'admin')
+        finally:
+            for session in sessions:
+                await session.close()
+
+    async def test_memoized_per_session(self):
+        async with TestingSessionLocal() as session:
+            first = await get_user_by_email(test_user['email'], session)
+            second = await get_user_by_email(test_user['email'], session)
+        self.assertIs(first, second)
+        self.assertEqual(len(self.statements), 1)
+
+    async def test_full_batch_is_dispatched(self):
+        loader = UserLoader('email', window=60, max_batch=2)
+        sessions = [TestingSessionLocal() for _ in range(2)]
+        try:
+            users = await asyncio.wait_for(
+                asyncio.gather(*(loader.load(test_user['email'], session) for session in sessions)), timeout=5)
+        finally:
+            for session in sessions:
+                await session.close()
+        self.assertEqual([user.email for user in users], [test_user['email']] * 2)
+        self.assertEqual(len(self.statements), 1)
+
+    @patch.object(users_by_email, 'max_batch', 0)
+    async def test_disabled(self):
+        sessions = [TestingSessionLocal() for _ in range(3)]
+        try:
+            await asyncio.gather(*(get_user_by_email(test_user['email'], session) for session in sessions))
+        finally:
+            for session in sessions:
+                await session.close()
+        self.assertEqual(len(self.statements), 3)